@@ -1,116 +1,408 @@
-from math import e
 import os
-import json
+import re
 import time
+import threading
+from collections import OrderedDict
 from datetime import datetime
-from flask import Flask, render_template, jsonify, redirect, request
+import hashlib
+from flask import Flask, render_template, jsonify, request, make_response, url_for, g, abort
+from werkzeug.routing import BaseConverter
 from dotenv import load_dotenv
-from requests import get
-from collect_trends import get_top10_youtube_data, get_top10_reddit_data, \
-                            get_top10_google_data, get_top10_twitter_data, \
-                            get_top10_news_data, collect_all_trends, \
-                            get_top10_spotify_data, get_twitter_trends_from_trends24, \
-                            get_reddit_trends, get_youtube_trends, \
-                            get_news_trends, get_spotify_trends, get_google_trends
+from trend_store import load_trends, load_top_trends, load_ranked_trends, sort_options, cache_stats, data_version
+from trend_history import rank_history, trends_at, search
+from scheduler import get_scheduler, REFRESH_SCHEDULE
+from normalize import TEMPLATE_FILTERS
+from trend_api import ApiError, parse_query, platform_page, topics_page, choose_encoding, cached_response, SUMMARY_PAGE_SIZE
+from regions import DEFAULT_REGION, enabled_regions, region_name
+from platforms import PLATFORMS as PLATFORM_SETTINGS, platform_names, setting
+from metrics import (render_prometheus, register_callback, gauge_lines, configure_logging, get_logger,
+                     REQUEST_SECONDS, CACHE_LOOKUPS)
+
+# The collectors (requests, bs4, spotipy) and publishers (boto3, git/ssh) are
+# imported lazily inside the refresh paths so worker boot only pays for
+# Flask and the JSON trend store.
 
 # Load environment variables
 load_dotenv()
+configure_logging()
+log = get_logger(__name__)
 
 app = Flask(__name__)
-app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0  # Disable Flask's default caching
+# Trend records store raw numbers; templates format them for display
+app.jinja_env.filters.update(TEMPLATE_FILTERS)
+
+@app.template_filter('meta_value')
+def meta_value(trend, meta):
+    """Text of one of a trend's meta fields on its platform page (see platforms.py)"""
+    value = trend.get(meta['field'])
+    if meta['filter']:
+        value = TEMPLATE_FILTERS[meta['filter']](value)
+    return meta['format'].replace('{}', '' if value is None else str(value))
+
+# Run the refresh scheduler in this process (enable in one worker only, or
+# run `python scheduler.py` as a sidecar instead)
+if os.getenv('ENABLE_SCHEDULER', '').lower() in ('1', 'true', 'yes'):
+    get_scheduler().start()
+# Static URLs carry a ?v=<mtime> cache buster, so assets can be cached for a year
+app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 31536000
+
+# Regions served; pages for the default region keep their unprefixed URLs
+REGIONS = enabled_regions()
+
+class RegionConverter(BaseConverter):
+    """Matches the code of an enabled region in a URL"""
+    regex = '(?:' + '|'.join(re.escape(region) for region in REGIONS) + ')'
+
+app.url_map.converters['region'] = RegionConverter
+
+PLATFORMS = platform_names()
+PLATFORM_ICONS = setting('icon')
+
+# Rendered page bytes keyed by page, each tagged with the data version it
+# was built from. Least recently used pages are evicted past the limit.
+MAX_CACHED_PAGES = 256
+_render_cache = OrderedDict()
+_render_lock = threading.Lock()
+
+@app.url_defaults
+def add_static_version(endpoint, values):
+    """Append the file mtime to static URLs so browsers refetch only on change"""
+    if endpoint == 'static' and 'filename' in values and 'v' not in values:
+        file_path = os.path.join(app.static_folder, values['filename'])
+        try:
+            values['v'] = int(os.stat(file_path).st_mtime)
+        except OSError:
+            pass
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_latency(response):
+    """Observe the request's latency under its route pattern"""
+    start = g.pop('request_start', None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_SECONDS.observe(time.perf_counter() - start, route, request.method, str(response.status_code))
+    return response
 
 @app.after_request
 def add_header(response):
-    """Add headers to prevent caching"""
-    response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-    response.headers['Pragma'] = 'no-cache'
-    response.headers['Expires'] = '0'
+    """Add caching headers: long-lived for static assets, revalidation for
+    ETag-tagged pages and no caching for everything else"""
+    if request.endpoint == 'static':
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    elif response.get_etag()[0] is None:
+        response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
+        response.headers['Pragma'] = 'no-cache'
+        response.headers['Expires'] = '0'
     return response
 
+def render_cached(key, version, last_modified, render):
+    """Serve a page from the render cache, rendering it only when its data
+    version changed, with ETag/Last-Modified conditional GET support"""
+    with _render_lock:
+        entry = _render_cache.get(key)
+        if entry is not None and entry['version'] == version:
+            _render_cache.move_to_end(key)
+    CACHE_LOOKUPS.inc('page', 'hit' if entry is not None and entry['version'] == version else 'miss')
+    if entry is None or entry['version'] != version:
+        body = render().encode('utf-8')
+        entry = {
+            'version': version,
+            'body': body,
+            'etag': hashlib.sha1(body).hexdigest()
+        }
+        with _render_lock:
+            _render_cache[key] = entry
+            _render_cache.move_to_end(key)
+            while len(_render_cache) > MAX_CACHED_PAGES:
+                _render_cache.popitem(last=False)
+
+    response = make_response(entry['body'])
+    response.set_etag(entry['etag'])
+    if last_modified:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
 # Define data directories
 data_dir = os.path.join(os.path.dirname(__file__), 'data')
 os.makedirs(data_dir, exist_ok=True)
 
-def load_top_trend_data():
+def region_context(region):
+    """Template variables shared by the pages of a region"""
+    return {
+        'region': region,
+        'region_name': region_name(region),
+        'region_prefix': '' if region == DEFAULT_REGION else f'/{region}',
+        'regions': [(code, region_name(code), '/' if code == DEFAULT_REGION else f'/{code}/') for code in REGIONS]
+    }
+
+def request_region():
+    """The API's ?region= (default region when absent)"""
+    region = request.args.get('region', DEFAULT_REGION)
+    if region not in REGIONS:
+        raise ApiError(f'Unknown region {region}', 404)
+    return region
+
+def load_top_trend_data(region=DEFAULT_REGION):
     """Load the latest trend data from JSON files"""
     data = {}
-    platforms = ['twitter', 'youtube', 'reddit', 'google', 'news', 'spotify']
     
-    for platform in platforms:
+    for platform in PLATFORMS:
         try:
-            if platform == 'twitter':
-                data[platform] = get_top10_twitter_data()
-            elif platform == 'youtube':
-                data[platform] = get_top10_youtube_data()
-            elif platform == 'reddit':
-                data[platform] = get_top10_reddit_data()
-            elif platform == 'google':
-                data[platform] = get_top10_google_data()
-            elif platform == 'news':
-                data[platform] = get_top10_news_data()
-            elif platform == 'spotify':
-                data[platform] = get_top10_spotify_data()
+            data[platform] = load_top_trends(platform, region)
                 
         except Exception as e:
-            print(f"Error loading {platform} data: {e}")
+            log.warning("Error loading %s data: %s", platform, e)
             data[platform] = None
     
     return data
 
 @app.route('/')
-def index():
+@app.route('/<region:region>/')
+def index(region=DEFAULT_REGION):
     """Render the main page with trend data"""
+    current_date = datetime.now().strftime('%B %d, %Y')
+    version, last_modified = data_version(PLATFORMS + ['topics', 'rising'], region)
+    if any(version):
+        return render_cached(('index', region), (version, current_date), last_modified,
+                             lambda: render_index(current_date, region))
+    return render_index(current_date, region)
+
+def render_index(current_date, region=DEFAULT_REGION):
+    """Render index.html from the current trend data"""
     try:
-        trend_data = load_top_trend_data()
-        current_date = datetime.now().strftime('%B %d, %Y')
+        trend_data = load_top_trend_data(region)
         
         # Check if any platform has data
         if all(data is None for data in trend_data.values()):
-            print("No existing data found. Collecting trends...")
-            collect_all_trends()
-            time.sleep(2)
-            # Try loading data again after collection
-            trend_data = load_top_trend_data()
+            log.info("No existing data found. Queueing trend collection...")
+            get_scheduler().enqueue(PLATFORMS, reason='no data')
             
     except Exception as e:
-        print(f"Error loading trend data: {e}")
-        trend_data = {p: {"trends": [], "last_updated": None} for p in ['twitter', 'youtube', 'reddit', 'google', 'news']}
+        log.error("Error loading trend data: %s", e)
+        trend_data = {p: {"trends": [], "last_updated": None} for p in PLATFORMS}
     
     return render_template('index.html', 
                           trend_data=trend_data,
-                          current_date=current_date)
+                          hot_topics=load_trends('topics', region),
+                          rising=rising_across_platforms(region=region),
+                          platform_icons=PLATFORM_ICONS,
+                          current_date=current_date,
+                          **region_context(region))
+
+def rising_across_platforms(per_platform=2, region=DEFAULT_REGION):
+    """The fastest rising trends of each platform, as (platform, trend) pairs"""
+    platforms = (load_trends('rising', region) or {}).get('platforms', {})
+    return [(platform, trend) for platform in PLATFORMS
+            for trend in platforms.get(platform, {}).get('trends', [])[:per_platform]]
+
+@app.route('/search')
+@app.route('/<region:region>/search')
+def search_trends(region=DEFAULT_REGION):
+    """Search current and historical trends across platforms"""
+    query = request.args.get('q', '').strip()
+    platform = request.args.get('platform')
+    if platform not in PLATFORMS:
+        platform = None
+    results = search(query, platform=platform, region=region) if query else []
+    return render_template('search.html',
+                          query=query,
+                          platform=platform,
+                          results=results,
+                          platform_icons=PLATFORM_ICONS,
+                          **region_context(region))
+
+@app.route('/topics')
+@app.route('/<region:region>/topics')
+def hot_topics(region=DEFAULT_REGION):
+    """Display stories trending on more than one platform"""
+    def render():
+        return render_template('hot_topics.html',
+                              hot_topics=load_trends('topics', region),
+                              platform_icons=PLATFORM_ICONS,
+                              **region_context(region))
+
+    version, last_modified = data_version(['topics'], region)
+    return render_cached(('topics', region), version, last_modified, render)
 
 @app.route('/platform/<platform>')
-def platform_trends(platform):
+@app.route('/<region:region>/platform/<platform>')
+def platform_trends(platform, region=DEFAULT_REGION):
     """Display detailed trends for a specific platform"""
-    # Update valid platforms
-    valid_platforms = ['twitter', 'reddit', 'google', 'youtube', 'news', 'spotify']
-    
-    # Update platform display names
-    platform_display = {
-        'twitter': 'Twitter',
-        'reddit': 'Reddit',
-        'google': 'Google',
-        'youtube': 'YouTube',
-        'news': 'News',
-        'spotify': 'Spotify'
-    }.get(platform, platform.capitalize())
-    
+    if platform not in PLATFORM_SETTINGS:
+        abort(404)
+    settings = PLATFORM_SETTINGS[platform]
+
+    # Optional ?sort=<field> and ?limit=<n>; unknown values fall back to the
+    # default view, and a limit covering every trend is the same as none
+    sort = request.args.get('sort')
+    if sort not in sort_options(platform):
+        sort = None
+    limit = request.args.get('limit', type=int)
+    if not limit or limit < 1 or limit >= len((load_trends(platform, region) or {}).get('trends') or []):
+        limit = None
+
     # Load trend data for the platform
+    def render():
+        if sort or limit:
+            trend_data = load_ranked_trends(platform, sort, limit, region)
+        else:
+            trend_data = load_trends(platform, region)
+        return render_template('platform_trends.html', 
+                              platform=platform,
+                              platform_display=settings['name'],
+                              settings=settings,
+                              trend_data=trend_data or {"trends": [], "last_updated": None},
+                              **region_context(region))
+
+    version, last_modified = data_version([platform], region)
+    return render_cached(('platform', region, platform, sort, limit), version, last_modified, render)
+
+
+@app.route('/history/<platform>')
+def platform_history(platform):
+    """Trend history for a platform: ?q=<title>&days=7 for a trend's rank
+    history, or ?at=<unix time> for all trends as they stood at that time
+    (?region= for a region other than the default)"""
     try:
-        file_path = os.path.join(data_dir, f'{platform}_trends.json')
-        if os.path.exists(file_path):
-            with open(file_path, 'r') as f:
-                trend_data = json.load(f)
+        region = request_region()
+        if request.args.get('q'):
+            days = float(request.args.get('days', 7))
+            return jsonify({
+                'platform': platform,
+                'region': region,
+                'title': request.args['q'],
+                'history': rank_history(request.args['q'], days=days, platform=platform, region=region)
+            }), 200
 
-    except Exception as e:
-        print(f"Error loading {platform} data: {e}")
-        trend_data = {"trends": [], "last_updated": None}
-    
-    return render_template('platform_trends.html', 
-                          platform=platform,
-                          platform_display=platform_display,
-                          trend_data=trend_data)
+        timestamp = float(request.args.get('at', time.time()))
+        snapshot = trends_at(platform, timestamp, region=region)
+        if snapshot is None:
+            return jsonify({'status': 'error', 'message': f'No {platform} history at {timestamp}'}), 404
+        return jsonify({'platform': platform, 'region': region, **snapshot}), 200
+    except ApiError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), e.status
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+
+def api_response(key, platforms, build, region=DEFAULT_REGION):
+    """Serve an API payload from the encoded response cache, with
+    Accept-Encoding negotiation and ETag/Last-Modified conditional GETs"""
+    version, last_modified = data_version(platforms, region)
+    encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+    body, etag = cached_response(key, version, encoding, build)
+
+    response = make_response(body)
+    response.mimetype = 'application/json'
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+@app.route('/api/v1/regions', methods=['GET'])
+def api_regions():
+    """Regions served, default first"""
+    return jsonify({'default': DEFAULT_REGION,
+                    'regions': [{'code': code, 'name': region_name(code)} for code in REGIONS]}), 200
+
+@app.route('/api/v1/trends', methods=['GET'])
+def api_trends():
+    """First page of every platform's trends (?limit= per platform, ?fields=, ?since=, ?region=)"""
+    try:
+        query = parse_query(request.args, page_size=SUMMARY_PAGE_SIZE)
+        region = request_region()
+        if query['cursor'] or query['sort']:
+            raise ApiError('cursor and sort are only supported on /api/v1/trends/<platform>')
+
+        def build():
+            pages = {platform: platform_page(platform, query, region) for platform in PLATFORMS}
+            return {'region': region,
+                    'platforms': {platform: page for platform, page in pages.items()
+                                  if page and page['modified']}}
+
+        return api_response(('all', region, tuple(sorted(query.items()))), PLATFORMS, build, region)
+    except ApiError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), e.status
+
+@app.route('/api/v1/topics', methods=['GET'])
+def api_topics():
+    """Cross-platform hot topics (?q= keyword lookup, ?limit=, ?region=)"""
+    try:
+        query = parse_query(request.args, page_size=SUMMARY_PAGE_SIZE)
+        region = request_region()
+        keyword = request.args.get('q', '').strip()
+        return api_response(('topics', region, keyword, query['limit']), ['topics'],
+                            lambda: topics_page(keyword, query['limit'], region), region)
+    except ApiError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), e.status
+
+@app.route('/api/v1/rising', methods=['GET'])
+def api_rising():
+    """Fastest rising trends per platform (?platform= for just one, ?region=)"""
+    platform = request.args.get('platform')
+    if platform is not None and platform not in PLATFORMS:
+        return jsonify({'status': 'error', 'message': f'Unknown platform {platform}'}), 404
+    try:
+        region = request_region()
+    except ApiError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), e.status
+
+    def build():
+        platforms = (load_trends('rising', region) or {}).get('platforms', {})
+        if platform:
+            platforms = {platform: platforms.get(platform, {'updated_at': None, 'trends': []})}
+        return {'platforms': platforms}
+
+    return api_response(('rising', region, platform), ['rising'], build, region)
+
+@app.route('/api/v1/search', methods=['GET'])
+def api_search():
+    """Prefix search over current and historical trends (?q=, ?platform=, ?limit=, ?region=).
+
+    Trends titled exactly like the query come first. The rest are ranked
+    among the 2000 most recently seen matches (trend_history.SEARCH_CANDIDATES),
+    so a very common word can miss trends last seen long ago."""
+    query = request.args.get('q', '').strip()
+    platform = request.args.get('platform')
+    if not query:
+        return jsonify({'status': 'error', 'message': 'q is required'}), 400
+    if platform is not None and platform not in PLATFORMS:
+        return jsonify({'status': 'error', 'message': f'Unknown platform {platform}'}), 404
+    try:
+        limit = parse_query(request.args)['limit']
+        region = request_region()
+    except ApiError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), e.status
+    return jsonify({'query': query, 'region': region,
+                    'results': search(query, platform=platform, limit=limit, region=region)}), 200
+
+@app.route('/api/v1/trends/<platform>', methods=['GET'])
+def api_platform_trends(platform):
+    """One page of a platform's trends (?cursor=, ?limit=, ?fields=, ?since=, ?sort=, ?region=)"""
+    if platform not in PLATFORMS:
+        return jsonify({'status': 'error', 'message': f'Unknown platform {platform}'}), 404
+    try:
+        query = parse_query(request.args)
+        region = request_region()
+
+        def build():
+            page = platform_page(platform, query, region)
+            if page is None:
+                raise ApiError(f'No {platform} data yet', 404)
+            return page
+
+        return api_response((platform, region, tuple(sorted(query.items()))), [platform], build, region)
+    except ApiError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), e.status
 
 
 @app.errorhandler(404)
@@ -124,45 +416,71 @@ def server_error(e):
     return render_template('500.html'), 500
 
 
+def enqueue_refresh(platforms):
+    """Queue a refresh job and return a 202 pointing at its status URL"""
+    job = get_scheduler().enqueue(platforms)
+    status_url = url_for('job_status', job_id=job['id'])
+    response = jsonify({
+        'status': 'accepted',
+        'job_id': job['id'],
+        'status_url': status_url,
+        'platforms': job['platforms'],
+        'in_flight': job['in_flight']
+    })
+    response.status_code = 202
+    response.headers['Location'] = status_url
+    return response
+
 # New Refresh endpoints
 @app.route('/refresh-data', methods=['GET'])
 def refresh_all_data():
-    """Endpoint to refresh all platform data except Google Trends"""
-    try:
-        # Refresh all platforms
-        twitter_success = get_twitter_trends_from_trends24()
-        reddit_success = get_reddit_trends()
-        youtube_success = get_youtube_trends()
-        news_success = get_news_trends()
-        spotify_success = get_spotify_trends()
-        
-        return jsonify({
-            'status': 'success',
-            'updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC'),
-            'platforms': {
-                'twitter': twitter_success,
-                'reddit': reddit_success,
-                'youtube': youtube_success,
-                'news': news_success,
-                'spotify': spotify_success
-            }
-        }), 200
-    except Exception as e:
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+    """Endpoint to queue a refresh of all platform data except the daily
+    sources (Google Trends)"""
+    return enqueue_refresh([p for p, cadence in REFRESH_SCHEDULE.items() if 'every' in cadence])
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Endpoint to poll the status of a refresh job"""
+    job = get_scheduler().get_job(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': f'Unknown job {job_id}'}), 404
+    return jsonify(job), 200
+
+
+@app.route('/cache-stats', methods=['GET'])
+def trend_cache_stats():
+    """Endpoint to report trend snapshot cache hit/miss counters"""
+    return jsonify(cache_stats()), 200
+
+
+def cache_metric_lines():
+    """Snapshot cache counters, and the hit ratio of each read path cache"""
+    stats = cache_stats()
+    yield from gauge_lines('trend_snapshot_cache_total', 'Trend snapshot cache events',
+                           [((event,), stats[event]) for event in ('hits', 'misses', 'reloads', 'errors')],
+                           ('event',), kind='counter')
+    ratios = [(('snapshot',), stats['hit_ratio'])]
+    for cache in ('page', 'api'):
+        hits, misses = CACHE_LOOKUPS.value(cache, 'hit'), CACHE_LOOKUPS.value(cache, 'miss')
+        ratios.append(((cache,), round(hits / (hits + misses), 4) if hits + misses else 0.0))
+    yield from gauge_lines('trend_cache_hit_ratio', 'Hit ratio of each read path cache', ratios, ('cache',))
+
+register_callback(cache_metric_lines)
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics: route latency, read path caches and collector timings"""
+    response = make_response(render_prometheus())
+    response.mimetype = 'text/plain'
+    response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+    return response
 
 
 @app.route('/refresh-google-trends', methods=['GET'])
 def refresh_google_trends_only():
-    """Endpoint to refresh only Google Trends data"""
-    try:
-        success = get_google_trends()
-        return jsonify({
-            'status': 'success' if success else 'partial',
-            'updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC'),
-            'platform': 'google'
-        }), 200
-    except Exception as e:
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+    """Endpoint to queue a refresh of only Google Trends data"""
+    return enqueue_refresh(['google'])
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', debug=True)
\ No newline at end of file
@@ -0,0 +1,83 @@
+"""Crash-safe file writes and cross-process file locks for trend files,
+collector state and caches.
+
+Only the standard library is used, so anything that persists a file can
+import this without loading the trend history and scoring stack.
+"""
+import os
+import json
+import fcntl
+from contextlib import contextmanager
+
+
+def _create_temp(directory, name):
+    """Create and open an exclusive temp file next to `name`. It gets the
+    usual umask-based mode, like open(path, 'w')."""
+    while True:
+        tmp_path = os.path.join(directory, f'.{name}.{os.urandom(6).hex()}.tmp')
+        try:
+            return os.open(tmp_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666), tmp_path
+        except FileExistsError:
+            continue
+
+def write_text_atomic(path, text):
+    """Write a file crash-safely: write a temp file in the same directory,
+    fsync it, then atomically rename it over `path`. Readers see either the
+    old or the new file, never a partial one."""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = _create_temp(directory, os.path.basename(path))
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    # Persist the rename itself
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+def write_json_atomic(path, data):
+    """Crash-safe json.dump(data, indent=2) to `path`"""
+    write_text_atomic(path, json.dumps(data, indent=2))
+
+def write_if_changed(path, text):
+    """Atomically write a text file only if its content differs. Returns True if written."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            if f.read() == text:
+                return False
+    except (OSError, ValueError):
+        pass
+    write_text_atomic(path, text)
+    return True
+
+@contextmanager
+def file_lock(path, blocking=True):
+    """Hold an exclusive lock on `path` (created if missing) against other
+    processes and threads. With blocking=False, yields False at once instead
+    of waiting when someone else holds it, and True otherwise."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a') as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        # Closing the file releases the lock
+        yield True
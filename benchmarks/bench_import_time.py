@@ -0,0 +1,89 @@
+"""Import-time benchmark for the web process.
+
+Imports `app` in fresh interpreters, reports the median cold-start time and
+the slowest top-level imports, and fails if any collection/publishing
+dependency leaks back onto the serving path or the budget is exceeded.
+
+    python benchmarks/bench_import_time.py [--runs 5] [--budget-ms 1500]
+"""
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that only the collection/publishing path needs
+FORBIDDEN_MODULES = ['boto3', 'botocore', 'spotipy', 'pytrends', 'bs4', 'requests',
+                     'collect_trends', 's3_operations', 'render_ssh_config']
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import app
+elapsed = time.perf_counter() - start
+leaked = [m for m in {forbidden!r} if m in sys.modules]
+print(elapsed)
+print(','.join(leaked))
+"""
+
+
+def measure_once():
+    """Import app in a fresh interpreter, return (seconds, leaked modules)"""
+    probe = PROBE.format(forbidden=FORBIDDEN_MODULES)
+    output = subprocess.check_output([sys.executable, '-c', probe], cwd=ROOT, text=True)
+    lines = output.splitlines()
+    elapsed = float(lines[-2])
+    return elapsed, [m for m in lines[-1].split(',') if m]
+
+
+def slowest_imports(limit=10):
+    """Return the slowest imports made directly by app, from -X importtime"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'],
+                            cwd=ROOT, capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        # Nested imports are indented two spaces per level; app is level 0
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            rows.append((int(cumulative_us), name.strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=1500)
+    args = parser.parse_args()
+
+    timings = []
+    leaked = set()
+    for _ in range(args.runs):
+        elapsed, leaked_modules = measure_once()
+        timings.append(elapsed * 1000)
+        leaked.update(leaked_modules)
+
+    median_ms = statistics.median(timings)
+    print(f"import app: median {median_ms:.1f} ms, min {min(timings):.1f} ms over {args.runs} runs")
+    print("Slowest top-level imports (cumulative):")
+    for cumulative_us, name in slowest_imports():
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    failed = False
+    if leaked:
+        print(f"❌ Collection-only modules imported by app: {', '.join(sorted(leaked))}")
+        failed = True
+    if median_ms > args.budget_ms:
+        print(f"❌ Import time {median_ms:.1f} ms exceeds budget of {args.budget_ms:.0f} ms")
+        failed = True
+    if not failed:
+        print("✅ Import time within budget")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""Benchmark the cost of instrumentation on the serving path.
+
+Reports the per-call cost of a histogram observation and of a repeated
+warning through the rate-limited logger, and how many of the repeated
+warnings reach the stream. Then serves --requests cached API responses
+through the Flask test client and checks /metrics counts every one.
+
+    python benchmarks/bench_metrics_overhead.py [--requests 2000]
+"""
+import io
+import os
+import sys
+import time
+import logging
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from metrics import Histogram, get_logger
+
+
+def per_call(fn, calls):
+    start = time.perf_counter()
+    for i in range(calls):
+        fn(i)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    histogram = Histogram('bench_seconds', 'Benchmark histogram', ('route',))
+    print(f"histogram observe        {per_call(lambda i: histogram.observe(i * 1e-5, '/'), 100000):6.2f} µs/call")
+
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    log = get_logger('bench')
+    log.addHandler(handler)
+    log.propagate = False
+    logged = per_call(lambda i: log.warning('Error loading %s data: %s', 'reddit', i), 100000)
+    print(f"rate-limited warning     {logged:6.2f} µs/call ({len(stream.getvalue().splitlines())} of 100000 lines written)")
+
+    import app
+    client = app.app.test_client()
+    start = time.perf_counter()
+    for _ in range(args.requests):
+        client.get('/api/v1/trends?limit=5')
+    elapsed = time.perf_counter() - start
+    print(f"/api/v1/trends           {elapsed / args.requests * 1e3:6.3f} ms/request over {args.requests} requests")
+
+    body = client.get('/metrics').get_data(as_text=True)
+    counted = sum(int(float(line.rsplit(' ', 1)[1])) for line in body.splitlines()
+                  if line.startswith('trend_http_request_seconds_count{route="/api/v1/trends"'))
+    ok = counted == args.requests
+    print(f"{'✅' if ok else '❌'} /metrics counted {counted} of {args.requests} requests")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
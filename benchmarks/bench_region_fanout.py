@@ -0,0 +1,94 @@
+"""Benchmark fanning collection out over regions x platforms.
+
+Runs collection_engine.run_collectors over simulated collectors (each one
+sleeps for its platform's typical fetch latency) for 1 region and for
+--regions regions, with the per-source concurrency caps from
+collect_trends.SOURCE_CONCURRENCY. Reports the wall time against the
+sequential total and the peak number of concurrent fetches per source,
+which must never exceed its cap.
+
+    python benchmarks/bench_region_fanout.py [--regions 30] [--scale 0.1]
+
+--scale multiplies the simulated latencies (1.0 = realistic seconds).
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import threading
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from collection_engine import run_collectors
+from collect_trends import SOURCE_CONCURRENCY, PLATFORM_TIMEOUTS
+from regions import REGIONS, region_settings
+
+# Typical seconds per fetch, including the trends24 page parse and Spotify's page round-trips
+LATENCY = {'spotify': 2.5, 'reddit': 1.0, 'youtube': 1.5, 'news': 0.8, 'twitter': 2.0, 'google': 1.2}
+
+
+def run(regions, scale, seed=3):
+    rng = random.Random(seed)
+    active = defaultdict(int)
+    peak = defaultdict(int)
+    lock = threading.Lock()
+
+    def collector(platform, latency):
+        def collect():
+            with lock:
+                active[platform] += 1
+                peak[platform] = max(peak[platform], active[platform])
+            time.sleep(latency)
+            with lock:
+                active[platform] -= 1
+            return True
+        return collect
+
+    sources = {platform: threading.BoundedSemaphore(limit) for platform, limit in SOURCE_CONCURRENCY.items()}
+    collectors, slots = {}, {}
+    sequential = 0.0
+    for region in regions:
+        for platform in LATENCY:
+            if region_settings(region, platform) is None:
+                continue
+            latency = LATENCY[platform] * scale * rng.uniform(0.7, 1.3)
+            sequential += latency
+            collectors[(region, platform)] = collector(platform, latency)
+            slots[(region, platform)] = sources[platform]
+
+    start = time.perf_counter()
+    results = run_collectors(collectors, PLATFORM_TIMEOUTS, total_timeout=600, slots=slots)
+    elapsed = time.perf_counter() - start
+    ok = sum(result['success'] for result in results.values())
+    return elapsed, sequential, ok, len(collectors), dict(peak)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--regions', type=int, default=30)
+    parser.add_argument('--scale', type=float, default=0.1)
+    args = parser.parse_args()
+
+    codes = list(REGIONS)[:args.regions]
+    failed = False
+    for label, regions in (('1 region', codes[:1]), (f'{len(codes)} regions', codes)):
+        elapsed, sequential, ok, total, peak = run(regions, args.scale)
+        print(f"{label:<12} {total:3d} fetches   wall {elapsed:6.2f}s   sequential {sequential:6.2f}s   "
+              f"speedup {sequential / elapsed:5.1f}x   ({ok}/{total} ok)")
+        over = {p: n for p, n in peak.items() if n > SOURCE_CONCURRENCY[p]}
+        print(f"{'':<12} peak concurrent fetches per source: {peak}")
+        if over:
+            print(f"❌ Concurrency cap exceeded: {over}")
+            failed = True
+    slowest = max(LATENCY[p] * args.scale * 1.3 * -(-sum(1 for r in codes if region_settings(r, p)) // SOURCE_CONCURRENCY[p])
+                  for p in LATENCY)
+    print(f"Bound from the per-source caps: about {slowest:.2f}s")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Benchmark the streaming news feed parser against the BeautifulSoup one.
+
+Parses the saved Google News RSS fixture (optionally with its items
+repeated to scale it up) with the previous BeautifulSoup(..., 'xml') +
+select_one implementation and with collect_trends.parse_news_feed, checks
+both produce the same records, and reports time and peak memory.
+
+    python benchmarks/bench_rss_parser.py [--feed path] [--scale 1 10 100] [--repeat 5]
+"""
+import io
+import os
+import re
+import sys
+import time
+import argparse
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bs4 import BeautifulSoup
+from collect_trends import parse_news_feed
+
+DEFAULT_FEED = os.path.join(ROOT, 'benchmarks', 'fixtures', 'google_news_rss.xml')
+
+
+def parse_with_soup(text):
+    """The previous get_news_trends parsing path"""
+    soup = BeautifulSoup(text, 'xml')
+    news = []
+    for i, item in enumerate(soup.select('item')):
+        try:
+            title = item.select_one('title').text
+            link = item.select_one('link').text
+            source = item.select_one('source').text if item.select_one('source') else 'Google News'
+            pub_date = item.select_one('pubDate').text if item.select_one('pubDate') else None
+            news.append({'rank': i + 1, 'title': title, 'url': link, 'source': source,
+                         'pub_date': pub_date, 'tag': 'headline'})
+        except Exception:
+            continue
+    return news
+
+
+def scale_feed(feed, factor):
+    """Repeat the feed's items `factor` times"""
+    if factor == 1:
+        return feed
+    items = re.findall(r'<item>.*?</item>', feed, flags=re.S)
+    start = feed.index('<item>')
+    end = feed.rindex('</item>') + len('</item>')
+    return feed[:start] + ''.join(items) * factor + feed[end:]
+
+
+def measure(func, repeat):
+    """Return (best seconds, peak bytes, result)"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--feed', default=DEFAULT_FEED)
+    parser.add_argument('--scale', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with open(args.feed, 'r', encoding='utf-8') as f:
+        base_feed = f.read()
+
+    failed = False
+    print(f"{'items':>7} {'soup ms':>10} {'stream ms':>10} {'speedup':>8} {'soup peak KB':>13} {'stream peak KB':>15}")
+    for factor in args.scale:
+        feed = scale_feed(base_feed, factor)
+        payload = feed.encode('utf-8')
+        soup_time, soup_peak, soup_news = measure(lambda: parse_with_soup(feed), args.repeat)
+        stream_time, stream_peak, stream_news = measure(lambda: parse_news_feed(io.BytesIO(payload)), args.repeat)
+
+        # The streaming parser adds a parsed 'published' timestamp; everything else must match
+        stripped = [{k: v for k, v in item.items() if k != 'published'} for item in stream_news]
+        if stripped != soup_news:
+            print(f"❌ Parsers disagree at scale {factor}")
+            failed = True
+
+        print(f"{len(stream_news):>7} {soup_time * 1000:>10.2f} {stream_time * 1000:>10.2f} "
+              f"{soup_time / stream_time:>7.1f}x {soup_peak / 1024:>13.0f} {stream_peak / 1024:>15.0f}")
+
+    if not failed:
+        print("✅ Both parsers produce the same records")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""Benchmark trend search against a synthetic year of hourly snapshots.
+
+Records a year (by default) of hourly snapshots for every platform into a
+scratch history database through trend_history.record_snapshot, which
+keeps the FTS5 index current as it goes, then times trend_history.search
+for short and long prefixes, multi-word queries and platform filters.
+
+    python benchmarks/bench_search.py [--hours 8760] [--trends 25] [--repeat 200] [--db path]
+
+Pass --db with an existing file to reuse a database built by an earlier run.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import trend_history
+
+PLATFORMS = ('twitter', 'google', 'news', 'reddit', 'youtube', 'spotify')
+SYLLABLES = ['ka', 'ra', 'mo', 'di', 'su', 'pa', 'le', 'ti', 'no', 'ver', 'shan', 'tor', 'bel', 'gan', 'ish',
+             'ma', 'lo', 'zen', 'qui', 'dra', 'pur', 'vi', 'har', 'son', 'el', 'ba', 'cho', 'ne', 'ru', 'sta']
+DETAIL = {'youtube': 'channel', 'reddit': 'subreddit', 'spotify': 'artists', 'news': 'source'}
+
+
+def make_vocabulary(rng, size=6000):
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+def make_trend(rng, platform, vocabulary):
+    # Zipf-ish word choice, so some words recur across many trends
+    words = [vocabulary[min(int((rng.paretovariate(1.1) - 1) * 40), len(vocabulary) - 1)]
+             for _ in range(rng.randint(1 if platform in ('twitter', 'google') else 3, 9))]
+    title = ' '.join(words).title()
+    if platform == 'twitter':
+        title = '#' + title.replace(' ', '')
+    trend = {'title': title, 'url': f'https://example.com/{platform}/{rng.getrandbits(40):x}'}
+    if platform in DETAIL:
+        trend[DETAIL[platform]] = rng.choice(vocabulary).title()
+    return trend
+
+def build(db, hours, per_platform, seed=7):
+    """Record `hours` hourly snapshots per platform; about a fifth of each list turns over every hour"""
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(rng)
+    lists = {p: [make_trend(rng, p, vocabulary) for _ in range(per_platform)] for p in PLATFORMS}
+    start = time.time() - hours * 3600
+    began = time.perf_counter()
+    for hour in range(hours):
+        for platform, trends in lists.items():
+            for _ in range(per_platform // 5):
+                trends[rng.randrange(per_platform)] = make_trend(rng, platform, vocabulary)
+            rng.shuffle(trends)
+            snapshot = [{**trend, 'rank': i + 1} for i, trend in enumerate(trends)]
+            trend_history.record_snapshot(platform, {'trends': snapshot, 'last_updated': None},
+                                          f'{platform}-{hour}', start + hour * 3600)
+        if hour and hour % 1000 == 0:
+            print(f"  {hour}/{hours} hours recorded ({time.perf_counter() - began:.0f}s)")
+    return vocabulary, time.perf_counter() - began
+
+def time_queries(label, queries, repeat, **kwargs):
+    timings = []
+    hits = 0
+    for i in range(repeat):
+        query = queries[i % len(queries)]
+        start = time.perf_counter()
+        hits += len(trend_history.search(query, **kwargs))
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{label:<28} p50 {statistics.median(timings):7.2f} ms   p95 {p95:7.2f} ms   "
+          f"max {timings[-1]:7.2f} ms   ({hits / repeat:.1f} results/query)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hours', type=int, default=24 * 365)
+    parser.add_argument('--trends', type=int, default=25, help='trends per platform per snapshot')
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--db', help='history database to build (or reuse)')
+    args = parser.parse_args()
+
+    db = args.db or os.path.join(tempfile.mkdtemp(prefix='trend-search-'), 'history.db')
+    trend_history.HISTORY_DB = db
+    rng = random.Random(11)
+    if os.path.exists(db) and args.db:
+        vocabulary = make_vocabulary(random.Random(7))
+        print(f"Reusing {db}")
+    else:
+        print(f"Recording {args.hours} hours x {len(PLATFORMS)} platforms x {args.trends} trends into {db}")
+        vocabulary, elapsed = build(db, args.hours, args.trends)
+        print(f"Built in {elapsed:.1f}s ({elapsed / args.hours * 1000:.2f} ms per hour of snapshots)")
+
+    conn = trend_history._connect()
+    rows = conn.execute('SELECT COUNT(*) FROM trend_rows').fetchone()[0]
+    docs = conn.execute('SELECT COUNT(*) FROM trend_docs').fetchone()[0]
+    print(f"{rows:,} trend rows, {docs:,} distinct trends, {os.path.getsize(db) / 1e6:.1f} MB\n")
+
+    common = vocabulary[:8]
+    rare = rng.sample(vocabulary, 50)
+    time_queries('2-letter prefix', [w[:2] for w in rare], args.repeat)
+    time_queries('3-letter prefix', [w[:3] for w in rare], args.repeat)
+    time_queries('common word', common, args.repeat)
+    time_queries('rare word', rare, args.repeat)
+    time_queries('two words', [f'{a} {b[:3]}' for a, b in zip(common * 8, rare)], args.repeat)
+    time_queries('word, one platform', rare, args.repeat, platform='news')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,401 @@
+"""Offline benchmark suite for the collectors and the serving path.
+
+For each scale, copies the app into a scratch directory (so data/ and its
+state are never touched) and, in a fresh interpreter there:
+
+- serves recorded responses from a local server: the saved trends24 page
+  (data/twitter_debug.html), and the Reddit, YouTube Data API, Google
+  Trends and Google News responses in benchmarks/fixtures/. Spotify
+  replays benchmarks/fixtures/spotify_responses.json through FakeSpotify.
+  Every list in them is repeated `scale` times with distinct titles, and
+  reordered on every repeat so each collection writes new data;
+- runs every collector against them, timing its fetch/parse/write stages,
+  then rebuilds the hot topics;
+- times load_top_trend_data() and, through the Flask test client, index()
+  and platform_trends() for every platform. Each is timed warm (served
+  from the snapshot and render caches) and cold (caches cleared, so files
+  are re-read and pages re-rendered).
+
+Results are median seconds per call, over at least --repeat calls and a
+minimum time per measurement. They are compared with the stored baselines
+in benchmarks/baselines.json, and the run fails when a measurement is more
+than --tolerance slower than its baseline. Baselines are only comparable
+on the machine that recorded them; on a noisy (e.g. shared virtual)
+machine, raise --repeat or --tolerance.
+
+    python benchmarks/bench_suite.py [--scales 1,10,100,1000] [--repeat 3]
+                                     [--only collect|serve] [--update-baseline]
+"""
+import gc
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import statistics
+import argparse
+import platform
+import tempfile
+import subprocess
+import contextlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+FIXTURES = os.path.join(ROOT, 'benchmarks', 'fixtures')
+BASELINES = os.path.join(ROOT, 'benchmarks', 'baselines.json')
+DEFAULT_SCALES = '1,10,100'
+# Ignore slowdowns smaller than this, whatever the ratio (timer noise)
+MIN_REGRESSION = 0.005
+# Minimum wall time spent per collector and per serving measurement
+COLLECT_SECONDS = 2
+SERVE_SECONDS = 0.5
+SCRATCH_IGNORE = shutil.ignore_patterns('.git', '__pycache__', '.state', 'regions', 'history.db*', '.*.tmp')
+
+HOSTS = ('trends24.in', 'www.reddit.com', 'news.google.com', 'www.googleapis.com',
+         'google-realtime-trends-data-api.p.rapidapi.com')
+
+
+# --- Scaled fixtures ---
+
+def _rotate(items, generation):
+    if not items:
+        return items
+    shift = generation % len(items)
+    return items[shift:] + items[:shift]
+
+def _copies(items, scale, rename):
+    """`scale` copies of each item; copies after the first get `rename(item, k)`"""
+    return [item if k == 0 else rename(item, k) for k in range(scale) for item in items]
+
+# Words of a title (not inside character references like &amp;)
+_WORD_RE = re.compile(r'(?<![&#])\b[^\W\d_]+\b(?!;)')
+
+def retitle(title, k):
+    """Copy k of a title, with every word changed, so copies are distinct
+    trends to the matching in correlate.py rather than one huge topic"""
+    tag = ''
+    while True:
+        tag = chr(97 + k % 26) + tag
+        k //= 26
+        if not k:
+            break
+    return _WORD_RE.sub(lambda m: f'{m.group(0)}x{tag}', title)
+
+_TREND_LINK_RE = re.compile(r'(class=trend-link>)([^<]*)(</a>)')
+_LIST_RE = re.compile(r'(<ol class=trend-card__list>)(.*?)(</ol>)', re.S)
+
+def scaled_trends24(html, scale, generation):
+    """The saved trends24 page with the two latest hourly lists scaled"""
+    def scale_list(match):
+        items = re.findall(r'<li>.*?</li>', match.group(2), re.S)
+        items = _copies(items, scale, lambda li, k: _TREND_LINK_RE.sub(
+            lambda m: m.group(1) + retitle(m.group(2), k) + m.group(3), li))
+        return match.group(1) + ''.join(_rotate(items, generation)) + match.group(3)
+    return _LIST_RE.sub(scale_list, html, count=2)
+
+def scaled_feed(xml, scale, generation):
+    """The recorded Google News feed with its items scaled"""
+    start, end = xml.index('<item>'), xml.rindex('</item>') + len('</item>')
+    items = re.findall(r'<item>.*?</item>', xml[start:end], re.S)
+    def rename(item, k):
+        return re.sub(r'<title>(.*?)</title>', lambda m: f'<title>{retitle(m.group(1), k)}</title>', item, count=1)
+    items = _copies(items, scale, rename)
+    return xml[:start] + ''.join(_rotate(items, generation)) + xml[end:]
+
+def scaled_reddit(listing, scale, generation):
+    def rename(child, k):
+        data = child['data']
+        return {**child, 'data': {**data, 'title': retitle(data['title'], k), 'id': f"{data['id']}{k}",
+                                  'permalink': data['permalink'].rstrip('/') + f'{k}/'}}
+    children = _rotate(_copies(listing['data']['children'], scale, rename), generation)
+    return {**listing, 'data': {**listing['data'], 'dist': len(children), 'children': children}}
+
+def scaled_youtube(chart, scale, generation):
+    def rename(video, k):
+        return {**video, 'id': f"{video['id']}{k}",
+                'snippet': {**video['snippet'], 'title': retitle(video['snippet']['title'], k)}}
+    return {'items': _rotate(_copies(chart['items'], scale, rename), generation)}
+
+def scaled_google(response, scale, generation):
+    keywords = _copies(response['data']['keywordsText'], scale, retitle)
+    return {**response, 'data': {**response['data'], 'keywordsText': _rotate(keywords, generation)}}
+
+
+class FixtureServer(BaseHTTPRequestHandler):
+    """Serves the scaled fixture of whichever host a request was meant for
+    (hosts are told apart by path)"""
+    scale = 1
+    generation = 0
+    recorded = {}
+    _built = {}
+
+    @classmethod
+    def body(cls, name):
+        key = (name, cls.scale, cls.generation)
+        if key not in cls._built:
+            recorded = cls.recorded[name]
+            builders = {'trends24': scaled_trends24, 'news': scaled_feed, 'reddit': scaled_reddit,
+                        'youtube': scaled_youtube, 'google': scaled_google}
+            built = builders[name](recorded, cls.scale, cls.generation)
+            text = built if isinstance(built, str) else json.dumps(built, ensure_ascii=False)
+            cls._built = {key: text.encode('utf-8')}
+        return cls._built[key]
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == '/r/popular.json':
+            name, mimetype = 'reddit', 'application/json'
+        elif path == '/rss':
+            name, mimetype = 'news', 'application/rss+xml'
+        elif path == '/youtube/v3/videos':
+            name, mimetype = 'youtube', 'application/json'
+        elif path.startswith('/trends/'):
+            name, mimetype = 'google', 'application/json'
+        else:
+            name, mimetype = 'trends24', 'text/html'
+        body = self.body(name)
+        self.send_response(200)
+        self.send_header('Content-Type', mimetype)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def load_recorded():
+    with open(os.path.join(ROOT, 'data', 'twitter_debug.html'), encoding='utf-8') as f:
+        trends24 = f.read()
+    with open(os.path.join(FIXTURES, 'google_news_rss.xml'), encoding='utf-8') as f:
+        news = f.read()
+    recorded = {'trends24': trends24, 'news': news}
+    for name, file_name in (('reddit', 'reddit_popular.json'), ('youtube', 'youtube_videos.json'),
+                            ('google', 'google_realtime_trends.json')):
+        with open(os.path.join(FIXTURES, file_name), encoding='utf-8') as f:
+            recorded[name] = json.load(f)
+    return recorded
+
+
+# --- Worker: runs inside the scratch copy ---
+
+def median_time(fn, repeat=3, min_seconds=0.0, setup=None):
+    """Median seconds per call over at least `repeat` calls and `min_seconds`.
+    As in timeit, the garbage collector is paused while a call is timed."""
+    times = []
+    started = time.perf_counter()
+    while len(times) < repeat or time.perf_counter() - started < min_seconds:
+        if setup:
+            setup()
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+    return statistics.median(times)
+
+def bench_collectors(scale, repeat):
+    from fake_spotify import FakeSpotify
+    from http_client import HttpClient, set_client
+    from host_guard import HostGuard, set_guard
+    from quota import QuotaLedger, QUOTAS, set_ledger
+    from spotify_source import set_spotify
+    from trend_writer import state_dir
+    from trend_store import load_trends
+    from metrics import collecting
+    from platforms import platform_names, get_collector
+    import collect_trends
+
+    class ScaledSpotify(FakeSpotify):
+        """FakeSpotify with each recorded playlist `scale` times longer"""
+
+        def __init__(self):
+            super().__init__()
+            tracks = [(key, item) for key, response in self.responses.items()
+                      if '/tracks?' in key for item in response['items']]
+            self.tracks = [item for _, item in sorted(tracks, key=lambda pair: int(pair[0].rsplit('offset=', 1)[1]))]
+
+        def playlist(self, playlist_id, fields=None, market=None, additional_types=('track',)):
+            info = super().playlist(playlist_id, fields=fields, market=market)
+            info['tracks']['total'] = len(self.tracks) * scale
+            info['snapshot_id'] = f"{info['snapshot_id']}-{FixtureServer.generation}"
+            return info
+
+        def playlist_items(self, playlist_id, fields=None, limit=100, offset=0, market=None,
+                           additional_types=('track', 'episode')):
+            total = len(self.tracks) * scale
+            items = []
+            for i in range(offset, min(offset + limit, total)):
+                item = self.tracks[(i + FixtureServer.generation) % len(self.tracks)]
+                copy = i // len(self.tracks)
+                if copy and item and item['track']:
+                    item = {'track': {**item['track'], 'name': retitle(item['track']['name'], copy)}}
+                items.append(item)
+            return {'items': items}
+
+    FixtureServer.recorded = load_recorded()
+    FixtureServer.scale = scale
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FixtureServer)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+
+    # No rate limits or quotas: every repeat must reach the fixtures
+    set_guard(HostGuard(limits={}))
+    set_client(HttpClient(retries=0, host_overrides={host: base for host in HOSTS}))
+    set_ledger(QuotaLedger(quotas={api: {**quota, 'limit': None} for api, quota in QUOTAS.items()}))
+    set_spotify(ScaledSpotify())
+    os.environ.update({'YOUTUBE_API_KEY': 'bench', 'RAPID_API_KEY': 'bench'})
+
+    results = {}
+    for platform_name in platform_names():
+        collector = get_collector(platform_name)
+        runs = []
+        started = time.perf_counter()
+        while len(runs) < repeat or time.perf_counter() - started < COLLECT_SECONDS:
+            FixtureServer.generation = len(runs) + 1
+            # Forget the last playlist snapshot so Spotify fetches every repeat
+            with contextlib.suppress(OSError):
+                os.remove(os.path.join(state_dir(), 'spotify_cache.json'))
+            start = time.perf_counter()
+            with collecting(platform_name) as timer, contextlib.redirect_stdout(open(os.devnull, 'w')):
+                ok = collector()
+            elapsed = time.perf_counter() - start
+            summary = timer.finish(elapsed, 'success' if ok else 'failed')
+            runs.append((elapsed, summary['stages']))
+        data = load_trends(platform_name) or {}
+        print(f"   {platform_name:<8} x{scale}: {len(data.get('trends') or [])} trends", file=sys.stderr)
+        results[f'collect.{platform_name}'] = statistics.median(elapsed for elapsed, _ in runs)
+        for stage in ('fetch', 'parse', 'write'):
+            results[f'collect.{platform_name}.{stage}'] = statistics.median(stages[stage] for _, stages in runs)
+
+    with contextlib.redirect_stdout(open(os.devnull, 'w')):
+        results['collect.hot_topics'] = median_time(collect_trends.update_hot_topics, repeat)
+    server.shutdown()
+    return results
+
+def bench_serving(repeat):
+    import app
+    from trend_store import clear_cache
+
+    client = app.app.test_client()
+
+    def get(url):
+        def fetch():
+            response = client.get(url)
+            assert response.status_code == 200, f'{url}: {response.status_code}'
+        return fetch
+
+    def cold():
+        clear_cache()
+        app._render_cache.clear()
+
+    pages = {'index': '/'}
+    pages.update({f'platform_trends.{p}': f'/platform/{p}' for p in app.PLATFORMS})
+    results = {}
+    results['serve.load_top_trend_data'] = median_time(app.load_top_trend_data, repeat, SERVE_SECONDS)
+    results['serve.load_top_trend_data.cold'] = median_time(app.load_top_trend_data, repeat, SERVE_SECONDS, setup=clear_cache)
+    for name, url in pages.items():
+        results[f'serve.{name}'] = median_time(get(url), repeat, SERVE_SECONDS)
+        results[f'serve.{name}.cold'] = median_time(get(url), repeat, SERVE_SECONDS, setup=cold)
+    return results
+
+def worker(args):
+    sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+    # The serving path reads what the collectors wrote at this scale, so they always run
+    results = bench_collectors(args.scale, args.repeat)
+    if args.only == 'serve':
+        results = {}
+    if args.only != 'collect':
+        results.update(bench_serving(args.repeat))
+    print(json.dumps(results))
+
+
+# --- Driver ---
+
+def run_scale(scale, args):
+    """Run the worker for one scale in a fresh scratch copy of the app"""
+    scratch = tempfile.mkdtemp(prefix=f'bench-suite-x{scale}-')
+    try:
+        copy = os.path.join(scratch, 'app')
+        shutil.copytree(ROOT, copy, ignore=SCRATCH_IGNORE)
+        command = [sys.executable, os.path.join(copy, 'benchmarks', 'bench_suite.py'), '--worker',
+                   '--scale', str(scale), '--repeat', str(args.repeat)]
+        if args.only:
+            command += ['--only', args.only]
+        output = subprocess.run(command, cwd=copy, stdout=subprocess.PIPE, text=True, check=True).stdout
+        return json.loads(output.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+def load_baselines():
+    try:
+        with open(BASELINES, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'results': {}}
+
+def compare(results, baselines, tolerance):
+    """Print each measurement against its baseline; return the regressions"""
+    regressions = []
+    for scale, measurements in results.items():
+        stored = baselines['results'].get(scale, {})
+        print(f"\nx{scale}")
+        for name, value in measurements.items():
+            baseline = stored.get(name)
+            line = f"  {name:<40} {value * 1e3:10.2f} ms"
+            if name.startswith('serve.') and value:
+                line += f"  {1 / value:9.1f}/s"
+            else:
+                line += ' ' * 12
+            if baseline:
+                change = value / baseline - 1
+                regressed = change > tolerance and value - baseline > MIN_REGRESSION
+                line += f"  baseline {baseline * 1e3:10.2f} ms  {change:+7.1%}{'  ❌' if regressed else ''}"
+                if regressed:
+                    regressions.append((scale, name, change))
+            print(line)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', default=DEFAULT_SCALES, help='comma-separated input multipliers')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', choices=('collect', 'serve'))
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed slowdown against the baseline')
+    parser.add_argument('--update-baseline', action='store_true', help='store these results as the baselines')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--scale', type=int, default=1, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return worker(args)
+
+    results = {}
+    for scale in (int(s) for s in args.scales.split(',')):
+        print(f"Running x{scale}...", file=sys.stderr)
+        results[str(scale)] = run_scale(scale, args)
+
+    baselines = load_baselines()
+    regressions = compare(results, baselines, args.tolerance)
+    if args.update_baseline:
+        baselines['results'].update(results)
+        baselines['machine'] = {'python': platform.python_version(), 'platform': platform.platform(),
+                                'cpus': os.cpu_count()}
+        with open(BASELINES, 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"\nStored baselines for x{', x'.join(results)} in {os.path.relpath(BASELINES, ROOT)}")
+    elif regressions:
+        print(f"\n❌ {len(regressions)} measurements regressed by more than {args.tolerance:.0%}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Benchmark trends24 extraction on the saved page (data/twitter_debug.html).
+
+Compares the previous full html.parser BeautifulSoup tree with the lean
+paths in parsers.parse_trends24 (lxml, and the SoupStrainer fallback), and
+checks that every path extracts the same trends.
+
+    python benchmarks/bench_trends24_parser.py [--page path] [--repeat 10]
+"""
+import os
+import sys
+import time
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bs4 import BeautifulSoup
+from parsers import parse_trends24, HTML_ENGINE
+from normalize import format_tweet_volume
+
+DEFAULT_PAGE = os.path.join(ROOT, 'data', 'twitter_debug.html')
+
+
+def parse_full_soup(html):
+    """The previous get_twitter_trends_from_trends24 extraction"""
+    soup = BeautifulSoup(html, 'html.parser')
+    trends = []
+    for container in soup.select('.list-container')[:2]:
+        for item in container.select('ol li'):
+            trend_span = item.select_one('span.trend-name a')
+            if trend_span:
+                volume = '-'
+                volume_element = item.select_one('.tweet-count')
+                if volume_element and volume_element.text:
+                    volume = volume_element.text.strip()
+                    try:
+                        num = int(volume.replace('k', '000').replace('K', '000').replace('+', '')
+                            .replace(',', '').replace('tweets', '').strip())
+                        volume = f"{num/1000:.1f}k+" if num >= 1000 else str(num)
+                    except ValueError:
+                        volume = '-'
+                trends.append({'name': trend_span.text.strip(), 'volume': volume})
+    return trends
+
+
+def parse_lean(html, engine):
+    """parse_trends24, with volumes formatted the way the previous parser stored them"""
+    trends = parse_trends24(html, engine=engine)
+    for trend in trends:
+        trend['volume'] = format_tweet_volume(trend['volume'])
+    return trends
+
+
+def best_time(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--page', default=DEFAULT_PAGE)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    with open(args.page, 'r', encoding='utf-8', errors='replace') as f:
+        html = f.read()
+    print(f"Page: {len(html) / 1024:.0f} KB, default engine: {HTML_ENGINE}")
+
+    paths = {'full soup (previous)': lambda: parse_full_soup(html)}
+    if HTML_ENGINE == 'lxml':
+        paths['lxml'] = lambda: parse_lean(html, 'lxml')
+    paths['soup + strainer'] = lambda: parse_lean(html, 'soup')
+
+    baseline_time = None
+    outputs = {}
+    for name, func in paths.items():
+        elapsed, trends = best_time(func, args.repeat)
+        outputs[name] = [(t['name'], t['volume']) for t in trends]
+        baseline_time = baseline_time or elapsed
+        print(f"  {name:<22} {elapsed * 1000:8.2f} ms  {baseline_time / elapsed:6.1f}x  {len(trends)} trends")
+
+    reference = outputs['full soup (previous)']
+    mismatched = [name for name, output in outputs.items() if output != reference]
+    if mismatched:
+        print(f"❌ Output differs from the previous parser: {', '.join(mismatched)}")
+        return 1
+    print("✅ All paths extract the same trends")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,33 +1,32 @@
 import os
 import json
 import time
-import requests
+import threading
+from functools import partial
 from datetime import datetime
-from bs4 import BeautifulSoup
 from dotenv import load_dotenv
-from pytrends.request import TrendReq
-import spotipy
-from spotipy.oauth2 import SpotifyClientCredentials
 from zoneinfo import ZoneInfo
-from s3_operations import store_trends_in_s3
+from collection_engine import run_collectors, CollectorSkipped
+from http_client import get_client
+from spotify_source import get_spotify, SpotifyPlaylists
+from parsers import iter_feed_items, parse_trends24
+from normalize import parse_count
+from trend_store import load_trends, trend_file_path, region_dir
+from trend_writer import save_trends, changed_platforms, unpublished_platforms, mark_published, state_dir
+from atomic_files import write_json_atomic, write_if_changed, file_lock
+from correlate import build_topics
+from quota import get_ledger
+from scheduler import refresh_interval
+from regions import DEFAULT_REGION, enabled_regions, region_settings
+from metrics import RUN_SUMMARY_FILE, STAGES
+from platforms import PLATFORMS, platform_names, setting, get_collector, register_collector
 
-from render_ssh_config import setup_git
 load_dotenv()
 
 # Define data directory
 DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
 os.makedirs(DATA_DIR, exist_ok=True)
 
-def format_number(view_count):
-    """Format a number with commas and 'k' for thousands"""
-    if view_count >= 1000000:
-        views = f"{view_count/1000000:.1f}M"
-    elif view_count >= 1000:
-        views = f"{view_count/1000:.1f}k"
-    else:
-        views = str(view_count)
-    return views
- 
 def formatISTDateTime():
     """Format current time to IST using proper timezone"""
     ist_time = datetime.now(ZoneInfo("Asia/Kolkata"))
@@ -42,77 +41,138 @@ def is_english(text):
     except UnicodeEncodeError:
         return False
 
-def collect_all_trends():
-    """Collect trends from all platforms"""
+# Per-platform collection deadlines (seconds)
+PLATFORM_TIMEOUTS = setting('timeout')
+COLLECTION_TIMEOUT = 90
+# Most collectors of one source running at once when fanning out over
+# regions, kept within the HTTP client's per-host connection pool
+SOURCE_CONCURRENCY = setting('concurrency')
+
+def collect_exclusively(platform, region=DEFAULT_REGION):
+    """Run a platform's collector for a region unless another process or
+    thread is already collecting it. The lock is held until the collector
+    returns, even after it missed its deadline."""
+    lock_path = os.path.join(state_dir(region), f'{platform}.collect.lock')
+    with file_lock(lock_path, blocking=False) as acquired:
+        if not acquired:
+            raise CollectorSkipped(f"{PLATFORMS[platform]['name']} ({region}) is already being collected")
+        return get_collector(platform)(region)
+
+def collect_all_trends(platforms=None, regions=None):
+    """Collect trends from all platforms (or just `platforms`) in every
+    enabled region (or just `regions`), all concurrently. Returns
+    {region: {platform: result}}."""
     print("Starting trend collection...")
-    # Add Spotify to the collection process
     os.makedirs(DATA_DIR, exist_ok=True)
-    spotify_success = get_spotify_trends()
-    print(f"Spotify trends collected: {'Success' if spotify_success else 'Failed'}")
-    
-    time.sleep(2)
-    
-    # Collect trends in desired order
-    reddit_success = get_reddit_trends()
-    print(f"Reddit trends collected: {'Success' if reddit_success else 'Failed'}")
-    
-    time.sleep(2)
-    
-    youtube_success = get_youtube_trends()
-    print(f"YouTube trends collected: {'Success' if youtube_success else 'Failed'}")
-    
-    time.sleep(2)
-    
-    news_success = get_news_trends()
-    print(f"News trends collected: {'Success' if news_success else 'Failed'}")
-    
-    time.sleep(2)
-    
-    twitter_success = get_twitter_trends_from_trends24()
-    print(f"Twitter trends collected: {'Success' if twitter_success else 'Failed'}")
-    
-    time.sleep(2)
-    
-    google_success = get_google_trends()
-    print(f"Google trends collected: {'Success' if google_success else 'Failed'}")
-
-    time.sleep(2)
-    
-    print("Trend collection completed!")
-
-
-def get_spotify_trends():
+
+    regions = regions or enabled_regions()
+    sources = {platform: threading.BoundedSemaphore(limit) for platform, limit in SOURCE_CONCURRENCY.items()}
+    collectors = {}
+    slots = {}
+    for region in regions:
+        for platform in (platforms or platform_names()):
+            if region_settings(region, platform) is None:
+                continue
+            collectors[(region, platform)] = partial(collect_exclusively, platform, region)
+            slots[(region, platform)] = sources[platform]
+    run_start = time.time()
+    flat = run_collectors(collectors, PLATFORM_TIMEOUTS, COLLECTION_TIMEOUT, slots=slots)
+
+    results = {}
+    for region in regions:
+        # A successful fetch whose content matched the previous run is a no-op
+        changed = changed_platforms(since=run_start, region=region)
+        results[region] = {}
+        for (result_region, platform), result in flat.items():
+            if result_region != region:
+                continue
+            # A skipped platform's changes belong to the run that collected it
+            result['changed'] = platform in changed and result['status'] != 'skipped'
+            status = 'Success' if result['success'] else result['status'].capitalize()
+            if result['success'] and not result['changed']:
+                status += ', unchanged'
+            print(f"{platform.capitalize()} trends collected ({region}): {status} ({result['elapsed']}s)")
+            results[region][platform] = result
+
+        if changed or not os.path.exists(trend_file_path('topics', region)):
+            update_hot_topics(region)
+
+    print(f"Trend collection completed in {round(time.time() - run_start, 1)}s!")
+    write_run_summary(run_start, results)
+    return results
+
+def write_run_summary(run_start, results):
+    """Write a collection run's per-collector stage timings, response bytes
+    and outcomes to RUN_SUMMARY_FILE (served as gauges on /metrics)"""
+    collectors = [{key: result.get(key) for key in ('region', 'platform', 'status', 'success', 'changed', 'elapsed',
+                                                    'stages', 'requests', 'bytes', 'error')}
+                  for platform_results in results.values() for result in platform_results.values()]
+    totals = {stage: round(sum((c['stages'] or {}).get(stage, 0) for c in collectors), 3) for stage in STAGES}
+    totals.update({
+        'requests': sum(c['requests'] or 0 for c in collectors),
+        'bytes': sum(c['bytes'] or 0 for c in collectors),
+        'succeeded': sum(1 for c in collectors if c['success']),
+        'failed': sum(1 for c in collectors if not c['success'])
+    })
+    summary = {
+        'started_at': run_start,
+        'elapsed': round(time.time() - run_start, 3),
+        'regions': list(results),
+        'totals': totals,
+        'collectors': collectors
+    }
+    try:
+        write_json_atomic(RUN_SUMMARY_FILE, summary)
+    except OSError as e:
+        print(f"⚠️ Could not save run summary: {e}")
+    print(f"📊 Fetch {totals['fetch']}s, parse {totals['parse']}s, write {totals['write']}s, "
+          f"{totals['bytes'] / 1024:.0f} KB in {totals['requests']} requests")
+    return summary
+
+def update_hot_topics(region=DEFAULT_REGION):
+    """Rebuild a region's cross-platform hot topics view from its current trend files"""
+    # Collectors may have rewritten the files within the cache's stat interval
+    trend_data = {platform: load_trends(platform, region, revalidate=True) for platform in platform_names()}
+    topics = build_topics(trend_data)
+    topics['sources'] = {platform: (data or {}).get('last_updated') for platform, data in trend_data.items()}
+    if write_if_changed(trend_file_path('topics', region), json.dumps(topics, ensure_ascii=False, indent=2)):
+        print(f"🔗 Updated hot topics for {region} ({len(topics['topics'])} cross-platform topics)")
+
+def quota_interval(platform):
+    """Seconds between calls on a platform's API key, which every enabled
+    region collecting the platform shares"""
+    regions = [region for region in enabled_regions() if region_settings(region, platform) is not None]
+    return refresh_interval(platform) / max(len(regions), 1)
+
+
+def get_spotify_trends(region=DEFAULT_REGION):
     """Get trending songs from Spotify"""
     try:
-        print("🎵 Fetching Spotify trends...")
+        print(f"🎵 Fetching Spotify trends ({region})...")
         
-        # Auth setup
-        spotify_client_id = os.getenv('SPOTIFY_CLIENT_ID')
-        spotify_client_secret = os.getenv('SPOTIFY_CLIENT_SECRET')
-        
-        if not spotify_client_id or not spotify_client_secret:
+        sp = get_spotify()
+        if sp is None:
             print("⚠️ Spotify credentials not found in environment variables")
-            return use_sample_spotify_data()
-            
-        auth_manager = SpotifyClientCredentials(
-            client_id=spotify_client_id,
-            client_secret=spotify_client_secret
-        )
-        sp = spotipy.Spotify(auth_manager=auth_manager)
+            return use_existing_data('spotify', region)
 
-        queries = ['Bollywood Hits', 'Top Hindi Songs', 'India Trending Music']
+        settings = region_settings(region, 'spotify')
+        playlists = SpotifyPlaylists(sp, cache_file=os.path.join(state_dir(region), 'spotify_cache.json'),
+                                     market=settings['market'])
         trends = []
 
-        for query in queries:
-            results = sp.search(q=query, type='playlist', limit=3)
-            playlists = [p for p in results['playlists']['items'] if p is not None]
+        for query in settings['queries']:
+            playlist_id = playlists.find_playlist(query)
             
-            if playlists:
+            if playlist_id:
                 print(f"✅ Found playlists for: {query}")
-                playlist = playlists[0]
-                tracks = sp.playlist_tracks(playlist['id'])
+                snapshot_id, items = playlists.fetch_items(
+                    playlist_id, skip_unchanged=os.path.exists(trend_file_path('spotify', region)))
+                if items is None:
+                    playlists.save()
+                    print("📭 Playlist unchanged since last run, keeping existing Spotify data")
+                    return use_existing_data('spotify', region)
                 
-                for idx, item in enumerate(tracks['items']):
+                for idx, item in enumerate(items):
                     if item and item['track']:
                         track = item['track']
                         track_data = {
@@ -136,101 +196,84 @@ def get_spotify_trends():
                 'last_updated': formatISTDateTime()
             }
             
-            with open(os.path.join(DATA_DIR, 'spotify_trends.json'), 'w') as f:
-                json.dump(data, f, indent=2)
+            save_trends('spotify', data, region)
+            playlists.mark_fetched(playlist_id, snapshot_id)
+            playlists.save()
                 
-            print("✅ Successfully fetched Spotify trends")
+            print(f"✅ Successfully fetched {len(trends)} Spotify trends")
             return True
             
-        return use_sample_spotify_data()
+        playlists.save()
+        return use_existing_data('spotify', region)
 
     except Exception as e:
         print(f"⚠️ Error fetching Spotify trends: {e}")
-        return use_sample_spotify_data()
+        return use_existing_data('spotify', region)
 
 
-def get_twitter_trends_from_trends24(country='india'):
+def get_twitter_trends_from_trends24(region=DEFAULT_REGION):
     try:
-        print("🐦 Fetching Twitter trends from trends24.in...")
+        print(f"🐦 Fetching Twitter trends from trends24.in ({region})...")
         
-        url = f"https://trends24.in/{country}/"
+        settings = region_settings(region, 'twitter')
+        url = f"https://trends24.in/{settings['slug']}/"
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
         
-        response = requests.get(url, headers=headers, timeout=15)
+        http = get_client()
+        response = http.get(url, headers=headers, timeout=15,
+                            conditional=os.path.exists(trend_file_path('twitter', region)))
+        if response.status_code == 304:
+            print("📭 trends24 page not modified, keeping existing Twitter data")
+            return use_existing_data('twitter', region)
         response.raise_for_status()
         
-        soup = BeautifulSoup(response.text, 'html.parser')
         trends = []
-        
-        # Find first two list containers
-        list_containers = soup.select('.list-container')[:2]
-        print(f"Found {len(list_containers)} list-containers")
-        
-        for container_idx, container in enumerate(list_containers):
-            # Select ordered list items and find trend names
-            trend_items = container.select('ol li')
-            print(f"Found {len(trend_items)} trend items in container {container_idx}")
-            
-            for i, item in enumerate(trend_items):
-                # Find span with class trend-name and get the anchor text
-                trend_span = item.select_one('span.trend-name a')
-                if trend_span:
-                    trend_name = trend_span.text.strip()
-                    trend_url = f"https://twitter.com/search?q={trend_name.replace('#', '%23')}"
-                    
-                    # Look for volume info
-                    volume = '-'
-                    volume_element = item.select_one('.tweet-count')
-                    if volume_element and volume_element.text:
-                        volume = volume_element.text.strip()
-                        try:
-                            num = int(volume.replace('k', '000').replace('K', '000').replace('+', '')
-                                .replace(',', '').replace('tweets', '').strip())
-                            volume = f"{num/1000:.1f}k+" if num >= 1000 else str(num)
-                        except ValueError:
-                            volume = '-'
-                    
-                    if is_english(trend_name):
-                        trends.append({
-                            'rank': len(trends) + 1,
-                            'name': trend_name,
-                            'url': trend_url,
-                            'volume': volume,
-                            'tag': 'trending'
-                        })
+        for trend in parse_trends24(response.text, containers=2):
+            trend_name = trend['name']
+            if not settings['english_only'] or is_english(trend_name):
+                trends.append({
+                    'rank': len(trends) + 1,
+                    'name': trend_name,
+                    'url': f"https://twitter.com/search?q={trend_name.replace('#', '%23')}",
+                    'volume': trend['volume'],
+                    'tag': 'trending'
+                })
+        print(f"Found {len(trends)} {'English ' if settings['english_only'] else ''}trends in the latest trends24 lists")
         
         if not trends:
             print("No trends found in trend-card__list")
-            return use_sample_twitter_data()
+            return use_existing_data('twitter', region)
             
         data = {
             'trends': trends,
             'last_updated': formatISTDateTime()
         }
         
-        with open(os.path.join(DATA_DIR, 'twitter_trends.json'), 'w') as f:
-            json.dump(data, f, indent=2)
+        save_trends('twitter', data, region)
+        http.store_validators(response)
             
         print("✅ Successfully fetched Twitter trends")
         return True
         
     except Exception as e:
         print(f"⚠️ Error fetching Twitter trends: {e}")
-        return use_sample_twitter_data()
+        return use_existing_data('twitter', region)
 
-def get_reddit_trends():
+def get_reddit_trends(region=DEFAULT_REGION):
     """Get trending posts from Reddit"""
     try:
-        print("🔴 Fetching Reddit trends...")
+        print(f"🔴 Fetching Reddit trends ({region})...")
         
+        geo_filter = region_settings(region, 'reddit')['geo_filter']
         url = "https://www.reddit.com/r/popular.json"
         headers = {
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36'
         }
         
-        response = requests.get(url, headers=headers, timeout=10)
+        params = {'geo_filter': geo_filter} if geo_filter else None
+        response = get_client().get(url, headers=headers, params=params, timeout=10)
         response.raise_for_status()
         
         data = response.json()
@@ -254,12 +297,13 @@ def get_reddit_trends():
                 'title': post_data['title'],
                 'url': f"https://reddit.com{post_data['permalink']}",
                 'subreddit': post_data['subreddit'],
-                'score': f"{post_data['score']:,}",
-                'comments': f"{post_data['num_comments']:,}",
+                'score': post_data['score'],
+                'comments': post_data['num_comments'],
                 'description': description,
                 'thumbnail': thumbnail,
                 'author': post_data.get('author', 'unknown'),
-                'created': datetime.fromtimestamp(post_data['created_utc']).strftime('%Y-%m-%d %H:%M:%S')
+                'created': datetime.fromtimestamp(post_data['created_utc']).strftime('%Y-%m-%d %H:%M:%S'),
+                'published': int(post_data['created_utc'])
             })
             
         data = {
@@ -267,28 +311,37 @@ def get_reddit_trends():
             'last_updated': formatISTDateTime()
         }
         
-        with open(os.path.join(DATA_DIR, 'reddit_trends.json'), 'w') as f:
-            json.dump(data, f, indent=2)
+        save_trends('reddit', data, region)
             
         print("✅ Successfully fetched Reddit trends")
         return True
         
     except Exception as e:
         print(f"⚠️ Error fetching Reddit trends: {e}")
-        return use_sample_reddit_data()
+        return use_existing_data('reddit', region)
 
-def get_google_trends():
+def get_google_trends(region=DEFAULT_REGION):
     """Get Google trends using RapidAPI"""
     try:
-        print("📡 Fetching Google trends...")
+        print(f"📡 Fetching Google trends ({region})...")
         
         # Get RapidAPI key from environment variables
         rapid_api_key = os.getenv('RAPID_API_KEY')
+        if not rapid_api_key:
+            print("⚠️ RapidAPI key not found in environment variables")
+            return use_existing_data('google', region)
+
+        ledger = get_ledger()
+        if not ledger.plan('rapidapi_google', rapid_api_key, 1, quota_interval('google')):
+            print(f"⏭️ Skipping Google Trends API to stay within quota "
+                  f"({ledger.describe('rapidapi_google', rapid_api_key)})")
+            return use_existing_data('google', region)
 
         try:
             # RapidAPI Google Realtime Trends Data API endpoint
             # Note: Google Realtime Trends Data API has a limit of 100 requests per month
-            url = "https://google-realtime-trends-data-api.p.rapidapi.com/trends/INDIA"
+            country = region_settings(region, 'google')['country']
+            url = f"https://google-realtime-trends-data-api.p.rapidapi.com/trends/{country}"
             
             headers = {
                 "x-rapidapi-host": "google-realtime-trends-data-api.p.rapidapi.com",
@@ -296,12 +349,14 @@ def get_google_trends():
             }
             
             # Make the request
-            response = requests.get(url, headers=headers, timeout=15)
+            response = get_client().get(url, headers=headers, timeout=15)
+            ledger.spend('rapidapi_google', rapid_api_key)
+            if rapidapi_quota_exceeded(response):
+                ledger.mark_exhausted('rapidapi_google', rapid_api_key)
             response.raise_for_status()
             
             # Save the response for debugging
-            with open(os.path.join(DATA_DIR, 'google_debug_realtime_api.json'), 'w', encoding='utf-8') as f:
-                f.write(response.text)
+            write_if_changed(os.path.join(region_dir(region), 'google_debug_realtime_api.json'), response.text)
             
             data = response.json()
             
@@ -327,60 +382,106 @@ def get_google_trends():
                     'source': 'rapidapi_realtime'
                 }
                 
-                with open(os.path.join(DATA_DIR, 'google_trends.json'), 'w') as f:
-                    json.dump(data, f, indent=2)
+                save_trends('google', data, region)
                 
-                print("✅ Successfully fetched Google trends via RapidAPI Realtime Trends API")
+                print("✅ Successfully fetched Google trends via RapidAPI Realtime Trends API "
+                      f"({ledger.describe('rapidapi_google', rapid_api_key)})")
                 return True
             else:
-                return use_sample_google_data()
+                return use_existing_data('google', region)
         except Exception as e:
             print(f"Error with RapidAPI Realtime Trends API: {e}")
-            return use_sample_google_data()
+            return use_existing_data('google', region)
     except Exception as e:
         print(f"⚠️ Error fetching Google trends: {e}")
-        return use_sample_google_data()
-
-def get_youtube_trends_from_api():
-    """Get YouTube trends using YouTube Data API"""
+        return use_existing_data('google', region)
+
+YOUTUBE_VIDEOS_URL = "https://www.googleapis.com/youtube/v3/videos"
+YOUTUBE_PAGE_SIZE = 50
+# The mostPopular chart holds at most 200 videos; each page costs 1 unit
+YOUTUBE_MAX_PAGES = 4
+# Partial response: only the fields the collector reads
+YOUTUBE_FIELDS = 'nextPageToken,items(id,snippet(title,channelTitle),statistics(viewCount,likeCount))'
+YOUTUBE_QUOTA_REASONS = ('quotaExceeded', 'dailyLimitExceeded')
+
+def youtube_quota_exceeded(response):
+    """True when a YouTube Data API error response is a quota refusal"""
+    if response.status_code != 403:
+        return False
     try:
-        print("🎥 Fetching YouTube trends from Data API...")
-        
-        api_key = os.getenv('YOUTUBE_API_KEY')
-        if not api_key:
-            print("⚠️ YouTube API key not found in environment variables")
-            return False
-            
-        url = "https://www.googleapis.com/youtube/v3/videos"
+        errors = response.json()['error']['errors']
+    except (ValueError, KeyError, TypeError):
+        return False
+    return any(error.get('reason') in YOUTUBE_QUOTA_REASONS for error in errors)
+
+def rapidapi_quota_exceeded(response):
+    """True when RapidAPI refused a call because the plan's quota is used up"""
+    return response.status_code == 429 and 'quota' in response.text.lower()
+
+def fetch_youtube_videos(api_key, max_pages, ledger, region=DEFAULT_REGION):
+    """Fetch up to `max_pages` pages of a region's mostPopular chart,
+    recording the units spent. Stops early at the last page or on a quota
+    refusal."""
+    settings = region_settings(region, 'youtube')
+    videos = []
+    page_token = None
+    for _ in range(max_pages):
         params = {
             "part": "snippet,statistics",
             "chart": "mostPopular",
-            "regionCode": "IN",
-            "maxResults": 30,
-            "hl": "hi",
+            "regionCode": settings['region_code'],
+            "maxResults": YOUTUBE_PAGE_SIZE,
+            "hl": settings['hl'],
+            "fields": YOUTUBE_FIELDS,
             "key": api_key
         }
-        
-        response = requests.get(url, params=params)
+        if page_token:
+            params["pageToken"] = page_token
+
+        response = get_client().get(YOUTUBE_VIDEOS_URL, params=params, timeout=15)
+        ledger.spend('youtube_data', api_key)
+        if youtube_quota_exceeded(response):
+            ledger.mark_exhausted('youtube_data', api_key)
+            print("⚠️ YouTube Data API quota exhausted")
+            break
         response.raise_for_status()
-        
+
         data = response.json()
+        videos.extend(data.get("items", []))
+        page_token = data.get("nextPageToken")
+        if not page_token:
+            break
+    return videos
+
+def get_youtube_trends_from_api(region=DEFAULT_REGION):
+    """Get YouTube trends using YouTube Data API"""
+    try:
+        print(f"🎥 Fetching YouTube trends from Data API ({region})...")
+        
+        api_key = os.getenv('YOUTUBE_API_KEY')
+        if not api_key:
+            print("⚠️ YouTube API key not found in environment variables")
+            return False
+
+        # Go deeper into the chart while the daily budget allows it
+        ledger = get_ledger()
+        pages = ledger.plan('youtube_data', api_key, YOUTUBE_MAX_PAGES, quota_interval('youtube'))
+        if not pages:
+            print(f"⏭️ YouTube Data API quota used up ({ledger.describe('youtube_data', api_key)})")
+            return False
+
+        videos = fetch_youtube_videos(api_key, pages, ledger, region)
+        if not videos:
+            return False
         trends = []
         
-        for i, video in enumerate(data["items"], 1):
-            # Convert view count to human readable format
-            view_count = int(video['statistics']['viewCount'])
-            like_count = int(video['statistics'].get('likeCount', 0))
-            views = format_number(view_count)
-            likes = format_number(like_count)
-            
-                
+        for i, video in enumerate(videos, 1):
             trends.append({
                 'rank': i,
                 'title': video['snippet']['title'],
                 'channel': video['snippet']['channelTitle'],
-                'views': views,
-                'likes': likes,
+                'views': int(video['statistics']['viewCount']),
+                'likes': int(video['statistics'].get('likeCount', 0)),
                 'url': f"https://youtube.com/watch?v={video['id']}",
                 'tag': 'trending'
             })
@@ -390,30 +491,31 @@ def get_youtube_trends_from_api():
             'last_updated': formatISTDateTime()
         }
         
-        with open(os.path.join(DATA_DIR, 'youtube_trends.json'), 'w') as f:
-            json.dump(data, f, indent=2)
+        save_trends('youtube', data, region)
             
-        print("✅ Successfully fetched YouTube trends from Data API")
+        print(f"✅ Successfully fetched {len(trends)} YouTube trends from Data API "
+              f"({ledger.describe('youtube_data', api_key)})")
         return True
         
     except Exception as e:
         print(f"⚠️ Error fetching YouTube trends from Data API: {e}")
         return False
 
-def get_youtube_trends():
+def get_youtube_trends(region=DEFAULT_REGION):
     """Get trending YouTube videos including music"""
     try:
-        print("🎥 Fetching YouTube trends from Data API...")
-        
         # Try YouTube Data API first
-        if get_youtube_trends_from_api():
+        if get_youtube_trends_from_api(region):
             return True
             
         print("⚠️ YouTube Data API failed, trying RapidAPI as fallback...")
         
         # Try RapidAPI as fallback
         rapid_api_key = os.getenv('RAPID_API_KEY')
-        if rapid_api_key:
+        ledger = get_ledger()
+        if rapid_api_key and not ledger.plan('rapidapi_youtube', rapid_api_key, 1, quota_interval('youtube')):
+            print(f"⏭️ RapidAPI YouTube quota used up ({ledger.describe('rapidapi_youtube', rapid_api_key)})")
+        elif rapid_api_key:
             headers = {
                 'Content-Type': 'application/json',
                 'x-rapidapi-host': 'youtube-v41.p.rapidapi.com',
@@ -421,27 +523,29 @@ def get_youtube_trends():
             }
             
             url = "https://youtube-v41.p.rapidapi.com/trending"
-            payload = {"country": "IN"}
+            payload = {"country": region_settings(region, 'youtube')['region_code']}
             
-            response = requests.post(url, headers=headers, json=payload, timeout=15)
+            response = get_client().post(url, headers=headers, json=payload, timeout=15)
+            ledger.spend('rapidapi_youtube', rapid_api_key)
+            if rapidapi_quota_exceeded(response):
+                ledger.mark_exhausted('rapidapi_youtube', rapid_api_key)
             
             if response.status_code == 200:
                 data = response.json()
                 
                 # Save the response for debugging
-                with open(os.path.join(DATA_DIR, 'youtube_debug_api.json'), 'w', encoding='utf-8') as f:
-                    json.dump(data, f, indent=2)
+                write_if_changed(os.path.join(region_dir(region), 'youtube_debug_api.json'), json.dumps(data, indent=2))
                 
                 # Process general trending videos
                 trending_videos = []
                 
-                sorted_data = sorted(data, key=lambda x: float(x['number_of_views'].replace('M', 'e6').replace('k', 'e3')), reverse=True)
+                sorted_data = sorted(data, key=lambda x: parse_count(x.get('number_of_views')) or 0, reverse=True)
                 for i, item in enumerate(sorted_data):
                     video = {
                         'rank': i + 1,
                         'title': item.get('title', f'Video {i+1}'),
                         'channel': item.get('channel', 'Unknown Channel'),
-                        'views': item.get('number_of_views', 'N/A'),
+                        'views': parse_count(item.get('number_of_views')),
                         'url': item.get('link', f"https://youtube.com/watch?v={item.get('video_id', '')}"),
                         'tag': 'trending'
                     }
@@ -455,278 +559,128 @@ def get_youtube_trends():
                         'last_updated': formatISTDateTime()
                     }
                     
-                    with open(os.path.join(DATA_DIR, 'youtube_trends.json'), 'w') as f:
-                        json.dump(data, f, indent=2)
+                    save_trends('youtube', data, region)
                         
                     print(f"✅ Successfully fetched YouTube trends via RapidAPI")
                     return True
-        
+
+        return use_existing_data('youtube', region)
+
     except Exception as e:
         print(f"⚠️ Error fetching YouTube trends: {e}")
-        return use_sample_youtube_data()
+        return use_existing_data('youtube', region)
 
-def get_news_trends():
+def get_news_trends(region=DEFAULT_REGION):
     """Get trending news stories"""
     try:
-        print("📰 Fetching news trends...")
+        print(f"📰 Fetching news trends ({region})...")
         
         url = "https://news.google.com/rss"
         headers = {
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36'
         }
         
-        response = requests.get(url, headers=headers, timeout=10)
+        http = get_client()
+        response = http.get(url, headers=headers, params=region_settings(region, 'news')['params'],
+                            timeout=10, stream=True,
+                            conditional=os.path.exists(trend_file_path('news', region)))
+        if response.status_code == 304:
+            response.close()
+            print("📭 News feed not modified, keeping existing news data")
+            return use_existing_data('news', region)
         response.raise_for_status()
         
-        soup = BeautifulSoup(response.text, 'xml')
-        items = soup.select('item')
-        
-        if not items:
-            print("No news items found")
-            return use_sample_news_data()
-            
-        news = []
-        for i, item in enumerate(items):
-            try:
-                title = item.select_one('title').text
-                link = item.select_one('link').text
-                source = item.select_one('source').text if item.select_one('source') else 'Google News'
-                pub_date = item.select_one('pubDate').text if item.select_one('pubDate') else None
-
-                news.append({
-                    'rank': i + 1,
-                    'title': title,
-                    'url': link,
-                    'source': source,
-                    'pub_date': pub_date,
-                    'tag': 'headline'
-                })
-            except Exception as e:
-                print(f"Error parsing news item {i}: {e}")
-                continue
+        # Stream-parse the feed straight off the socket, one item at a time
+        response.raw.decode_content = True
+        news = parse_news_feed(response.raw)
         
         if not news:
             print("Failed to parse any news items")
-            return use_sample_news_data()
+            return use_existing_data('news', region)
             
         data = {
             'trends': news,
             'last_updated': formatISTDateTime()
         }
         
-        with open(os.path.join(DATA_DIR, 'news_trends.json'), 'w') as f:
-            json.dump(data, f, indent=2)
+        save_trends('news', data, region)
+        http.store_validators(response)
             
         print(f"✅ Successfully fetched {len(news)} news trends")
         return True
         
     except Exception as e:
         print(f"⚠️ Error fetching news trends: {e}")
-        return use_sample_news_data()
-
-def use_sample_spotify_data():
-    """Use sample Spotify data when API fails"""
-    try:
-        with open(os.path.join(DATA_DIR, 'spotify_trends.json'), 'r') as f:
-            data = json.load(f)
-            if data.get('trends'):
-                print("Using existing Spotify data")
-                return True
-            else:
-                print("No existing Spotify data found")
-        return False
-    except Exception as e:
-        print(f"Error using existing Spotify data: {e}")
-        return False
-
-
-def use_sample_twitter_data():
-    """Use sample Twitter data when API fails"""
-    try:
-        # Load existing data and use it if available
-        with open(os.path.join(DATA_DIR, 'twitter_trends.json'), 'r') as f:
-            data = json.load(f)
-            if data.get('trends'):
-                print("Using existing Twitter data")
-                return True
-            else:
-                print("No existing Twitter data found")
-        return False
-    except Exception as e:
-        print(f"Error using existing Twitter data: {e}")
-        return False
-
-def use_sample_reddit_data():
-    """Use sample Reddit data when API fails"""
-    try:
-        # Load existing data and use it if available
-        with open(os.path.join(DATA_DIR, 'reddit_trends.json'), 'r') as f:
-            data = json.load(f)
-            if data.get('trends'):
-                print("Using existing Reddit data")
-                return True
-            else:
-                print("No existing Reddit data found")
-        return False
-    except Exception as e:
-        print(f"Error using existing Reddit data: {e}")
-        return False
-
-def use_sample_google_data():
-    """Use sample Google data when API fails"""
-    try:
-        # Load existing data and use it if available
-        with open(os.path.join(DATA_DIR, 'google_trends.json'), 'r') as f:
-            data = json.load(f)
-            if data.get('trends'):
-                print("Using existing Google data")
-                return True
-            else:
-                print("No existing Google data found")
-        return False
-    except Exception as e:
-        print(f"Error using existing Google data: {e}")
-        return False
-
-def use_sample_youtube_data():
-    """Use sample YouTube data when API fails"""
-    try:
-        # Load existing data and use it if available
-        with open(os.path.join(DATA_DIR, 'youtube_trends.json'), 'r') as f:
-            data = json.load(f)
-            if data.get('trends'):
-                print("Using existing YouTube data")
-                return True
-            else:
-                print("No existing YouTube data found")
-        return False
-    except Exception as e:
-        print(f"Error using existing YouTube data: {e}")
-        return False
-
-def use_sample_news_data():
-    """Use sample news data when API fails"""
-    try:
-        with open(os.path.join(DATA_DIR, 'news_trends.json'), 'r') as f:
-            data = json.load(f)
-            if data.get('trends'):
-                print("Using existing NEWS data")
-                return True
-            else:
-                print("No existing NEWS data found")
-        return False
-    except Exception as e:
-        print(f"Error using existing NEWS data: {e}")
-        return False
-
-def get_top10_spotify_data():
-    """Get Top 10 Spotify data"""
-    try:
-        data = {}
-        with open(os.path.join(DATA_DIR, 'spotify_trends.json'), 'r') as f:
-            data = json.load(f)
-            if data.get('trends'):
-                # first sort in popularity
-                data['trends'] = sorted(data['trends'], key=lambda x: x['popularity'], reverse=True)
-                data['trends'] = data['trends'][:10]
-            else:
-                print("No Spotify data found")
-        return data
-    except Exception as e:
-        print(f"Error using existing Spotify data: {e}")
-
-
-def get_top10_twitter_data():
-    """Get Top 10 Twitter data """
-    try:
-        # Load existing data and use it if available
-        print("Fetching Top 10 Twitter trends...")
-        data = {}
-        with open(os.path.join(DATA_DIR, 'twitter_trends.json'), 'r') as f:
-            data = json.load(f)
-            if data.get('trends'):
-                data['trends'] = data['trends'][:10]
-            else:
-                print("No Twitter data found")
-        print("✅ Successfully fetched Twitter trends")
-        return data
-    except Exception as e:
-        print(f"Error using existing Twitter data: {e}")
-
-def get_top10_youtube_data():
-    """Get Top 10 YouTube data sorted by views"""
-    try:
-        data = {}
-        print("Fetching Top 10 YouTube trends...")
-        with open(os.path.join(DATA_DIR, 'youtube_trends.json'), 'r') as f:
-            data = json.load(f)
-            if data.get('trends'):
-                sorted_trends = sorted(
-                    data['trends'],
-                    key=lambda x: float(x['views'].replace('M', '000000').replace('k', '000')) if isinstance(x['views'], str) and any(c.isdigit() for c in x['views']) else 0,
-                    reverse=True
-                )[:10]
-                data['trends'] = sorted_trends
-            else:
-                print("No YouTube data found")
-        print("✅ YouTube trends fetched successfully")
-        return data
-    except Exception as e:
-        print(f"Error using existing YouTube data: {e}")
-
-def get_top10_google_data():
-    """Get Top 10 Google trends data"""
-    try:
-        data = {}
-        print("Fetching Top 10 Google trends...")
-        with open(os.path.join(DATA_DIR, 'google_trends.json'), 'r') as f:
-            data = json.load(f)
-            if data.get('trends'):
-                # Google trends are already ranked, just take top 10
-                data['trends'] = data['trends'][:10]
-            else:
-                print("No Google data found")
-        print("✅ Google trends fetched successfully")
-        return data
-    except Exception as e:
-        print(f"Error using existing Google data: {e}")
+        return use_existing_data('news', region)
+
+def parse_news_feed(stream):
+    """Parse an RSS/Atom news feed into news trend records"""
+    news = []
+    for i, item in enumerate(iter_feed_items(stream)):
+        if item['title'] is None or item['link'] is None:
+            print(f"Error parsing news item {i}: missing title or link")
+            continue
+        news.append({
+            'rank': i + 1,
+            'title': item['title'],
+            'url': item['link'],
+            'source': item['source'] or 'Google News',
+            'pub_date': item['pub_date'],
+            'published': item['published'],
+            'tag': 'headline'
+        })
+    return news
+
+def use_existing_data(platform, region=DEFAULT_REGION):
+    """Keep a platform's current trend file when collection fails or finds
+    nothing new. Returns True if the file has trends. Reads through the
+    trend store's snapshot cache, which the hot topics rebuild reuses."""
+    name = PLATFORMS[platform]['name']
+    if (load_trends(platform, region) or {}).get('trends'):
+        print(f"Using existing {name} data")
+        return True
+    print(f"No existing {name} data found")
+    return False
+
+# Attach the collectors to the platform registry
+register_collector('twitter', get_twitter_trends_from_trends24)
+register_collector('youtube', get_youtube_trends)
+register_collector('reddit', get_reddit_trends)
+register_collector('google', get_google_trends)
+register_collector('news', get_news_trends)
+register_collector('spotify', get_spotify_trends)
+
+def publish_changes(results):
+    """Upload trend files changed since they were last published to S3 and
+    push them to GitHub. Covers every region in `results`, including changes
+    a timed-out collector wrote after its run ended."""
+    # Publishing dependencies are only needed once something changed
+    from s3_operations import store_trends_in_s3
+    from render_ssh_config import setup_git
+
+    # The scheduler sidecar and web workers may publish at the same time
+    with file_lock(os.path.join(state_dir(), 'publish.lock')):
+        unpublished = {region: unpublished_platforms(region) for region in results}
+        # Trend files relative to data/, so other regions keep their regions/<code>/ prefix
+        changed = [os.path.relpath(trend_file_path(platform, region), DATA_DIR)
+                   for region, platforms in unpublished.items() for platform in platforms]
+        if not changed:
+            print("📭 No platform changed, skipping S3 upload and git push")
+            return False
 
-def get_top10_reddit_data():
-    """Get Top 10 Reddit data sorted by score"""
-    try:
-        data = {}
-        print("Fetching Top 10 Reddit trends...")
-        with open(os.path.join(DATA_DIR, 'reddit_trends.json'), 'r') as f:
-            data = json.load(f)
-            if data.get('trends'):
-                sorted_trends = sorted(
-                    data['trends'],
-                    key=lambda x: int(x['score'].replace(',', '')) if isinstance(x['score'], str) else 0,
-                    reverse=True
-                )[:10]
-                data['trends'] = sorted_trends
-            else:
-                print("No Reddit data found")
-        print("✅ Reddit trends fetched successfully")
-        return data
-    except Exception as e:
-        print(f"Error using existing Reddit data: {e}")
+        # Upload to S3
+        published = True
+        bucket_name = os.getenv('AWS_S3_BUCKET')
+        if bucket_name:
+            published = store_trends_in_s3(DATA_DIR, bucket_name, trend_files=changed)
 
-def get_top10_news_data():
-    """Get Top 10 News data"""
-    try:
-        data = {}
-        print("Fetching Top 10 News trends...")
-        with open(os.path.join(DATA_DIR, 'news_trends.json'), 'r') as f:
-            data = json.load(f)
-            if data.get('trends'):
-                data['trends'] = data['trends'][:10]
-            else:
-                print("No News data found")
-        print("✅ News trends fetched successfully") 
-        return data
-    except Exception as e:
-        print(f"Error using existing News data: {e}")
+        print("🔄 Setting Github and SSH Config...")
+        published = setup_git() and published
+        # Failed uploads are retried by the next publish
+        if published:
+            for region, fingerprints in unpublished.items():
+                mark_published(fingerprints, region)
+    return True
 
 if __name__ == "__main__":
     os.makedirs(DATA_DIR, exist_ok=True)
@@ -735,20 +689,13 @@ if __name__ == "__main__":
         print(f"📡 Starting trend collection at {formatISTDateTime()}...")
         
         # Collect all trends
-        collect_all_trends()
+        results = collect_all_trends()
         
         end_time = time.time()
         print(f"⏱️ Collection completed in {round(end_time - start_time)} seconds")
 
-        # Upload to S3
-        bucket_name = os.getenv('AWS_S3_BUCKET')
-        if bucket_name:
-            store_trends_in_s3(DATA_DIR, bucket_name)
-        
-        print("🔄 Setting Github and SSH Config...")
-        setup_git()
+        publish_changes(results)
             
     except Exception as e:
         print(f"❌ Error during trend collection: {e}")
         exit(1)
-    
\ No newline at end of file
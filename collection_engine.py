@@ -0,0 +1,134 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from metrics import collecting
+
+# Default deadlines (seconds)
+DEFAULT_PLATFORM_TIMEOUT = 45
+DEFAULT_TOTAL_TIMEOUT = 90
+MAX_WORKERS = 64
+
+
+class CollectorSkipped(Exception):
+    """Raised by a collector that didn't run, e.g. because another process
+    is already collecting the same source"""
+
+
+def _describe(key):
+    """Result fields identifying a collector keyed by platform or (region, platform)"""
+    if isinstance(key, tuple):
+        return {'region': key[0], 'platform': key[1]}
+    return {'platform': key}
+
+def _run_collector(key, collector, slot=None, starts=None):
+    """Run a single collector (once its source has a free slot) and time
+    it, with its fetch/parse/write stages"""
+    describe = _describe(key)
+    if slot is not None:
+        slot.acquire()
+    try:
+        started = time.time()
+        if starts is not None:
+            starts[key] = started
+        start = time.perf_counter()
+        with collecting(describe['platform'], describe.get('region')) as timer:
+            skipped = False
+            try:
+                success = bool(collector())
+                error = None
+            except CollectorSkipped as e:
+                success, skipped = False, True
+                error = str(e)
+            except Exception as e:
+                success = False
+                error = str(e)
+    finally:
+        if slot is not None:
+            slot.release()
+    elapsed = time.perf_counter() - start
+    status = 'skipped' if skipped else 'success' if success else ('error' if error else 'failed')
+    return {
+        **describe,
+        'status': status,
+        'success': success,
+        'started_at': started,
+        'elapsed': round(elapsed, 3),
+        'error': error,
+        **timer.finish(elapsed, status)
+    }
+
+
+def _timeout_result(key, started, error):
+    """Build the result for a collector that missed its deadline"""
+    return {
+        **_describe(key),
+        'status': 'timeout',
+        'success': False,
+        'started_at': started,
+        'elapsed': round(time.time() - started, 3),
+        'error': error
+    }
+
+
+def run_collectors(collectors, platform_timeouts=None, total_timeout=DEFAULT_TOTAL_TIMEOUT,
+                   default_timeout=DEFAULT_PLATFORM_TIMEOUT, slots=None):
+    """Run trend collectors concurrently with per-platform and overall deadlines.
+
+    `collectors` maps a platform name, or a (region, platform) pair, to a
+    zero-argument callable returning True/False, or raising CollectorSkipped.
+    Returns a dict of key -> result dict with status, success flag, start
+    time and elapsed seconds.
+
+    `slots` optionally maps a key to a semaphore shared by every collector
+    hitting the same source, capping how many run against it at once. A
+    collector's platform deadline starts when it gets its slot.
+
+    Threads cannot be killed, so a collector that misses its deadline is
+    reported as 'timeout' and left to finish in the background; its own
+    network timeouts bound how long it can linger.
+    """
+    platform_timeouts = platform_timeouts or {}
+    slots = slots or {}
+    results = {}
+    if not collectors:
+        return results
+
+    run_start = time.time()
+    run_deadline = run_start + total_timeout
+    starts = {}
+
+    def deadline(key):
+        # Collectors still waiting for a slot only have the overall deadline
+        if key not in starts:
+            return run_deadline
+        timeout = platform_timeouts.get(_describe(key)['platform'], default_timeout)
+        return min(starts[key] + timeout, run_deadline)
+
+    executor = ThreadPoolExecutor(max_workers=min(len(collectors), MAX_WORKERS), thread_name_prefix='collector')
+    try:
+        futures = {}
+        for key, collector in collectors.items():
+            future = executor.submit(_run_collector, key, collector, slots.get(key), starts)
+            futures[future] = key
+
+        pending = set(futures)
+        while pending:
+            # Wake at least once a second to pick up deadlines of newly started collectors
+            next_deadline = min(min(deadline(futures[f]) for f in pending), time.time() + 1)
+            done, pending = wait(pending, timeout=max(0, next_deadline - time.time()),
+                                 return_when=FIRST_COMPLETED)
+            for future in done:
+                key = futures[future]
+                results[key] = future.result()
+
+            now = time.time()
+            for future in list(pending):
+                key = futures[future]
+                if now >= deadline(key):
+                    pending.discard(future)
+                    future.cancel()
+                    reason = 'overall deadline exceeded' if deadline(key) >= run_deadline else 'platform deadline exceeded'
+                    results[key] = _timeout_result(key, starts.get(key, run_start), reason)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return {key: results[key] for key in collectors}
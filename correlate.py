@@ -0,0 +1,149 @@
+"""Cross-platform trend correlation.
+
+Clusters trends that are about the same story across platforms (a Twitter
+hashtag, a Google keyword, a News headline, a Reddit title) and ranks the
+clusters by how many sources they appear in. Built once per collection
+into data/hot_topics.json, so serving the view is a cached file read.
+
+Titles are reduced to weighted tokens: hashtags are split on case and
+digit boundaries, adjacent tokens are also joined ("asia cup" ->
+"asiacup") so lowercase hashtags match, and tokens are IDF-weighted over
+all current trends. An inverted index over the tokens gives each trend
+its candidate matches; a pair matches when the tokens they share carry
+most of the weight of the shorter title (weighted overlap coefficient).
+"""
+import re
+import math
+from collections import defaultdict
+from platforms import platform_names, setting
+
+PLATFORMS = tuple(platform_names())
+# Whose title best describes a topic, most descriptive first
+TITLE_PREFERENCE = tuple(sorted(PLATFORMS, key=setting('title_preference').get))
+
+MIN_SIMILARITY = 0.6
+# A match must share at least this much IDF weight, so one mid-frequency
+# word can't join two unrelated titles
+MIN_SHARED_WEIGHT = 3.0
+# Tokens in more than this fraction of all trends are too common to index
+MAX_DOC_FREQUENCY = 0.05
+TOP_TOPICS = 50
+
+STOPWORDS = frozenset("""
+a an the and or but of to in on at by for with from as is are was were be been
+it its this that these those he she they we you i his her their our your after
+before over under into out up down new says say said how why what who when
+will can has have had not no vs via amp official video full song songs
+""".split())
+
+_CAMEL_RE = re.compile(r'(?<=[a-z])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])|(?<=[A-Za-z])(?=[0-9])|(?<=[0-9])(?=[A-Za-z])')
+_TOKEN_RE = re.compile(r'[^\W_]+')
+# "Headline - Publisher" suffix on Google News titles
+_NEWS_SOURCE_RE = re.compile(r'\s+-\s+[^-]+$')
+
+
+def trend_title(platform, trend):
+    title = trend.get('title') or trend.get('name') or ''
+    if platform == 'news':
+        title = _NEWS_SOURCE_RE.sub('', title)
+    return title
+
+def tokenize(title):
+    """Return the set of match tokens for a title"""
+    words = []
+    for word in _TOKEN_RE.findall(title.replace("'s ", ' ').replace('’s ', ' ')):
+        for part in _CAMEL_RE.split(word):
+            part = part.lower()
+            if len(part) > 1 and part not in STOPWORDS:
+                words.append(part)
+    tokens = set(words)
+    tokens.update(a + b for a, b in zip(words, words[1:]))
+    return tokens
+
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+def build_topics(trend_data, top=TOP_TOPICS):
+    """Cluster trends across platforms.
+
+    `trend_data` maps platform -> trend payload (as returned by the trend
+    store). Returns {'topics': [...], 'index': {token: [topic indexes]}},
+    topics ranked by number of platforms, then by how highly their
+    members rank on each platform.
+    """
+    docs = []
+    for platform in PLATFORMS:
+        payload = trend_data.get(platform) or {}
+        for position, trend in enumerate(payload.get('trends') or []):
+            title = trend_title(platform, trend)
+            tokens = tokenize(title)
+            if tokens:
+                docs.append({
+                    'platform': platform,
+                    'rank': trend.get('rank') or position + 1,
+                    'title': title,
+                    'url': trend.get('url'),
+                    'tokens': tokens
+                })
+    if not docs:
+        return {'topics': [], 'index': {}}
+
+    postings = defaultdict(list)
+    for i, doc in enumerate(docs):
+        for token in doc['tokens']:
+            postings[token].append(i)
+    max_df = max(2, int(len(docs) * MAX_DOC_FREQUENCY))
+    weight = {token: math.log(len(docs) / len(ids)) for token, ids in postings.items()}
+    totals = [sum(weight[t] for t in doc['tokens']) for doc in docs]
+
+    parent = list(range(len(docs)))
+    for i, doc in enumerate(docs):
+        shared = defaultdict(float)
+        for token in doc['tokens']:
+            ids = postings[token]
+            if len(ids) > max_df:
+                continue
+            for j in ids:
+                if j > i:
+                    shared[j] += weight[token]
+        for j, overlap in shared.items():
+            if overlap >= MIN_SHARED_WEIGHT and overlap / min(totals[i], totals[j]) >= MIN_SIMILARITY:
+                parent[_find(parent, j)] = _find(parent, i)
+
+    clusters = defaultdict(list)
+    for i in range(len(docs)):
+        clusters[_find(parent, i)].append(docs[i])
+
+    topics = []
+    for members in clusters.values():
+        platforms = sorted({m['platform'] for m in members}, key=PLATFORMS.index)
+        if len(platforms) < 2:
+            continue
+        common = set.intersection(*(m['tokens'] for m in members))
+        keywords = sorted((t for t in common if len(postings[t]) <= max_df), key=lambda t: -weight[t])
+        lead = min(members, key=lambda m: (TITLE_PREFERENCE.index(m['platform']), m['rank']))
+        topics.append({
+            'title': lead['title'],
+            'url': lead['url'],
+            'platforms': platforms,
+            'source_count': len(platforms),
+            'score': round(sum(1 / m['rank'] for m in members), 4),
+            'keywords': keywords[:5],
+            'trends': [{'platform': m['platform'], 'rank': m['rank'], 'title': m['title'], 'url': m['url']}
+                       for m in sorted(members, key=lambda m: (PLATFORMS.index(m['platform']), m['rank']))]
+        })
+
+    topics.sort(key=lambda t: (-t['source_count'], -t['score']))
+    topics = topics[:top]
+    for i, topic in enumerate(topics, 1):
+        topic['rank'] = i
+
+    index = defaultdict(list)
+    for i, topic in enumerate(topics):
+        for token in set().union(*(tokenize(t['title']) for t in topic['trends'])):
+            index[token].append(i)
+    return {'topics': topics, 'index': dict(index)}
@@ -0,0 +1,216 @@
+"""Per-host rate limits and circuit breakers for the collectors' requests.
+
+Every request on the shared HTTP session goes through HostGuard first:
+
+- A token bucket per host (or per URL, for sources whose limit is per page)
+  refills at the host's rate. A request waits for a token when one is due
+  within MAX_WAIT seconds, and is refused with RateLimited otherwise.
+- A circuit breaker per host opens after FAILURE_THRESHOLD consecutive
+  failures (connection errors, timeouts, 429 and 5xx responses). While it
+  is open, requests fail at once with CircuitOpen instead of waiting out
+  the timeout, so collectors fall straight back to their existing data.
+  After the cooldown a single half-open probe is let through; its success
+  closes the breaker, its failure opens it for another cooldown.
+
+State lives in a small SQLite database in data/.state/, so the limits hold
+across the scheduler, the web worker and one-off collection runs.
+"""
+import os
+import time
+import sqlite3
+import threading
+from datetime import datetime
+from urllib.parse import urlsplit
+import requests
+
+HOSTS_DB = os.path.join(os.path.dirname(__file__), 'data', '.state', 'hosts.db')
+
+# Token buckets: `rate` requests per second refilling up to `burst`.
+# per_url buckets are kept per page/feed (host + path + query).
+HOST_LIMITS = {
+    # Recommended: 1 request every 5 minutes per trends24 page
+    'trends24.in': {'rate': 1 / 300, 'burst': 1, 'per_url': True},
+    # 30 requests/minute without OAuth
+    'www.reddit.com': {'rate': 30 / 60, 'burst': 30},
+    # 5 requests/second on the RapidAPI plans
+    'google-realtime-trends-data-api.p.rapidapi.com': {'rate': 5, 'burst': 5},
+    'youtube-v41.p.rapidapi.com': {'rate': 5, 'burst': 5},
+    # Recommended: 15 minute intervals per feed
+    'news.google.com': {'rate': 1 / 900, 'burst': 1, 'per_url': True}
+}
+# Longest a request waits for a token before giving up
+MAX_WAIT = 5
+FAILURE_THRESHOLD = 3
+# Seconds an open breaker waits before letting a probe through
+COOLDOWN = 300
+# A probe that hasn't reported back by then is presumed lost
+PROBE_TIMEOUT = 60
+FAILURE_STATUSES = (429, 500, 502, 503, 504)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    bucket TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS breakers (
+    host TEXT PRIMARY KEY,
+    state TEXT NOT NULL DEFAULT 'closed',
+    failures INTEGER NOT NULL DEFAULT 0,
+    opened_at REAL,
+    probe_at REAL
+);
+"""
+
+
+class HostUnavailable(requests.RequestException):
+    """A request refused before it was sent"""
+
+
+class RateLimited(HostUnavailable):
+    pass
+
+
+class CircuitOpen(HostUnavailable):
+    pass
+
+
+def _clock(epoch):
+    return datetime.fromtimestamp(epoch).strftime('%H:%M:%S')
+
+
+class HostGuard:
+    """Rate limits and circuit breakers per host, shared across processes"""
+
+    def __init__(self, db_path=HOSTS_DB, limits=None, max_wait=MAX_WAIT,
+                 failure_threshold=FAILURE_THRESHOLD, cooldown=COOLDOWN):
+        self.db_path = db_path
+        self.limits = HOST_LIMITS if limits is None else limits
+        self.max_wait = max_wait
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._local = threading.local()
+
+    def _connect(self):
+        """Return this thread's connection, in autocommit mode so each
+        read-modify-write runs in its own BEGIN IMMEDIATE transaction"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self, update):
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            result = update(conn)
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+        return result
+
+    def _take_token(self, bucket, limit, now):
+        """Take a token if one is available; otherwise return seconds until one is"""
+        def update(conn):
+            row = conn.execute('SELECT tokens, updated_at FROM buckets WHERE bucket = ?', (bucket,)).fetchone()
+            tokens = limit['burst'] if row is None else min(
+                limit['burst'], row[0] + max(now - row[1], 0) * limit['rate'])
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / limit['rate']
+            if not wait:
+                tokens -= 1
+            conn.execute('INSERT OR REPLACE INTO buckets (bucket, tokens, updated_at) VALUES (?, ?, ?)',
+                         (bucket, tokens, now))
+            return wait
+        return self._transaction(update)
+
+    def acquire(self, url, take_token=True):
+        """Check the breaker and take a rate-limit token for a request to `url`
+        (retries pass take_token=False and only check the breaker). Raises
+        CircuitOpen or RateLimited instead of sending it."""
+        parts = urlsplit(url)
+        host = parts.hostname or ''
+        self._admit(host, time.time())
+        limit = self.limits.get(host)
+        if not limit or not take_token:
+            return
+        bucket = f"{host}{parts.path}?{parts.query}" if limit.get('per_url') else host
+        while True:
+            now = time.time()
+            wait = self._take_token(bucket, limit, now)
+            if not wait:
+                return
+            if wait > self.max_wait:
+                raise RateLimited(f"{host} rate limit reached, next request allowed at {_clock(now + wait)}")
+            time.sleep(wait)
+
+    def _admit(self, host, now):
+        """Let a request through a closed breaker, or as an open breaker's probe"""
+        def update(conn):
+            row = conn.execute('SELECT state, opened_at, probe_at FROM breakers WHERE host = ?', (host,)).fetchone()
+            if row is None or row[0] == 'closed':
+                return None
+            state, opened_at, probe_at = row
+            # Open: wait out the cooldown. Half-open: wait for the probe in flight.
+            retry_at = opened_at + self.cooldown if state == 'open' else probe_at + PROBE_TIMEOUT
+            if now < retry_at:
+                return retry_at
+            conn.execute("UPDATE breakers SET state = 'half_open', probe_at = ? WHERE host = ?", (now, host))
+            return None
+        retry_at = self._transaction(update)
+        if retry_at is not None:
+            raise CircuitOpen(f"{host} is failing, circuit open until {_clock(retry_at)}")
+
+    def record(self, url, ok):
+        """Record a request's outcome on its host's breaker"""
+        host = urlsplit(url).hostname or ''
+        now = time.time()
+
+        def update(conn):
+            row = conn.execute('SELECT state, failures FROM breakers WHERE host = ?', (host,)).fetchone()
+            if ok:
+                if row is not None and (row[0] != 'closed' or row[1]):
+                    conn.execute("UPDATE breakers SET state = 'closed', failures = 0, opened_at = NULL, "
+                                 "probe_at = NULL WHERE host = ?", (host,))
+                    return row[0] != 'closed'
+                return False
+            state, failures = row if row is not None else ('closed', 0)
+            failures += 1
+            if state == 'half_open' or failures >= self.failure_threshold:
+                conn.execute("INSERT OR REPLACE INTO breakers (host, state, failures, opened_at, probe_at) "
+                             "VALUES (?, 'open', ?, ?, NULL)", (host, failures, now))
+                return state != 'open'
+            conn.execute("INSERT OR REPLACE INTO breakers (host, state, failures) VALUES (?, ?, ?)",
+                         (host, state, failures))
+            return False
+        if self._transaction(update):
+            print(f"🔌 Circuit for {host} {'closed' if ok else 'opened'}")
+
+    def status(self):
+        """Breaker state of every host that has failed"""
+        rows = self._connect().execute('SELECT host, state, failures, opened_at FROM breakers').fetchall()
+        return {host: {'state': state, 'failures': failures, 'opened_at': opened_at}
+                for host, state, failures, opened_at in rows}
+
+
+_guard = None
+_guard_lock = threading.Lock()
+
+def get_guard():
+    """Return the process-wide host guard"""
+    global _guard
+    if _guard is None:
+        with _guard_lock:
+            if _guard is None:
+                _guard = HostGuard()
+    return _guard
+
+def set_guard(guard):
+    """Replace the process-wide host guard (e.g. with one on a scratch database)"""
+    global _guard
+    with _guard_lock:
+        _guard = guard
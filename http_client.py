@@ -0,0 +1,237 @@
+import os
+import json
+import time
+import threading
+from urllib.parse import urlsplit, urlunsplit, urlencode
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError
+from urllib3.util.retry import Retry
+from atomic_files import write_json_atomic
+from host_guard import get_guard, HostUnavailable, FAILURE_STATUSES
+from metrics import record_response
+
+STATE_DIR = os.path.join(os.path.dirname(__file__), 'data', '.state')
+VALIDATORS_FILE = os.path.join(STATE_DIR, 'http_validators.json')
+
+# (connect, read) timeout in seconds for every request that doesn't set one
+DEFAULT_TIMEOUT = (5, 15)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Longest Retry-After (seconds) a retry waits out, well inside the
+# platform deadlines; a response asking for longer is returned as is
+MAX_RETRY_AFTER = 10
+
+
+class GuardedAdapter(HTTPAdapter):
+    """Connection pool adapter that passes every request (the collectors'
+    and spotipy's) through the host guard's rate limits and breakers.
+
+    Retries run here rather than inside urllib3, so every attempt counts
+    towards the host's breaker. Only the first attempt takes a rate-limit
+    token: a retry of a feed allowed one request per 15 minutes could
+    otherwise never go out.
+    """
+
+    def __init__(self, guard=None, retry=None, max_retry_after=MAX_RETRY_AFTER, **kwargs):
+        self.guard = guard
+        self.retry = retry or Retry(0, read=False)
+        self.max_retry_after = max_retry_after
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        guard = self.guard or get_guard()
+        retry = self.retry
+        # The previous attempt's failure: a response or an exception
+        failed = None
+        while True:
+            try:
+                guard.acquire(request.url, take_token=failed is None)
+            except HostUnavailable:
+                # A breaker the earlier attempts opened ends the retries;
+                # report what actually went wrong
+                if isinstance(failed, Exception):
+                    raise failed from None
+                if failed is not None:
+                    return failed
+                raise
+            if failed is not None and not isinstance(failed, Exception):
+                failed.close()
+            try:
+                response = super().send(request, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                guard.record(request.url, ok=False)
+                try:
+                    retry = retry.increment(request.method, request.url, error=_urllib3_error(e))
+                except Exception:
+                    raise e from None
+                retry.sleep()
+                failed = e
+                continue
+
+            guard.record(request.url, ok=response.status_code not in FAILURE_STATUSES)
+            if not retry.is_retry(request.method, response.status_code, 'Retry-After' in response.headers):
+                return response
+            retry_after = retry.get_retry_after(response.raw) if retry.respect_retry_after_header else None
+            if retry_after is not None and retry_after > self.max_retry_after:
+                return response
+            try:
+                retry = retry.increment(request.method, request.url, response=response.raw)
+            except MaxRetryError:
+                return response
+            retry.sleep(response.raw)
+            failed = response
+
+
+def _urllib3_error(error):
+    """The urllib3 exception behind a requests exception, which Retry uses to
+    tell connect errors from read errors"""
+    cause = error.args[0] if error.args else error
+    return getattr(cause, 'reason', cause) if isinstance(cause, MaxRetryError) else cause
+
+
+class MeteredSession(requests.Session):
+    """Session that adds each request's time, including reading the body,
+    and body size to the fetch stage of the collector run on this thread"""
+
+    def request(self, method, url, *args, **kwargs):
+        start = time.perf_counter()
+        response = None
+        try:
+            response = super().request(method, url, *args, **kwargs)
+            return response
+        finally:
+            if response is None:
+                size = 0
+            elif kwargs.get('stream'):
+                # Streamed bodies are read while parsing; count what the server declared
+                size = int(response.headers.get('Content-Length') or 0)
+            else:
+                size = len(response.content)
+            record_response(time.perf_counter() - start, size)
+
+
+class HttpClient:
+    """Shared HTTP client for the collectors.
+
+    One requests.Session with a connection pool per host (keep-alive across
+    calls), bounded retries with jittered exponential backoff (waiting out
+    a Retry-After of up to MAX_RETRY_AFTER seconds), a default timeout,
+    and ETag/Last-Modified validators persisted between runs so unchanged
+    feeds come back as 304. Requests, and each of their retries,
+    pass through `guard` (the process-wide HostGuard by default) for
+    per-host rate limits and circuit breakers.
+
+    `host_overrides` maps a hostname to a base URL (e.g. a local fake server)
+    that requests for that host are sent to instead.
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, retries=2, backoff_factor=0.5, backoff_jitter=0.5,
+                 pool_maxsize=10, validators_file=VALIDATORS_FILE, host_overrides=None, guard=None):
+        self.timeout = timeout
+        self.validators_file = validators_file
+        self.host_overrides = host_overrides or {}
+        self._validators = None
+        self._lock = threading.Lock()
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            backoff_jitter=backoff_jitter,
+            status_forcelist=RETRY_STATUSES,
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = GuardedAdapter(guard, retry, pool_connections=20, pool_maxsize=pool_maxsize)
+        self.session = MeteredSession()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _resolve(self, url):
+        """Apply host overrides to a URL"""
+        parts = urlsplit(url)
+        base = self.host_overrides.get(parts.hostname)
+        if not base:
+            return url
+        base_parts = urlsplit(base)
+        return urlunsplit((base_parts.scheme, base_parts.netloc, parts.path, parts.query, parts.fragment))
+
+    def _load_validators(self):
+        if self._validators is None:
+            try:
+                with open(self.validators_file, 'r') as f:
+                    self._validators = json.load(f)
+            except (OSError, ValueError):
+                self._validators = {}
+        return self._validators
+
+    @staticmethod
+    def _validator_key(url, params=None):
+        if params:
+            # Don't key (or persist) API keys
+            params = {k: v for k, v in params.items() if k != 'key'}
+            return f"{url}?{urlencode(sorted(params.items()))}"
+        return url
+
+    def request(self, method, url, conditional=False, **kwargs):
+        """Send a request. With conditional=True, stored validators for the URL
+        are sent as If-None-Match/If-Modified-Since and a 304 may come back."""
+        kwargs.setdefault('timeout', self.timeout)
+        if conditional:
+            key = self._validator_key(url, kwargs.get('params'))
+            with self._lock:
+                validators = self._load_validators().get(key, {})
+            headers = dict(kwargs.pop('headers', None) or {})
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+            kwargs['headers'] = headers
+
+        response = self.session.request(method, self._resolve(url), **kwargs)
+        if conditional:
+            response.validator_key = key
+        return response
+
+    def get(self, url, conditional=False, **kwargs):
+        return self.request('GET', url, conditional=conditional, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def store_validators(self, response):
+        """Remember a response's ETag/Last-Modified for the next conditional
+        request. Call only once the response has been processed successfully."""
+        key = getattr(response, 'validator_key', None)
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not key or not (etag or last_modified):
+            return
+        with self._lock:
+            validators = self._load_validators()
+            validators[key] = {'etag': etag, 'last_modified': last_modified}
+            try:
+                write_json_atomic(self.validators_file, validators)
+            except OSError as e:
+                print(f"⚠️ Could not save HTTP validators: {e}")
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """Return the process-wide HTTP client, creating it on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient()
+    return _client
+
+def set_client(client):
+    """Replace the process-wide HTTP client (e.g. with one pointed at a fake server)"""
+    global _client
+    with _client_lock:
+        _client = client
@@ -0,0 +1,302 @@
+"""Timing metrics, Prometheus exposition and rate-limited logging.
+
+Histograms and counters are kept in process and rendered in the Prometheus
+text format by `render_prometheus()`, which also runs any registered
+callbacks (e.g. the snapshot cache counters and the last collection run).
+
+Collectors are timed per stage. While a collector runs inside
+`collecting()`, the shared HTTP session adds each request's time and body
+size to its 'fetch' stage, and functions decorated with `@timed('write')`
+add to 'write'. 'parse' is the rest of the collector's time: parsing the
+response and building the trend records.
+
+Only the standard library is used, so the web process can import this.
+"""
+import os
+import time
+import json
+import bisect
+import logging
+import threading
+import functools
+from contextlib import contextmanager
+
+RUN_SUMMARY_FILE = os.path.join(os.path.dirname(__file__), 'data', '.state', 'last_run.json')
+
+# Seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# 1 KB to 16 MB, by factors of 4
+BYTE_BUCKETS = tuple(1024 * 4 ** i for i in range(8))
+STAGES = ('fetch', 'parse', 'write')
+
+# Log records with the same logger, level and message let through per interval
+LOG_BURST = 5
+LOG_INTERVAL = 60
+
+_metrics = []
+_callbacks = []
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for v in values)
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(names, escaped)) + '}'
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter per label set"""
+
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def lines(self):
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} counter'
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            yield f'{self.name}{_labels(self.labels, label_values)} {_number(value)}'
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set"""
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0}
+            series['counts'][index] += 1
+            series['sum'] += value
+
+    def lines(self):
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} histogram'
+        with self._lock:
+            series = sorted((labels, list(s['counts']), s['sum']) for labels, s in self._series.items())
+        names = self.labels + ('le',)
+        for label_values, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                yield f'{self.name}_bucket{_labels(names, label_values + (bound,))} {cumulative}'
+            yield f'{self.name}_sum{_labels(self.labels, label_values)} {total!r}'
+            yield f'{self.name}_count{_labels(self.labels, label_values)} {cumulative}'
+
+
+def gauge_lines(name, help, samples, labels=(), kind='gauge'):
+    """Exposition lines for a metric computed at scrape time from
+    [(label_values, value), ...]"""
+    yield f'# HELP {name} {help}'
+    yield f'# TYPE {name} {kind}'
+    for label_values, value in samples:
+        yield f'{name}{_labels(labels, label_values)} {_number(value)}'
+
+def register_callback(callback):
+    """Add a callable returning exposition lines to every scrape"""
+    _callbacks.append(callback)
+
+def render_prometheus():
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.lines())
+    for callback in _callbacks:
+        try:
+            lines.extend(callback())
+        except Exception as e:
+            get_logger(__name__).warning('Metrics callback %s failed: %s', getattr(callback, '__name__', callback), e)
+    return '\n'.join(lines) + '\n'
+
+
+REQUEST_SECONDS = Histogram('trend_http_request_seconds', 'Flask request latency by route',
+                            ('route', 'method', 'status'))
+CACHE_LOOKUPS = Counter('trend_cache_lookups_total', 'Read path cache lookups by cache and result',
+                        ('cache', 'result'))
+STAGE_SECONDS = Histogram('trend_collector_stage_seconds', 'Collector time per run by platform and stage',
+                          ('platform', 'stage'))
+RESPONSE_BYTES = Histogram('trend_collector_response_bytes', 'HTTP response body size by platform',
+                           ('platform',), buckets=BYTE_BUCKETS)
+COLLECTOR_RUNS = Counter('trend_collector_runs_total', 'Collector runs by platform and status',
+                         ('platform', 'status'))
+
+
+class CollectionTimer:
+    """Stage times and response bytes of one collector run"""
+
+    def __init__(self, platform, region=None):
+        self.platform = platform
+        self.region = region
+        self.stages = {'fetch': 0.0, 'write': 0.0}
+        self.requests = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def add_response(self, seconds, nbytes):
+        with self._lock:
+            self.stages['fetch'] += seconds
+            self.requests += 1
+            self.bytes += nbytes
+        RESPONSE_BYTES.observe(nbytes, self.platform)
+
+    def finish(self, elapsed, status):
+        """Record the run in the stage histograms and return its summary"""
+        stages = dict(self.stages)
+        # Concurrent page fetches can add up to more than the wall time
+        stages['parse'] = max(elapsed - stages['fetch'] - stages['write'], 0.0)
+        for stage in STAGES:
+            STAGE_SECONDS.observe(stages[stage], self.platform, stage)
+        COLLECTOR_RUNS.inc(self.platform, status)
+        return {'stages': {stage: round(stages[stage], 4) for stage in STAGES},
+                'requests': self.requests, 'bytes': self.bytes}
+
+
+_local = threading.local()
+
+def current_collection():
+    """The CollectionTimer of the collector running on this thread, or None"""
+    return getattr(_local, 'collection', None)
+
+@contextmanager
+def collecting(platform, region=None):
+    """Attribute requests and timed stages on this thread to a collector run"""
+    previous = current_collection()
+    _local.collection = timer = CollectionTimer(platform, region)
+    try:
+        yield timer
+    finally:
+        _local.collection = previous
+
+def bind_collection(fn):
+    """Wrap `fn` so it counts towards this thread's collector run when
+    called on another thread (e.g. a page-fetching pool)"""
+    timer = current_collection()
+    if timer is None:
+        return fn
+
+    @functools.wraps(fn)
+    def bound(*args, **kwargs):
+        previous = current_collection()
+        _local.collection = timer
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _local.collection = previous
+    return bound
+
+def timed(stage):
+    """Decorator adding a function's time to a stage of the current collector run"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            timer = current_collection()
+            if timer is None:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                timer.add(stage, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+def record_response(seconds, nbytes):
+    """Add an HTTP request to the current collector run, if any"""
+    timer = current_collection()
+    if timer is not None:
+        timer.add_response(seconds, nbytes)
+
+
+def last_run_lines():
+    """Gauges from the last collection run's summary (written by whichever
+    process collected)"""
+    try:
+        with open(RUN_SUMMARY_FILE, 'r') as f:
+            summary = json.load(f)
+    except (OSError, ValueError):
+        return
+    yield from gauge_lines('trend_last_run_timestamp_seconds', 'Start of the last collection run',
+                           [((), summary['started_at'])])
+    yield from gauge_lines('trend_last_run_seconds', 'Wall time of the last collection run',
+                           [((), summary['elapsed'])])
+    collectors = summary.get('collectors', [])
+    yield from gauge_lines('trend_last_run_success', 'Whether each collector succeeded in the last run',
+                           [((c['region'], c['platform']), int(c['success'])) for c in collectors],
+                           ('region', 'platform'))
+    yield from gauge_lines('trend_last_run_stage_seconds', 'Collector stage times in the last run',
+                           [((c['region'], c['platform'], stage), seconds)
+                            for c in collectors for stage, seconds in (c.get('stages') or {}).items()],
+                           ('region', 'platform', 'stage'))
+    yield from gauge_lines('trend_last_run_response_bytes', 'Response bytes per collector in the last run',
+                           [((c['region'], c['platform']), c.get('bytes') or 0) for c in collectors],
+                           ('region', 'platform'))
+
+register_callback(last_run_lines)
+
+
+class RateLimitFilter(logging.Filter):
+    """Let through at most `burst` records with the same logger, level and
+    message template per `interval` seconds. The next record let through
+    says how many were dropped."""
+
+    def __init__(self, burst=LOG_BURST, interval=LOG_INTERVAL):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            started, count, dropped = self._windows.get(key, (now, 0, 0))
+            if now - started >= self.interval:
+                started, count = now, 0
+            if count >= self.burst:
+                self._windows[key] = (started, count, dropped + 1)
+                return False
+            self._windows[key] = (started, count + 1, 0)
+        if dropped:
+            record.msg = f'{record.msg} ({dropped} similar messages suppressed)'
+        return True
+
+_log_filter = RateLimitFilter()
+
+def get_logger(name):
+    """A logger whose records are rate-limited per message template"""
+    logger = logging.getLogger(name)
+    if _log_filter not in logger.filters:
+        logger.addFilter(_log_filter)
+    return logger
+
+def configure_logging():
+    """Log to stderr at LOG_LEVEL (default INFO) unless logging is already set up"""
+    logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO').upper(),
+                        format='%(asctime)s %(levelname)s %(name)s: %(message)s')
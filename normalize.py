@@ -0,0 +1,127 @@
+import re
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from zoneinfo import ZoneInfo
+from platforms import PLATFORMS, setting
+
+_COUNT_RE = re.compile(r'(\d+(?:\.\d+)?)\s*([kKmMbB]?)')
+_MULTIPLIERS = {'': 1, 'k': 1000, 'm': 1000000, 'b': 1000000000}
+IST = ZoneInfo("Asia/Kolkata")
+
+# Numeric fields of the canonical trend record, per platform
+NUMERIC_FIELDS = setting('numeric_fields')
+
+
+def parse_count(value):
+    """Parse a count such as 1234, '29,141', '1.2M', '407.0k', '30K tweets'
+    or '<10K+' into an int. Returns None for missing values like '-' or 'N/A'."""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = _COUNT_RE.search(str(value).replace(',', ''))
+    if not match:
+        return None
+    number, suffix = match.groups()
+    return int(round(float(number) * _MULTIPLIERS[suffix.lower()]))
+
+def parse_timestamp(value):
+    """Parse a unix timestamp string, RFC 822 date, ISO date, 'YYYY-mm-dd
+    HH:MM:SS' (local time) or our 'YYYY-mm-dd HH:MM:SS IST' last_updated
+    stamp into a unix timestamp.
+    Returns None if it can't be parsed."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if value.isdigit():
+        return int(value)
+    if value.endswith(' IST'):
+        try:
+            return int(datetime.strptime(value[:-4], '%Y-%m-%d %H:%M:%S').replace(tzinfo=IST).timestamp())
+        except ValueError:
+            return None
+    try:
+        return int(parsedate_to_datetime(value).timestamp())
+    except (TypeError, ValueError, IndexError):
+        pass
+    try:
+        return int(datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp())
+    except ValueError:
+        return None
+
+def normalize_trend(platform, trend):
+    """Return the canonical record for a trend: numeric fields are ints (or
+    None) and 'published' is a unix timestamp where the source has a date.
+    Records that are already canonical are returned unchanged."""
+    record = dict(trend)
+    for field in NUMERIC_FIELDS.get(platform, ()):
+        if field in record:
+            record[field] = parse_count(record[field])
+    date_field = PLATFORMS.get(platform, {}).get('published_from')
+    if date_field and 'published' not in record:
+        record['published'] = parse_timestamp(record.get(date_field))
+    return record
+
+def normalize_payload(platform, data):
+    """Return a copy of a trend payload with every trend normalized"""
+    trends = data.get('trends') or []
+    return {**data, 'trends': [normalize_trend(platform, trend) for trend in trends]}
+
+
+# --- Display formatting (render time only) ---
+
+def format_compact(value):
+    """1100000 -> '1.1M', 4100 -> '4.1k', 999 -> '999'. Strings pass through."""
+    if value is None:
+        return ''
+    if not isinstance(value, (int, float)):
+        return value
+    if value >= 1000000:
+        return f"{value/1000000:.1f}M"
+    if value >= 1000:
+        return f"{value/1000:.1f}k"
+    return str(value)
+
+def format_thousands(value):
+    """29141 -> '29,141'. Strings pass through."""
+    if value is None:
+        return ''
+    if not isinstance(value, (int, float)):
+        return value
+    return f"{value:,}"
+
+def format_tweet_volume(value):
+    """30000 -> '30.0k+', None -> '-'. Strings pass through."""
+    if value is None:
+        return '-'
+    if not isinstance(value, (int, float)):
+        return value
+    if value >= 1000000:
+        return f"{value/1000000:.1f}M+"
+    if value >= 1000:
+        return f"{value/1000:.1f}k+"
+    return str(value)
+
+def format_ist(timestamp, fmt='%d %b %Y, %H:%M'):
+    """Unix timestamp -> IST date string. None -> ''."""
+    if timestamp is None:
+        return ''
+    return datetime.fromtimestamp(timestamp, IST).strftime(fmt)
+
+def format_duration(seconds):
+    """215 -> '3:35'. None -> ''."""
+    if seconds is None:
+        return ''
+    if not isinstance(seconds, (int, float)):
+        return seconds
+    return '%d:%02d' % (seconds // 60, seconds % 60)
+
+# Jinja filters registered by the web app
+TEMPLATE_FILTERS = {
+    'compact_number': format_compact,
+    'thousands': format_thousands,
+    'tweet_volume': format_tweet_volume,
+    'duration': format_duration,
+    'ist_time': format_ist
+}
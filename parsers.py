@@ -0,0 +1,129 @@
+import re
+import xml.etree.ElementTree as ET
+from normalize import parse_count, parse_timestamp
+
+ATOM_NS = '{http://www.w3.org/2005/Atom}'
+
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+def _rss_item(elem):
+    """Pull title/link/source/pubDate out of an RSS <item> in one pass"""
+    item = {'title': None, 'link': None, 'source': None, 'pub_date': None}
+    for child in elem:
+        name = _local_name(child.tag)
+        if name == 'title':
+            item['title'] = child.text or ''
+        elif name == 'link':
+            item['link'] = child.text or ''
+        elif name == 'source':
+            item['source'] = child.text
+        elif name == 'pubDate':
+            item['pub_date'] = child.text
+    return item
+
+def _atom_entry(elem):
+    """Pull title/link/source/date out of an Atom <entry> in one pass"""
+    item = {'title': None, 'link': None, 'source': None, 'pub_date': None}
+    for child in elem:
+        name = _local_name(child.tag)
+        if name == 'title':
+            item['title'] = child.text or ''
+        elif name == 'link' and (item['link'] is None or child.get('rel', 'alternate') == 'alternate'):
+            item['link'] = child.get('href', '')
+        elif name == 'author':
+            author = child.find(f'{ATOM_NS}name')
+            item['source'] = author.text if author is not None else None
+        elif name in ('published', 'updated') and not item['pub_date']:
+            item['pub_date'] = child.text
+    return item
+
+def iter_feed_items(stream):
+    """Incrementally parse an RSS or Atom feed from a file-like object.
+
+    Yields dicts with title, link, source, pub_date (raw string) and
+    published (unix timestamp or None). Each item is discarded from the tree
+    once yielded, so memory stays bounded by the largest single item.
+    """
+    stack = []
+    for event, elem in ET.iterparse(stream, events=('start', 'end')):
+        if event == 'start':
+            stack.append(elem)
+            continue
+        stack.pop()
+        name = _local_name(elem.tag)
+        if name not in ('item', 'entry'):
+            continue
+
+        item = _rss_item(elem) if name == 'item' else _atom_entry(elem)
+        item['published'] = parse_timestamp(item['pub_date'])
+        yield item
+
+        elem.clear()
+        if stack:
+            stack[-1].remove(elem)
+
+
+# --- trends24.in ---
+
+try:
+    from lxml import html as lxml_html
+    HTML_ENGINE = 'lxml'
+except ImportError:
+    lxml_html = None
+    HTML_ENGINE = 'soup'
+
+def parse_tweet_count(text):
+    """Parse a tweet count such as '30K', '1.2M', '12,345 tweets' or '<10K+' into an int, or None"""
+    return parse_count(text) if text else None
+
+_CONTAINER_TAG_RE = re.compile(r'<[a-zA-Z][^>]*\sclass\s*=\s*(?:"[^"]*|\'[^\']*|)\blist-container\b')
+
+def _leading_containers(html, count):
+    """Cut the page just before the (count+1)th list-container tag, so only
+    the containers we use get tokenized at all"""
+    for index, match in enumerate(_CONTAINER_TAG_RE.finditer(html)):
+        if index == count:
+            return html[:match.start()]
+    return html
+
+_CLASS_XPATH = 'contains(concat(" ", normalize-space(@class), " "), " {} ")'
+
+def _trends24_lxml(html, containers):
+    doc = lxml_html.fromstring(html)
+    rows = []
+    for container in doc.xpath(f'//*[{_CLASS_XPATH.format("list-container")}]')[:containers]:
+        for item in container.xpath('.//ol//li'):
+            link = item.xpath(f'.//span[{_CLASS_XPATH.format("trend-name")}]//a')
+            if not link:
+                continue
+            count = item.xpath(f'.//*[{_CLASS_XPATH.format("tweet-count")}]')
+            rows.append((link[0].text_content(), count[0].text_content() if count else ''))
+    return rows
+
+def _trends24_soup(html, containers):
+    from bs4 import BeautifulSoup, SoupStrainer
+    soup = BeautifulSoup(html, 'html.parser', parse_only=SoupStrainer(class_='list-container'))
+    rows = []
+    for container in soup.select('.list-container')[:containers]:
+        for item in container.select('ol li'):
+            link = item.select_one('span.trend-name a')
+            if not link:
+                continue
+            count = item.select_one('.tweet-count')
+            rows.append((link.text, count.text if count else ''))
+    return rows
+
+def parse_trends24(html, containers=2, engine=None):
+    """Extract trends from the first `containers` hourly lists of a trends24 page.
+
+    Uses lxml when available, otherwise an html.parser soup restricted by a
+    SoupStrainer to the list containers. Returns [{name, volume}] with volume
+    as an int tweet count, or None when the page shows none.
+    """
+    engine = engine or HTML_ENGINE
+    html = _leading_containers(html, containers)
+    rows = _trends24_lxml(html, containers) if engine == 'lxml' else _trends24_soup(html, containers)
+
+    return [{'name': name.strip(), 'volume': parse_tweet_count(count_text.strip())} for name, count_text in rows]
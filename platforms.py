@@ -0,0 +1,157 @@
+"""Registry of the trend platforms.
+
+Each source is declared once here, and every layer reads its settings from
+this registry instead of keeping its own per-platform table:
+
+- collection: the collector (attached by collect_trends, which is imported
+  only when a collection runs), its deadline and how many of its
+  collectors run at once
+- scheduling: the refresh cadence, which is also how long its data is
+  expected to stay current
+- storage: the numeric fields normalized on load, the fields it can be
+  ranked by and the one its top 10 is ranked by
+- derived views: the count whose growth feeds rising scores, the fields
+  searched besides the title, and how well its titles describe a
+  cross-platform topic
+- pages: display name, icon, link label and the fields shown per trend
+
+A new source is a collector function (taking a region, saving its trends
+with trend_writer.save_trends and returning True/False) attached with
+register_collector, plus an entry here; it then joins the concurrent
+collection, scheduler, caches, S3 upload, pages and API. Entries are in
+display order.
+
+Only the standard library is used, so the web process can import this.
+"""
+import importlib
+
+DEFAULTS = {
+    'timeout': 30,
+    'concurrency': 4,
+    'refresh': {'every': 3600},
+    'numeric_fields': (),
+    # Field holding a date string that is parsed into 'published'
+    'published_from': None,
+    # Highest first; the first is the default sort on the platform page
+    'sort_fields': (),
+    # None keeps file order for the top 10
+    'top_sort': None,
+    'growth_field': None,
+    'search_fields': (),
+    # Lower is preferred as a hot topic's title
+    'title_preference': 100,
+    'description': False,
+    # Set by register_collector
+    'collector': None
+}
+
+# Unset keys of a meta field: the trend field filtered through a template
+# filter, formatted ('{}' is the value) and shown in a span of that class
+META_DEFAULTS = {'filter': None, 'format': '{}', 'optional': False}
+
+def _platform(**settings):
+    settings['meta'] = tuple({**META_DEFAULTS, 'class': meta['field'], **meta}
+                             for meta in settings.get('meta', ()))
+    return {**DEFAULTS, **settings}
+
+PLATFORMS = {
+    'twitter': _platform(
+        name='Twitter',
+        icon='fab fa-twitter',
+        numeric_fields=('volume',),
+        sort_fields=('volume',),
+        growth_field='volume',
+        title_preference=4,
+        link='View on Twitter',
+        meta=({'field': 'volume', 'filter': 'tweet_volume'},
+              {'field': 'tag', 'optional': True})),
+    'youtube': _platform(
+        name='YouTube',
+        icon='fab fa-youtube',
+        # Extra time for the RapidAPI fallback
+        timeout=45,
+        numeric_fields=('views', 'likes'),
+        sort_fields=('views', 'likes'),
+        top_sort='views',
+        growth_field='views',
+        search_fields=('channel',),
+        title_preference=3,
+        link='Watch on YouTube',
+        meta=({'field': 'channel'},
+              {'field': 'views', 'filter': 'compact_number'},
+              {'field': 'likes', 'filter': 'compact_number'},
+              {'field': 'tag', 'optional': True})),
+    'reddit': _platform(
+        name='Reddit',
+        icon='fab fa-reddit-alien',
+        concurrency=2,
+        numeric_fields=('score', 'comments'),
+        published_from='created',
+        sort_fields=('score', 'comments'),
+        top_sort='score',
+        growth_field='score',
+        search_fields=('subreddit',),
+        title_preference=1,
+        link='View on Reddit',
+        meta=({'field': 'subreddit', 'format': 'r/{}'},
+              {'field': 'score', 'filter': 'thousands', 'format': '{} points'},
+              {'field': 'comments', 'filter': 'thousands', 'format': '{} comments'},
+              {'field': 'author'})),
+    'google': _platform(
+        name='Google',
+        icon='fab fa-google',
+        # One RapidAPI key with a monthly quota
+        concurrency=1,
+        refresh={'daily_at': (8, 0)},
+        title_preference=2,
+        link='Search on Google',
+        meta=({'field': 'traffic', 'optional': True},
+              {'field': 'tag', 'optional': True})),
+    'news': _platform(
+        name='News',
+        icon='fas fa-newspaper',
+        concurrency=6,
+        published_from='pub_date',
+        sort_fields=('published',),
+        search_fields=('source',),
+        title_preference=0,
+        description=True,
+        link='Read Full Article',
+        meta=({'field': 'source'},
+              {'field': 'pub_date', 'class': 'published', 'optional': True})),
+    'spotify': _platform(
+        name='Spotify',
+        icon='fab fa-spotify',
+        # Search and playlist round trips
+        timeout=60,
+        numeric_fields=('popularity', 'duration'),
+        sort_fields=('popularity', 'duration'),
+        top_sort='popularity',
+        search_fields=('artists', 'album'),
+        title_preference=5,
+        link='Listen on Spotify',
+        meta=({'field': 'artists'},
+              {'field': 'album'},
+              {'field': 'duration', 'filter': 'duration', 'format': '{} min'},
+              {'field': 'popularity', 'format': 'Popularity: {}%', 'optional': True}))
+}
+
+
+def platform_names():
+    """Platform names in display order"""
+    return list(PLATFORMS)
+
+def setting(key):
+    """{platform: value} of one setting across every platform"""
+    return {platform: settings[key] for platform, settings in PLATFORMS.items()}
+
+def register_collector(platform, collector):
+    """Attach the function that collects a platform's trends"""
+    PLATFORMS[platform]['collector'] = collector
+
+def get_collector(platform):
+    """A platform's collector, importing collect_trends to register the
+    built-in ones on first use"""
+    if PLATFORMS[platform]['collector'] is None:
+        importlib.import_module('collect_trends')
+    return PLATFORMS[platform]['collector']
@@ -0,0 +1,161 @@
+"""API quota ledger shared by the collectors.
+
+Records the units spent per API and key in the current quota period (a
+day or a month, in the provider's reset timezone) in
+data/.state/quota_ledger.json, so every run and process sees what earlier
+ones used. Keys are stored as a short hash, never in the clear.
+
+`plan()` turns the remaining budget into how much a run may spend: the
+full request while the budget comfortably covers every run left in the
+period, fewer units as it runs low, spacing calls out once there is less
+than a unit per run, and nothing once the quota is used up or the
+provider has reported it exhausted.
+"""
+import os
+import json
+import math
+import time
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from http_client import STATE_DIR
+from atomic_files import write_json_atomic, file_lock
+
+LEDGER_FILE = os.path.join(STATE_DIR, 'quota_ledger.json')
+
+# Units per period for each API; limit None records spend without capping
+QUOTAS = {
+    # videos.list costs 1 unit per call; the quota resets at midnight Pacific
+    'youtube_data': {'limit': 10000, 'period': 'day', 'tz': 'America/Los_Angeles'},
+    'rapidapi_google': {'limit': 100, 'period': 'month', 'tz': 'UTC'},
+    'rapidapi_youtube': {'limit': None, 'period': 'month', 'tz': 'UTC'}
+}
+
+
+def key_id(api_key):
+    """Short, stable identifier for an API key"""
+    return hashlib.sha1((api_key or '').encode('utf-8')).hexdigest()[:12]
+
+def period_bounds(quota, now):
+    """Return (label, reset_epoch) of the quota period containing `now`"""
+    local = datetime.fromtimestamp(now, ZoneInfo(quota['tz']))
+    if quota['period'] == 'day':
+        start = local.replace(hour=0, minute=0, second=0, microsecond=0)
+        reset = start + timedelta(days=1)
+        return start.strftime('%Y-%m-%d'), reset.timestamp()
+    start = local.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    reset = (start + timedelta(days=32)).replace(day=1)
+    return start.strftime('%Y-%m'), reset.timestamp()
+
+
+class QuotaLedger:
+    """Per-period spend for each (api, key), persisted after every update"""
+
+    def __init__(self, ledger_file=LEDGER_FILE, quotas=None):
+        self.ledger_file = ledger_file
+        self.quotas = quotas or QUOTAS
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.ledger_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _entry(self, ledger, api, api_key, now):
+        """The ledger entry for the current period, reset when a new one starts"""
+        period, _ = period_bounds(self.quotas[api], now)
+        keys = ledger.setdefault(api, {})
+        entry = keys.get(key_id(api_key))
+        if not entry or entry.get('period') != period:
+            entry = keys[key_id(api_key)] = {'period': period, 'spent': 0, 'calls': 0,
+                                             'exhausted': False, 'last_spent_at': None}
+        return entry
+
+    def _update(self, api, api_key, change, now=None):
+        now = now or time.time()
+        # Re-read under a lock file so other processes' spend isn't overwritten
+        with self._lock, file_lock(self.ledger_file + '.lock'):
+            ledger = self._load()
+            change(self._entry(ledger, api, api_key, now), now)
+            try:
+                write_json_atomic(self.ledger_file, ledger)
+            except OSError as e:
+                print(f"⚠️ Could not save quota ledger: {e}")
+
+    def spend(self, api, api_key, units=1, now=None):
+        """Record `units` spent on a call that reached the API"""
+        def change(entry, now):
+            entry['spent'] += units
+            entry['calls'] += 1
+            entry['last_spent_at'] = now
+        self._update(api, api_key, change, now)
+
+    def mark_exhausted(self, api, api_key, now=None):
+        """Record that the provider refused a call for quota, until the period resets"""
+        def change(entry, now):
+            entry['exhausted'] = True
+        self._update(api, api_key, change, now)
+
+    def usage(self, api, api_key, now=None):
+        """Current period's spend, limit, remaining units and reset time"""
+        now = now or time.time()
+        quota = self.quotas[api]
+        with self._lock:
+            entry = dict(self._entry(self._load(), api, api_key, now))
+        limit = quota['limit']
+        entry['limit'] = limit
+        entry['reset_at'] = period_bounds(quota, now)[1]
+        if entry['exhausted']:
+            entry['remaining'] = 0
+        else:
+            entry['remaining'] = None if limit is None else max(limit - entry['spent'], 0)
+        return entry
+
+    def plan(self, api, api_key, wanted, interval, now=None):
+        """How many of `wanted` units a run may spend, for a collector that
+        runs every `interval` seconds. 0 means skip the API this run."""
+        now = now or time.time()
+        usage = self.usage(api, api_key, now)
+        if usage['exhausted']:
+            return 0
+        if usage['remaining'] is None:
+            return wanted
+        if usage['remaining'] < 1:
+            return 0
+        runs_left = max(1, math.ceil((usage['reset_at'] - now) / interval))
+        share = usage['remaining'] / runs_left
+        if share >= 1:
+            return min(wanted, int(share))
+        # Less than a unit per run left: space single calls out evenly
+        last = usage['last_spent_at']
+        return 1 if last is None or now - last >= interval / share else 0
+
+    def describe(self, api, api_key, now=None):
+        """One-line summary for the collector logs"""
+        usage = self.usage(api, api_key, now)
+        period = 'today' if self.quotas[api]['period'] == 'day' else 'this month'
+        limit = f"/{usage['limit']}" if usage['limit'] is not None else ''
+        state = ', exhausted' if usage['exhausted'] else ''
+        return f"{usage['spent']}{limit} units {period}{state}"
+
+
+_ledger = None
+_ledger_lock = threading.Lock()
+
+def get_ledger():
+    """Return the process-wide quota ledger"""
+    global _ledger
+    if _ledger is None:
+        with _ledger_lock:
+            if _ledger is None:
+                _ledger = QuotaLedger()
+    return _ledger
+
+def set_ledger(ledger):
+    """Replace the process-wide quota ledger (e.g. with one on a scratch file)"""
+    global _ledger
+    with _ledger_lock:
+        _ledger = ledger
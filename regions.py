@@ -0,0 +1,95 @@
+"""Regions the collectors can fetch, and each source's settings per region.
+
+The default region (India) is stored at the top of data/ as it always was;
+every other region is a shard under data/regions/<code>/ holding the same
+trend files, derived views, state and history. TREND_REGIONS picks the
+regions that are collected and served (comma-separated codes, default
+"in"). A platform whose setting is None isn't collected for that region;
+one without an entry (a newly registered platform) is collected with
+empty settings.
+"""
+import os
+
+DEFAULT_REGION = 'in'
+
+# code: (name, trends24.in slug, Google News / YouTube language)
+COUNTRIES = {
+    'in': ('India', 'india', 'en'),
+    'us': ('United States', 'united-states', 'en'),
+    'gb': ('United Kingdom', 'united-kingdom', 'en'),
+    'ca': ('Canada', 'canada', 'en'),
+    'au': ('Australia', 'australia', 'en'),
+    'ie': ('Ireland', 'ireland', 'en'),
+    'nz': ('New Zealand', 'new-zealand', 'en'),
+    'sg': ('Singapore', 'singapore', 'en'),
+    'my': ('Malaysia', 'malaysia', 'en'),
+    'ph': ('Philippines', 'philippines', 'en'),
+    'pk': ('Pakistan', 'pakistan', 'en'),
+    'za': ('South Africa', 'south-africa', 'en'),
+    'ng': ('Nigeria', 'nigeria', 'en'),
+    'ke': ('Kenya', 'kenya', 'en'),
+    'ae': ('United Arab Emirates', 'united-arab-emirates', 'en'),
+    'jp': ('Japan', 'japan', 'ja'),
+    'kr': ('South Korea', 'korea', 'ko'),
+    'id': ('Indonesia', 'indonesia', 'id'),
+    'th': ('Thailand', 'thailand', 'th'),
+    'de': ('Germany', 'germany', 'de'),
+    'fr': ('France', 'france', 'fr'),
+    'es': ('Spain', 'spain', 'es'),
+    'it': ('Italy', 'italy', 'it'),
+    'nl': ('Netherlands', 'netherlands', 'nl'),
+    'se': ('Sweden', 'sweden', 'sv'),
+    'pl': ('Poland', 'poland', 'pl'),
+    'tr': ('Turkey', 'turkey', 'tr'),
+    'br': ('Brazil', 'brazil', 'pt'),
+    'mx': ('Mexico', 'mexico', 'es'),
+    'ar': ('Argentina', 'argentina', 'es'),
+    'sa': ('Saudi Arabia', 'saudi-arabia', 'ar')
+}
+# Countries r/popular can be narrowed to with ?geo_filter=
+REDDIT_GEO_FILTERS = {'in', 'us', 'gb', 'ca', 'au', 'ie', 'nz', 'sg', 'my', 'ph', 'jp', 'th',
+                      'de', 'fr', 'es', 'it', 'se', 'pl', 'tr', 'mx', 'ar'}
+
+
+def _region_settings(code, name, slug, language):
+    country = code.upper()
+    return {
+        'name': name,
+        'twitter': {'slug': slug, 'english_only': False},
+        'youtube': {'region_code': country, 'hl': language},
+        'reddit': {'geo_filter': country} if code in REDDIT_GEO_FILTERS else None,
+        # The RapidAPI realtime trends endpoint is only used for India
+        'google': None,
+        'news': {'params': {'hl': f'{language}-{country}', 'gl': country, 'ceid': f'{country}:{language}'}},
+        'spotify': {'queries': [f'Top 50 - {name}', f'Top Hits {name}'], 'market': country}
+    }
+
+REGIONS = {code: _region_settings(code, *info) for code, info in COUNTRIES.items()}
+# India keeps the requests it has always made
+REGIONS['in'].update({
+    'twitter': {'slug': 'india', 'english_only': True},
+    'youtube': {'region_code': 'IN', 'hl': 'hi'},
+    'reddit': {'geo_filter': None},
+    'google': {'country': 'INDIA'},
+    'news': {'params': None},
+    'spotify': {'queries': ['Bollywood Hits', 'Top Hindi Songs', 'India Trending Music'], 'market': None}
+})
+
+
+def enabled_regions():
+    """Codes of the regions to collect and serve, default region first"""
+    codes = [code.strip().lower() for code in os.getenv('TREND_REGIONS', DEFAULT_REGION).split(',')]
+    regions = [DEFAULT_REGION]
+    for code in codes:
+        if code and code not in REGIONS:
+            print(f"⚠️ Unknown region {code!r} in TREND_REGIONS, ignoring it")
+        elif code and code not in regions:
+            regions.append(code)
+    return regions
+
+def region_settings(region, platform):
+    """A source's settings for a region, or None if it isn't collected there"""
+    return REGIONS[region].get(platform, {})
+
+def region_name(region):
+    return REGIONS[region]['name']
@@ -98,7 +98,7 @@ def git_commit_and_push():
         # Check if there are changes to commit
         if subprocess.run(["git", "diff", "--cached", "--quiet"]).returncode == 0:
             print("📭  No changes to commit.")
-            return
+            return True
 
         commit_msg = f"📈  Auto-update: Trend data refreshed at {format_ist_datetime()} by cron job"
         print(f"📝  Committing changes...")
@@ -108,6 +108,7 @@ def git_commit_and_push():
         subprocess.run(["git", "push", "origin", BRANCH_NAME], check=True)
 
         print("✅  Push completed successfully.")
+        return True
     except subprocess.CalledProcessError as e:
         print(f"❌  Git error: {e}")
         return False
@@ -115,10 +116,11 @@ def git_commit_and_push():
 # === Main ===
 
 def setup_git():
-    """Main function to set up Git and push changes."""
+    """Main function to set up Git and push changes. Returns True once pushed (or nothing to push)."""
     key = get_private_key()
     write_temp_key(key)
     setup_ssh_agent_and_add_key()
-    git_commit_and_push()
+    return git_commit_and_push()
 
-setup_git()
\ No newline at end of file
+if __name__ == "__main__":
+    setup_git()
@@ -1,50 +1,166 @@
+import io
 import os
+import gzip
+import json
+import time
+import hashlib
+import mimetypes
+from concurrent.futures import ThreadPoolExecutor
 import boto3
-from botocore.exceptions import ClientError
+from boto3.exceptions import S3UploadFailedError
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError, BotoCoreError
 from datetime import datetime
+from atomic_files import write_json_atomic
+from trend_store import trend_file_path, DATA_DIR
+from platforms import platform_names
+
+# Content hashes of the last successful upload per file, so unchanged files are skipped
+MANIFEST_FILE = os.path.join(os.path.dirname(__file__), 'data', '.state', 's3_manifest.json')
+
+# Payloads above this many bytes are uploaded in parts of the same size
+MULTIPART_THRESHOLD = 8 * 1024 * 1024
+
+# Trend file of every platform, relative to data/
+TREND_FILES = [os.path.relpath(trend_file_path(platform), DATA_DIR) for platform in platform_names()]
+
+
+def create_s3_client():
+    """Create an S3 client from the AWS_* environment variables"""
+    return boto3.client('s3',
+        aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+        aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+        region_name=os.getenv('AWS_REGION', 'ap-south-1')
+    )
+
+
+class S3Publisher:
+    """Uploads files to one bucket over a single shared client.
+
+    Payloads are gzip-compressed (with Content-Encoding set), tagged with
+    Content-Type/Cache-Control, uploaded concurrently on a bounded pool, and
+    skipped when their content hash matches the last successful upload.
+    Payloads above `multipart_threshold` bytes go up as a multipart upload.
+    Pass `client` to use a pre-built client (e.g. one backed by moto).
+    """
+
+    def __init__(self, bucket_name, client=None, max_workers=4, compress=True,
+                 cache_control='public, max-age=300', manifest_file=MANIFEST_FILE,
+                 multipart_threshold=MULTIPART_THRESHOLD):
+        self.bucket_name = bucket_name
+        self.client = client or create_s3_client()
+        self.max_workers = max_workers
+        self.compress = compress
+        self.cache_control = cache_control
+        self.manifest_file = manifest_file
+        self.transfer_config = TransferConfig(multipart_threshold=multipart_threshold,
+                                              multipart_chunksize=multipart_threshold, max_concurrency=max_workers)
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self):
+        if not self.manifest_file:
+            return {}
+        try:
+            with open(self.manifest_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self):
+        if not self.manifest_file:
+            return
+        try:
+            write_json_atomic(self.manifest_file, self.manifest)
+        except OSError as e:
+            print(f"⚠️ Could not save S3 manifest: {e}")
+
+    def upload(self, file_path, s3_key, force=False, name=None):
+        """Upload one file. Returns a result dict with status, bytes and latency.
+        `name` keys the file in the manifest (default: its basename)."""
+        name = name or os.path.basename(file_path)
+        result = {'file': name, 'key': s3_key, 'status': 'skipped', 'bytes': 0, 'elapsed': 0.0, 'error': None}
+        start = time.perf_counter()
+        try:
+            with open(file_path, 'rb') as f:
+                body = f.read()
+            digest = hashlib.sha256(body).hexdigest()
+            result['sha256'] = digest
+            if not force and self.manifest.get(name, {}).get('sha256') == digest:
+                return result
+
+            extra = {
+                'ContentType': mimetypes.guess_type(name)[0] or 'application/octet-stream',
+                'CacheControl': self.cache_control,
+                'Metadata': {'sha256': digest}
+            }
+            if self.compress:
+                body = gzip.compress(body, mtime=0)
+                extra['ContentEncoding'] = 'gzip'
+
+            self.client.upload_fileobj(io.BytesIO(body), self.bucket_name, s3_key,
+                                       ExtraArgs=extra, Config=self.transfer_config)
+            result['status'] = 'uploaded'
+            result['bytes'] = len(body)
+        except (OSError, ClientError, BotoCoreError, S3UploadFailedError) as e:
+            result['status'] = 'error'
+            result['error'] = str(e)
+        finally:
+            result['elapsed'] = round(time.perf_counter() - start, 3)
+        return result
+
+    def publish(self, files, force=False):
+        """Upload (file_path, s3_key) pairs, or (file_path, s3_key, name)
+        triples, concurrently. Returns the list of results."""
+        if not files:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(files))) as executor:
+            results = list(executor.map(lambda item: self.upload(item[0], item[1], force, *item[2:]), files))
+
+        for result in results:
+            if result['status'] == 'uploaded':
+                self.manifest[result['file']] = {'sha256': result['sha256'], 'key': result['key']}
+        self._save_manifest()
+        return results
+
 
 def upload_to_s3(file_path, bucket_name, s3_key=None):
     """Upload a file to S3 bucket"""
-    try:
-        if s3_key is None:
-            s3_key = os.path.basename(file_path)
-            
-        s3_client = boto3.client('s3',
-            aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-            aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-            region_name=os.getenv('AWS_REGION', 'ap-south-1')
-        )
-        
-        s3_client.upload_file(file_path, bucket_name, s3_key)
-        print(f"✅ Successfully uploaded {s3_key} to S3")
-        return True
-    except ClientError as e:
-        print(f"⚠️ Error uploading to S3: {e}")
+    if s3_key is None:
+        s3_key = os.path.basename(file_path)
+    publisher = S3Publisher(bucket_name, manifest_file=None)
+    result = publisher.upload(file_path, s3_key, force=True)
+    if result['status'] == 'error':
+        print(f"⚠️ Error uploading to S3: {result['error']}")
         return False
+    print(f"✅ Successfully uploaded {s3_key} to S3")
+    return True
 
-def store_trends_in_s3(data_dir, bucket_name):
-    """Store all trend files in S3"""
+def store_trends_in_s3(data_dir, bucket_name, trend_files=None, publisher=None):
+    """Store trend files in S3 (all of them unless `trend_files`, paths
+    relative to `data_dir`, is given)"""
     try:
         print("📤 Uploading trends to S3...")
-        trend_files = [
-            'twitter_trends.json',
-            'reddit_trends.json',
-            'youtube_trends.json',
-            'google_trends.json',
-            'spotify_trends.json',
-            'news_trends.json'
-        ]
-        
-        success = True
+        if trend_files is None:
+            trend_files = TREND_FILES
+        publisher = publisher or S3Publisher(bucket_name)
+
         timestamp = datetime.now().strftime('%Y-%m-%d/%H_%M_%S')
+        files = []
         for file_name in trend_files:
             file_path = os.path.join(data_dir, file_name)
             if os.path.exists(file_path):
-                s3_key = f"trends/{timestamp}/{file_name}"
-                if not upload_to_s3(file_path, bucket_name, s3_key):
-                    success = False
-        
-        return success
+                files.append((file_path, f"trends/{timestamp}/{file_name}", file_name))
+
+        results = publisher.publish(files)
+        for result in results:
+            if result['status'] == 'uploaded':
+                print(f"✅ Uploaded {result['key']} ({result['bytes']} bytes, {result['elapsed']}s)")
+            elif result['status'] == 'skipped':
+                print(f"📭 Skipped {result['file']} (unchanged since last upload)")
+            else:
+                print(f"⚠️ Error uploading {result['key']} to S3: {result['error']}")
+
+        return all(result['status'] != 'error' for result in results)
     except Exception as e:
         print(f"⚠️ Error storing trends in S3: {e}")
-        return False
\ No newline at end of file
+        return False
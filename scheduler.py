@@ -0,0 +1,200 @@
+"""Background refresh scheduler.
+
+Owns the per-platform refresh cadence (hourly for most sources, daily at
+8 AM IST for Google Trends) and runs collections as jobs, with at most one
+collection per platform in flight. A lock file per platform in
+data/.state/ extends that across processes: a platform another process is
+collecting is skipped. Run it inside the web process with
+ENABLE_SCHEDULER=1, or as a sidecar:
+
+    python scheduler.py
+"""
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from platforms import setting
+
+IST = ZoneInfo("Asia/Kolkata")
+
+# Refresh cadence per platform: every N seconds, or daily at (hour, minute) IST
+REFRESH_SCHEDULE = setting('refresh')
+
+# Seconds between checks for due platforms
+TICK_INTERVAL = 30
+MAX_JOBS_KEPT = 200
+
+
+def next_run_time(cadence, after):
+    """Return the next epoch time a platform is due, strictly after `after`"""
+    if 'every' in cadence:
+        return after + cadence['every']
+    hour, minute = cadence['daily_at']
+    last = datetime.fromtimestamp(after, IST)
+    due = last.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if due <= last:
+        due += timedelta(days=1)
+    return due.timestamp()
+
+
+def refresh_interval(platform):
+    """Approximate seconds between scheduled refreshes of a platform"""
+    cadence = REFRESH_SCHEDULE.get(platform, {})
+    return cadence.get('every', 24 * 3600)
+
+
+def _default_collect(platforms):
+    # Imported lazily so the web process only loads collectors when a job runs
+    from collect_trends import collect_all_trends
+    return collect_all_trends(platforms)
+
+def publish_results(results):
+    """Upload a job's changed trend files to S3 and push them to git"""
+    from collect_trends import publish_changes
+    return publish_changes(results)
+
+
+class TrendScheduler:
+    """Runs refresh jobs on a small thread pool and triggers scheduled ones"""
+
+    def __init__(self, schedule=None, collect=None, on_complete=None, max_workers=4):
+        self.schedule = schedule or REFRESH_SCHEDULE
+        self.collect = collect or _default_collect
+        self.on_complete = on_complete
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='refresh')
+        self._jobs = OrderedDict()
+        self._in_flight = {}
+        self._next_run = {}
+        self._lock = threading.Lock()
+        # Publishing (S3 upload, git push) must not run for two jobs at once
+        self._complete_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def enqueue(self, platforms, reason='manual'):
+        """Queue a refresh of `platforms`. Platforms that already have a
+        collection in flight are not queued again; the job records which job
+        is refreshing them instead. Returns the job dict."""
+        job_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            accepted = [p for p in platforms if p not in self._in_flight]
+            job = {
+                'id': job_id,
+                'reason': reason,
+                'platforms': accepted,
+                'in_flight': {p: self._in_flight[p] for p in platforms if p in self._in_flight},
+                'status': 'queued' if accepted else 'skipped',
+                'created_at': time.time(),
+                'started_at': None,
+                'finished_at': None,
+                'results': {},
+                'error': None,
+                'publish_error': None
+            }
+            for platform in accepted:
+                self._in_flight[platform] = job_id
+            self._jobs[job_id] = job
+            while len(self._jobs) > MAX_JOBS_KEPT:
+                self._jobs.popitem(last=False)
+
+        if accepted:
+            self._executor.submit(self._run_job, job)
+        return dict(job)
+
+    def _run_job(self, job):
+        job['status'] = 'running'
+        job['started_at'] = time.time()
+        try:
+            job['results'] = self.collect(job['platforms'])
+            job['status'] = 'completed'
+        except Exception as e:
+            print(f"⚠️ Refresh job {job['id']} failed: {e}")
+            job['status'] = 'failed'
+            job['error'] = str(e)
+        else:
+            # A failed publish leaves the collection completed
+            if self.on_complete:
+                try:
+                    with self._complete_lock:
+                        self.on_complete(job['results'])
+                except Exception as e:
+                    print(f"⚠️ Publishing refresh job {job['id']} failed: {e}")
+                    job['publish_error'] = str(e)
+        finally:
+            job['finished_at'] = time.time()
+            with self._lock:
+                for platform in job['platforms']:
+                    if self._in_flight.get(platform) == job['id']:
+                        del self._in_flight[platform]
+
+    def get_job(self, job_id):
+        """Return a copy of a job's status, or None"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _initial_next_run(self):
+        """Pick up the cadence from the last recorded checks, so restarts don't
+        trigger a refresh of every platform at once"""
+        from trend_writer import load_refresh_state
+        state = load_refresh_state()
+        now = time.time()
+        for platform, cadence in self.schedule.items():
+            checked_at = state.get(platform, {}).get('checked_at')
+            self._next_run[platform] = next_run_time(cadence, checked_at) if checked_at else now
+
+    def run_pending(self, now=None):
+        """Queue every platform that is due. Returns the queued job, if any."""
+        now = now or time.time()
+        due = [p for p, when in self._next_run.items() if when <= now]
+        if not due:
+            return None
+        for platform in due:
+            self._next_run[platform] = next_run_time(self.schedule[platform], now)
+        return self.enqueue(due, reason='scheduled')
+
+    def _loop(self):
+        self._initial_next_run()
+        while not self._stop.is_set():
+            try:
+                self.run_pending()
+            except Exception as e:
+                print(f"⚠️ Scheduler error: {e}")
+            self._stop.wait(TICK_INTERVAL)
+
+    def start(self):
+        """Start the background scheduling loop"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='trend-scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._executor.shutdown(wait=False)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler():
+    """Return the process-wide scheduler, creating it on first use"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = TrendScheduler(on_complete=publish_results)
+    return _scheduler
+
+
+if __name__ == "__main__":
+    scheduler = TrendScheduler(on_complete=publish_results)
+    print(f"⏰ Trend scheduler started at {datetime.now(IST).strftime('%Y-%m-%d %H:%M:%S IST')}")
+    scheduler.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        scheduler.stop()
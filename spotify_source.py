@@ -0,0 +1,134 @@
+"""Spotify Web API access for the Spotify collector.
+
+Keeps one spotipy client per process on the shared HTTP session, with the
+client-credentials token cached on disk so runs reuse it until it expires.
+Playlist IDs found by search are cached per query for PLAYLIST_TTL, and a
+playlist whose snapshot_id hasn't changed since the last successful run is
+not fetched again. Larger playlists are fetched page by page concurrently.
+
+`set_spotify()` swaps in any object with spotipy's search / playlist /
+playlist_items methods, e.g. the recorded-response fake in
+benchmarks/fake_spotify.py.
+"""
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http_client import get_client, STATE_DIR
+from atomic_files import write_json_atomic
+from metrics import bind_collection
+
+TOKEN_CACHE_FILE = os.path.join(STATE_DIR, 'spotify_token.json')
+CACHE_FILE = os.path.join(STATE_DIR, 'spotify_cache.json')
+
+# How long a search query keeps resolving to the same playlist
+PLAYLIST_TTL = 24 * 3600
+PAGE_SIZE = 100
+MAX_PAGE_WORKERS = 4
+TRACK_FIELDS = 'items(track(name,artists(name),external_urls(spotify),album(name),duration_ms,popularity))'
+
+_spotify = None
+_spotify_lock = threading.Lock()
+
+
+def get_spotify():
+    """Return the process-wide Spotify client, or None without credentials"""
+    global _spotify
+    if _spotify is None:
+        client_id = os.getenv('SPOTIFY_CLIENT_ID')
+        client_secret = os.getenv('SPOTIFY_CLIENT_SECRET')
+        if not client_id or not client_secret:
+            return None
+        # Imported here so the web process never pays for spotipy
+        import spotipy
+        from spotipy.cache_handler import CacheFileHandler
+        from spotipy.oauth2 import SpotifyClientCredentials
+
+        with _spotify_lock:
+            if _spotify is None:
+                os.makedirs(STATE_DIR, exist_ok=True)
+                session = get_client().session
+                auth_manager = SpotifyClientCredentials(
+                    client_id=client_id,
+                    client_secret=client_secret,
+                    requests_session=session,
+                    cache_handler=CacheFileHandler(cache_path=TOKEN_CACHE_FILE)
+                )
+                _spotify = spotipy.Spotify(auth_manager=auth_manager, requests_session=session)
+    return _spotify
+
+def set_spotify(client):
+    """Replace the process-wide Spotify client (e.g. with a fake)"""
+    global _spotify
+    with _spotify_lock:
+        _spotify = client
+
+
+class SpotifyPlaylists:
+    """Playlist lookups with a persisted query -> playlist cache and
+    snapshot_id tracking. `market` (a country code) localizes search and
+    track results; None leaves it to Spotify."""
+
+    def __init__(self, sp, cache_file=CACHE_FILE, ttl=PLAYLIST_TTL, max_workers=MAX_PAGE_WORKERS, market=None):
+        self.sp = sp
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self.max_workers = max_workers
+        self._market = {'market': market} if market else {}
+        self.cache = self._load()
+
+    def _load(self):
+        try:
+            with open(self.cache_file, 'r') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+        cache.setdefault('queries', {})
+        cache.setdefault('playlists', {})
+        return cache
+
+    def save(self):
+        try:
+            write_json_atomic(self.cache_file, self.cache)
+        except OSError as e:
+            print(f"⚠️ Could not save Spotify cache: {e}")
+
+    def find_playlist(self, query):
+        """Return the ID of the top playlist for a search query, or None"""
+        cached = self.cache['queries'].get(query)
+        if cached and time.time() - cached['cached_at'] < self.ttl:
+            return cached['playlist_id']
+
+        results = self.sp.search(q=query, type='playlist', limit=3, **self._market)
+        playlists = [p for p in results['playlists']['items'] if p is not None]
+        if not playlists:
+            return None
+        self.cache['queries'][query] = {'playlist_id': playlists[0]['id'], 'cached_at': time.time()}
+        return playlists[0]['id']
+
+    def fetch_items(self, playlist_id, skip_unchanged=True):
+        """Return (snapshot_id, items) for a playlist, with items None when
+        the playlist is unchanged since the last mark_fetched()"""
+        info = self.sp.playlist(playlist_id, fields='snapshot_id,tracks(total)')
+        snapshot_id = info['snapshot_id']
+        known = self.cache['playlists'].get(playlist_id, {}).get('snapshot_id')
+        if skip_unchanged and snapshot_id == known:
+            return snapshot_id, None
+
+        total = info['tracks']['total']
+        offsets = list(range(0, max(total, 1), PAGE_SIZE))
+
+        def page(offset):
+            return self.sp.playlist_items(playlist_id, fields=TRACK_FIELDS, limit=PAGE_SIZE, offset=offset,
+                                          additional_types=('track',), **self._market)['items']
+
+        if len(offsets) == 1:
+            return snapshot_id, page(0)
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(offsets))) as executor:
+            pages = list(executor.map(bind_collection(page), offsets))
+        return snapshot_id, [item for items in pages for item in items]
+
+    def mark_fetched(self, playlist_id, snapshot_id):
+        """Remember the snapshot that was just stored"""
+        self.cache['playlists'][playlist_id] = {'snapshot_id': snapshot_id, 'fetched_at': time.time()}
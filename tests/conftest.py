@@ -0,0 +1,8 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Fakes of the external APIs, shared with the benchmarks
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
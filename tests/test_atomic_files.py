@@ -0,0 +1,92 @@
+import os
+import json
+import time
+import stat
+import threading
+import multiprocessing
+
+import trend_store
+from atomic_files import write_json_atomic, write_if_changed
+
+PLATFORM = 'stress'
+
+
+def make_payload(writer_id, seq, size=200):
+    """A payload whose trends all carry the same (writer, seq) stamp"""
+    stamp = f'{writer_id}-{seq}'
+    return {
+        'trends': [{'rank': i + 1, 'title': f'Trend {i} ' + 'x' * 40, 'stamp': stamp} for i in range(size)],
+        'last_updated': stamp
+    }
+
+
+def rewrite(path, writer_id, deadline):
+    seq = 0
+    while time.time() < deadline:
+        write_json_atomic(path, make_payload(writer_id, seq))
+        seq += 1
+
+
+def torn(data):
+    """An error string if a read payload is torn, else None"""
+    if not data or not data.get('trends'):
+        return 'empty payload'
+    stamps = {trend['stamp'] for trend in data['trends']}
+    if stamps != {data['last_updated']}:
+        return f'mixed writes {sorted(stamps)[:3]}'
+    return None
+
+
+def test_readers_never_see_a_partial_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(trend_store, 'DATA_DIR', str(tmp_path))
+    monkeypatch.setattr(trend_store, 'STAT_INTERVAL', 0)
+    trend_store.clear_cache()
+    path = trend_store.trend_file_path(PLATFORM)
+    write_json_atomic(path, make_payload('init', 0))
+
+    deadline = time.time() + 1.5
+    writers = [multiprocessing.Process(target=rewrite, args=(path, i, deadline)) for i in range(3)]
+    errors = []
+
+    def read(use_cache):
+        while time.time() < deadline:
+            try:
+                if use_cache:
+                    data = trend_store.load_trends(PLATFORM)
+                else:
+                    with open(path, 'r') as f:
+                        data = json.load(f)
+                error = torn(data)
+            except (OSError, ValueError) as e:
+                error = f'{type(e).__name__}: {e}'
+            if error:
+                errors.append(error)
+
+    readers = [threading.Thread(target=read, args=(i % 2 == 0,)) for i in range(8)]
+    for worker in writers + readers:
+        worker.start()
+    for worker in writers + readers:
+        worker.join()
+    trend_store.clear_cache()
+
+    assert errors == []
+    assert [name for name in os.listdir(tmp_path) if name.endswith('.tmp')] == []
+
+
+def test_written_files_get_the_umask_mode(tmp_path):
+    previous = os.umask(0o027)
+    try:
+        path = tmp_path / 'trends.json'
+        write_json_atomic(str(path), {'trends': []})
+    finally:
+        os.umask(previous)
+    assert stat.S_IMODE(path.stat().st_mode) == 0o640
+
+
+def test_write_if_changed_skips_identical_content(tmp_path):
+    path = str(tmp_path / 'topics.json')
+    assert write_if_changed(path, '{"topics": []}')
+    inode = os.stat(path).st_ino
+    assert not write_if_changed(path, '{"topics": []}')
+    assert os.stat(path).st_ino == inode
+    assert write_if_changed(path, '{"topics": [1]}')
@@ -0,0 +1,192 @@
+import time
+import threading
+import multiprocessing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import trend_store
+import collect_trends
+from host_guard import HostGuard, set_guard, CircuitOpen, RateLimited
+from http_client import HttpClient, set_client
+
+RATE, BURST = 4, 5
+PROCESSES, DRAW_SECONDS = 4, 1.5
+TIMEOUT = 0.3
+ERROR_DELAY = 0.1
+RUNS = 10
+COOLDOWN = 1.0
+
+
+class FlakyServer(BaseHTTPRequestHandler):
+    """Serves a minimal trends24 page, or fails: mode 'error' answers 503
+    after ERROR_DELAY, mode 'hang' stalls past the client timeout"""
+    mode = 'error'
+    hits = 0
+
+    def do_GET(self):
+        FlakyServer.hits += 1
+        if FlakyServer.mode == 'error':
+            time.sleep(ERROR_DELAY)
+            self.send_error(503)
+            return
+        if FlakyServer.mode == 'hang':
+            time.sleep(TIMEOUT * 3)
+        body = b'<ol class="trend-card__list"><li><a class="trend-link">#Test</a></li></ol>'
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except OSError:
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope='module')
+def base():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FlakyServer)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+
+
+@pytest.fixture
+def flaky(base):
+    FlakyServer.mode = 'error'
+    FlakyServer.hits = 0
+    yield base
+    set_guard(None)
+    set_client(None)
+
+
+def draw(db_path, granted):
+    """Take tokens from a shared bucket as fast as possible for DRAW_SECONDS"""
+    guard = HostGuard(db_path, limits={'example.com': {'rate': RATE, 'burst': BURST}}, max_wait=0)
+    end = time.time() + DRAW_SECONDS
+    count = 0
+    while time.time() < end:
+        try:
+            guard.acquire('https://example.com/feed')
+            count += 1
+        except RateLimited:
+            time.sleep(0.005)
+    granted.put(count)
+
+
+def test_bucket_holds_across_processes(tmp_path):
+    db_path = str(tmp_path / 'bucket.db')
+    HostGuard(db_path)._connect()
+    granted = multiprocessing.Queue()
+    start = time.time()
+    workers = [multiprocessing.Process(target=draw, args=(db_path, granted)) for _ in range(PROCESSES)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.time() - start
+    total = sum(granted.get() for _ in workers)
+    assert total <= BURST + RATE * elapsed
+    assert total >= BURST + RATE * DRAW_SECONDS * 0.8
+
+
+def refresh_runs(base, guard):
+    """Run RUNS Twitter collections against the failing server, returning
+    how many requests reached it"""
+    set_guard(guard)
+    set_client(HttpClient(timeout=TIMEOUT, retries=0, host_overrides={'trends24.in': base}))
+    FlakyServer.hits = 0
+    for _ in range(RUNS):
+        assert not collect_trends.get_twitter_trends_from_trends24()
+    return FlakyServer.hits
+
+
+def test_breaker_stops_requests_to_a_failing_host(flaky, tmp_path, monkeypatch):
+    monkeypatch.setattr(trend_store, 'DATA_DIR', str(tmp_path))
+    no_breaker = HostGuard(str(tmp_path / 'none.db'), limits={}, failure_threshold=10 ** 6)
+    assert refresh_runs(flaky, no_breaker) == RUNS
+
+    guard = HostGuard(str(tmp_path / 'hosts.db'), limits={})
+    assert refresh_runs(flaky, guard) == guard.failure_threshold
+    assert guard.status()['127.0.0.1']['state'] == 'open'
+
+
+def test_half_open_lets_one_probe_through(flaky, tmp_path):
+    guard = HostGuard(str(tmp_path / 'hosts.db'), limits={}, cooldown=COOLDOWN)
+    url = f'{flaky}/india/'
+    for _ in range(guard.failure_threshold):
+        HttpClient(timeout=TIMEOUT, retries=0, guard=guard).get(url)
+    assert guard.status()['127.0.0.1']['state'] == 'open'
+
+    time.sleep(COOLDOWN)
+    FlakyServer.mode = 'hang'
+    FlakyServer.hits = 0
+    outcomes = []
+
+    def request():
+        try:
+            HttpClient(timeout=TIMEOUT, retries=0, guard=guard).get(url)
+            outcomes.append('sent')
+        except CircuitOpen:
+            outcomes.append('open')
+        except Exception:
+            outcomes.append('failed')
+    threads = [threading.Thread(target=request) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert FlakyServer.hits == 1
+    assert outcomes.count('open') == 4
+    # The probe timed out
+    assert guard.status()['127.0.0.1']['state'] == 'open'
+
+    FlakyServer.mode = 'ok'
+    time.sleep(COOLDOWN)
+    response = HttpClient(timeout=TIMEOUT, retries=0, guard=guard).get(url)
+    assert response.status_code == 200
+    assert guard.status()['127.0.0.1']['state'] == 'closed'
+
+
+def test_retries_reuse_the_first_attempts_token(flaky, tmp_path):
+    # trends24's limit: one request per page every 5 minutes
+    guard = HostGuard(str(tmp_path / 'hosts.db'), failure_threshold=10,
+                      limits={'127.0.0.1': {'rate': 1 / 300, 'burst': 1, 'per_url': True}})
+    response = HttpClient(retries=2, backoff_factor=0.01, guard=guard).get(f'{flaky}/india/')
+    assert response.status_code == 503
+    assert FlakyServer.hits == 3
+    with pytest.raises(RateLimited):
+        HttpClient(retries=2, backoff_factor=0.01, guard=guard).get(f'{flaky}/india/')
+    assert FlakyServer.hits == 3
+
+
+def test_breaker_opened_by_earlier_attempts_reports_their_error(flaky, tmp_path):
+    guard = HostGuard(str(tmp_path / 'hosts.db'), limits={}, failure_threshold=2)
+    response = HttpClient(retries=2, backoff_factor=0.01, guard=guard).get(f'{flaky}/india/')
+    assert response.status_code == 503
+    assert FlakyServer.hits == 2
+
+    guard = HostGuard(str(tmp_path / 'down.db'), limits={}, failure_threshold=2)
+    with pytest.raises(requests.ConnectionError):
+        HttpClient(retries=2, backoff_factor=0.01, guard=guard).get('http://127.0.0.1:1/')
+    assert guard.status()['127.0.0.1']['failures'] == 2
+
+
+def test_every_retry_counts_towards_the_breaker(flaky, tmp_path):
+    guard = HostGuard(str(tmp_path / 'hosts.db'), limits={})
+    response = HttpClient(retries=2, backoff_factor=0.01, guard=guard).get(f'{flaky}/india/')
+    assert response.status_code == 503
+    assert FlakyServer.hits == 3
+    status = guard.status()['127.0.0.1']
+    assert (status['state'], status['failures']) == ('open', 3)
+
+
+def test_connection_errors_are_retried_per_attempt(tmp_path):
+    guard = HostGuard(str(tmp_path / 'hosts.db'), limits={}, failure_threshold=10)
+    with pytest.raises(requests.ConnectionError):
+        HttpClient(retries=2, backoff_factor=0.01, guard=guard).get('http://127.0.0.1:1/')
+    assert guard.status()['127.0.0.1']['failures'] == 3
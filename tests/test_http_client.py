@@ -0,0 +1,134 @@
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from host_guard import HostGuard
+from http_client import HttpClient
+
+ETAG = '"v1"'
+LAST_MODIFIED = 'Sun, 18 Oct 2026 08:00:00 GMT'
+
+
+class FeedServer(BaseHTTPRequestHandler):
+    """Serves a feed with validators, answering 304 to matching conditional
+    requests. The first `failures` requests get a 503."""
+    failures = 0
+    retry_after = None
+    requests = []
+
+    def do_GET(self):
+        FeedServer.requests.append((self.path, dict(self.headers)))
+        if FeedServer.failures:
+            FeedServer.failures -= 1
+            self.send_response(503)
+            if FeedServer.retry_after is not None:
+                self.send_header('Retry-After', str(FeedServer.retry_after))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if self.headers.get('If-None-Match') == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = b'{"items": []}'
+        self.send_response(200)
+        self.send_header('ETag', ETAG)
+        self.send_header('Last-Modified', LAST_MODIFIED)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope='module')
+def base():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FeedServer)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+
+
+@pytest.fixture
+def feed(base):
+    FeedServer.failures = 0
+    FeedServer.retry_after = None
+    FeedServer.requests = []
+    return base
+
+
+def client(tmp_path, **kwargs):
+    return HttpClient(validators_file=str(tmp_path / 'validators.json'), backoff_factor=0.01,
+                      guard=HostGuard(str(tmp_path / 'hosts.db'), limits={}, failure_threshold=10), **kwargs)
+
+
+def test_stored_validators_turn_the_next_request_into_a_304(feed, tmp_path):
+    url = f'{feed}/feed'
+    first = client(tmp_path).get(url, conditional=True)
+    assert first.status_code == 200
+    # Not stored until the caller has processed the response
+    assert client(tmp_path).get(url, conditional=True).status_code == 200
+    client(tmp_path).store_validators(first)
+
+    # A new client, as in the next collection run, reads them back
+    response = client(tmp_path).get(url, conditional=True)
+    assert response.status_code == 304
+    headers = FeedServer.requests[-1][1]
+    assert headers['If-None-Match'] == ETAG
+    assert headers['If-Modified-Since'] == LAST_MODIFIED
+
+
+def test_unconditional_requests_send_no_validators(feed, tmp_path):
+    http = client(tmp_path)
+    http.store_validators(http.get(f'{feed}/feed', conditional=True))
+    assert http.get(f'{feed}/feed').status_code == 200
+    assert 'If-None-Match' not in FeedServer.requests[-1][1]
+
+
+def test_validators_are_keyed_without_the_api_key(feed, tmp_path):
+    http = client(tmp_path)
+    url = f'{feed}/videos'
+    http.store_validators(http.get(url, conditional=True, params={'chart': 'mostPopular', 'key': 'secret'}))
+    with open(tmp_path / 'validators.json') as f:
+        stored = json.load(f)
+    assert list(stored) == [f'{url}?chart=mostPopular']
+    assert 'secret' not in json.dumps(stored)
+
+    # A rotated key still matches the stored validators
+    response = http.get(url, conditional=True, params={'chart': 'mostPopular', 'key': 'other'})
+    assert response.status_code == 304
+
+
+def test_503s_are_retried(feed, tmp_path):
+    FeedServer.failures = 2
+    assert client(tmp_path, retries=2).get(f'{feed}/feed').status_code == 200
+    assert len(FeedServer.requests) == 3
+
+    FeedServer.failures, FeedServer.requests = 3, []
+    assert client(tmp_path, retries=2).get(f'{feed}/feed').status_code == 503
+    assert len(FeedServer.requests) == 3
+
+
+def test_long_retry_after_is_not_waited_out(feed, tmp_path):
+    FeedServer.failures, FeedServer.retry_after = 1, 1
+    assert client(tmp_path).get(f'{feed}/feed').status_code == 200
+    assert len(FeedServer.requests) == 2
+
+    FeedServer.failures, FeedServer.retry_after, FeedServer.requests = 1, 3600, []
+    start = time.perf_counter()
+    response = client(tmp_path).get(f'{feed}/feed')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '3600'
+    assert time.perf_counter() - start < 1
+    assert len(FeedServer.requests) == 1
+
+
+def test_host_overrides_redirect_a_host(feed, tmp_path):
+    http = client(tmp_path, host_overrides={'www.reddit.com': feed})
+    response = http.get('https://www.reddit.com/r/popular.json?limit=5')
+    assert response.status_code == 200
+    assert FeedServer.requests[-1][0] == '/r/popular.json?limit=5'
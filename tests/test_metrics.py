@@ -0,0 +1,30 @@
+import re
+import time
+
+import app
+import metrics
+import collect_trends
+from collection_engine import run_collectors
+
+# name{labels} value, with a value Prometheus can parse
+SAMPLE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{.*\})? (\S+)$')
+
+
+def test_metrics_stay_valid_after_a_collector_times_out(tmp_path, monkeypatch):
+    summary_file = str(tmp_path / 'last_run.json')
+    monkeypatch.setattr(metrics, 'RUN_SUMMARY_FILE', summary_file)
+    monkeypatch.setattr(collect_trends, 'RUN_SUMMARY_FILE', summary_file)
+
+    run_start = time.time()
+    flat = run_collectors({('in', 'reddit'): lambda: time.sleep(1), ('in', 'news'): lambda: True},
+                          {'reddit': 0.1}, total_timeout=5)
+    assert flat[('in', 'reddit')]['status'] == 'timeout'
+    collect_trends.write_run_summary(run_start, {'in': {platform: result for (_, platform), result in flat.items()}})
+
+    body = app.app.test_client().get('/metrics').get_data(as_text=True)
+    assert 'trend_last_run_response_bytes{region="in",platform="reddit"} 0' in body
+    for line in body.splitlines():
+        if line and not line.startswith('#'):
+            match = SAMPLE.match(line)
+            assert match, line
+            float(match.group(2))
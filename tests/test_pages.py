@@ -0,0 +1,58 @@
+import pytest
+
+import app
+
+
+@pytest.fixture
+def client():
+    app._render_cache.clear()
+    yield app.app.test_client()
+    app._render_cache.clear()
+
+
+def test_limits_past_the_trend_count_share_the_full_page(client):
+    full = client.get('/platform/spotify').data
+    for limit in range(1000, 1050):
+        assert client.get(f'/platform/spotify?limit={limit}').data == full
+    assert len(app._render_cache) == 1
+
+
+def test_render_cache_is_bounded(client, monkeypatch):
+    monkeypatch.setattr(app, 'MAX_CACHED_PAGES', 5)
+    for limit in range(1, 10):
+        assert client.get(f'/platform/youtube?limit={limit}').status_code == 200
+    assert len(app._render_cache) == 5
+    # The most recently used pages are kept
+    assert client.get('/platform/youtube?limit=9').status_code == 200
+    assert ('platform', app.DEFAULT_REGION, 'youtube', None, 9) in app._render_cache
+    assert ('platform', app.DEFAULT_REGION, 'youtube', None, 1) not in app._render_cache
+
+
+def test_unknown_platform_is_not_found(client):
+    assert client.get('/platform/bogus').status_code == 404
+
+
+def test_meta_fields_are_filtered_formatted_and_escaped():
+    trend = {'score': 29141, 'subreddit': '<b>news</b>', 'author': None}
+    reddit = {meta['field']: meta for meta in app.PLATFORM_SETTINGS['reddit']['meta']}
+    assert app.meta_value(trend, reddit['score']) == '29,141 points'
+    assert app.meta_value(trend, reddit['author']) == ''
+    with app.app.test_request_context():
+        html = app.render_template('platform_trends.html', platform='reddit', platform_display='Reddit',
+                                   settings=app.PLATFORM_SETTINGS['reddit'],
+                                   trend_data={'trends': [dict(trend, rank=1, title='t', url='u')]},
+                                   **app.region_context(app.DEFAULT_REGION))
+    assert '<span class="subreddit">r/&lt;b&gt;news&lt;/b&gt;</span>' in html
+    assert '<span class="score">29,141 points</span>' in html
+
+
+def test_optional_meta_fields_are_left_out_when_empty():
+    spotify = app.PLATFORM_SETTINGS['spotify']
+    with app.app.test_request_context():
+        html = app.render_template('platform_trends.html', platform='spotify', platform_display='Spotify',
+                                   settings=spotify,
+                                   trend_data={'trends': [{'rank': 1, 'title': 't', 'url': 'u', 'duration': 215,
+                                                           'popularity': 0}]},
+                                   **app.region_context(app.DEFAULT_REGION))
+    assert '<span class="duration">3:35 min</span>' in html
+    assert 'class="popularity"' not in html
@@ -0,0 +1,82 @@
+import os
+
+import pytest
+
+import trend_store
+import trend_writer
+import collect_trends
+import s3_operations
+import render_ssh_config
+
+REGION = 'us'
+
+
+@pytest.fixture
+def publishing(tmp_path, monkeypatch):
+    """Keep trend files and state in a scratch directory, and record what
+    would be uploaded and pushed"""
+    monkeypatch.setattr(trend_store, 'DATA_DIR', str(tmp_path))
+    monkeypatch.setattr(collect_trends, 'DATA_DIR', str(tmp_path))
+    monkeypatch.setattr(trend_writer, 'STATE_DIR', str(tmp_path / '.state'))
+    monkeypatch.setenv('AWS_S3_BUCKET', 'trends')
+    calls = {'uploads': [], 'pushes': 0, 'upload_ok': True}
+
+    def store_trends_in_s3(data_dir, bucket_name, trend_files=None):
+        calls['uploads'].append(sorted(trend_files))
+        return calls['upload_ok']
+
+    def setup_git():
+        calls['pushes'] += 1
+        return True
+    monkeypatch.setattr(s3_operations, 'store_trends_in_s3', store_trends_in_s3)
+    monkeypatch.setattr(render_ssh_config, 'setup_git', setup_git)
+    trend_store.clear_cache()
+    yield calls
+    trend_store.clear_cache()
+
+
+def save(platform, title):
+    return trend_writer.save_trends(platform, {'trends': [{'rank': 1, 'title': title}], 'last_updated': title},
+                                    region=REGION)
+
+
+def publish():
+    return collect_trends.publish_changes({REGION: {}})
+
+
+def test_unchanged_trends_skip_write_upload_and_push(publishing):
+    assert save('news', 'First')
+    path = trend_store.trend_file_path('news', REGION)
+    written = os.stat(path).st_mtime_ns
+    assert publish()
+    assert publishing['uploads'] == [['regions/us/news_trends.json']]
+    assert publishing['pushes'] == 1
+
+    # Only last_updated differs
+    assert not trend_writer.save_trends('news', {'trends': [{'rank': 1, 'title': 'First'}],
+                                                 'last_updated': 'later'}, region=REGION)
+    assert os.stat(path).st_mtime_ns == written
+    assert not publish()
+    assert len(publishing['uploads']) == 1
+    assert publishing['pushes'] == 1
+
+
+def test_changes_written_after_a_run_are_published_by_the_next(publishing):
+    save('news', 'First')
+    publish()
+    # A collector that missed its deadline writes once its run has ended;
+    # that run published without it
+    save('reddit', 'Late')
+    save('news', 'Second')
+    assert publish()
+    assert publishing['uploads'][-1] == ['regions/us/news_trends.json', 'regions/us/reddit_trends.json']
+
+
+def test_failed_uploads_are_retried(publishing):
+    save('news', 'First')
+    publishing['upload_ok'] = False
+    assert publish()
+    publishing['upload_ok'] = True
+    assert publish()
+    assert publishing['uploads'] == [['regions/us/news_trends.json']] * 2
+    assert not publish()
@@ -0,0 +1,173 @@
+import json
+import threading
+import multiprocessing
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+import pytest
+
+import collect_trends
+from http_client import HttpClient, set_client
+from quota import QuotaLedger, set_ledger
+from host_guard import HostGuard, set_guard
+
+CHART_SIZE = 200
+API_KEY = 'test-key'
+
+
+def make_video(i):
+    return {
+        'kind': 'youtube#video', 'etag': f'etag-{i:04d}', 'id': f'vid{i:08d}',
+        'snippet': {
+            'publishedAt': '2025-09-02T10:00:00Z', 'channelId': f'UC{i:022d}',
+            'title': f'Trending video number {i}', 'channelTitle': f'Channel {i % 37}',
+            'description': 'Full video description with links, credits and hashtags. ' * 8,
+            'thumbnails': {size: {'url': f'https://i.ytimg.com/vi/vid{i:08d}/{size}.jpg', 'width': 480, 'height': 360}
+                           for size in ('default', 'medium', 'high', 'standard', 'maxres')},
+            'tags': [f'tag{j}' for j in range(12)], 'categoryId': '10', 'liveBroadcastContent': 'none',
+            'localized': {'title': f'Trending video number {i}', 'description': '...'}
+        },
+        'statistics': {'viewCount': str(10_000_000 - i * 1000), 'likeCount': str(50_000 - i),
+                       'favoriteCount': '0', 'commentCount': str(900 + i)}
+    }
+
+CHART = [make_video(i) for i in range(CHART_SIZE)]
+
+
+def trim(video):
+    """Apply the collector's fields= selection to one video"""
+    return {'id': video['id'],
+            'snippet': {k: video['snippet'][k] for k in ('title', 'channelTitle')},
+            'statistics': {k: video['statistics'][k] for k in ('viewCount', 'likeCount')}}
+
+
+class FakeYouTube(BaseHTTPRequestHandler):
+    """mostPopular chart of CHART_SIZE full video resources, trimmed to the
+    requested fields= paths"""
+    quota_exceeded = False
+    requests = []
+    bytes_sent = 0
+
+    def do_GET(self):
+        query = {k: v[0] for k, v in parse_qs(urlsplit(self.path).query).items()}
+        FakeYouTube.requests.append(query)
+        if FakeYouTube.quota_exceeded:
+            body = {'error': {'code': 403, 'message': 'quota', 'errors': [{'reason': 'quotaExceeded'}]}}
+            return self._send(403, body)
+        size = min(int(query.get('maxResults', 5)), 50)
+        offset = int(query.get('pageToken', 0))
+        items = CHART[offset:offset + size]
+        body = {'items': [trim(v) for v in items] if 'fields' in query else items}
+        if offset + size < CHART_SIZE:
+            body['nextPageToken'] = str(offset + size)
+        if 'fields' not in query:
+            body.update({'kind': 'youtube#videoListResponse', 'etag': 'list',
+                         'pageInfo': {'totalResults': CHART_SIZE, 'resultsPerPage': size}})
+        self._send(200, body)
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        FakeYouTube.bytes_sent += len(data)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope='module')
+def base():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeYouTube)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+
+
+@pytest.fixture
+def ledger(base, tmp_path):
+    FakeYouTube.quota_exceeded = False
+    FakeYouTube.requests = []
+    FakeYouTube.bytes_sent = 0
+    set_guard(HostGuard(str(tmp_path / 'hosts.db')))
+    set_client(HttpClient(retries=0, validators_file=str(tmp_path / 'validators.json'),
+                          host_overrides={'www.googleapis.com': base}))
+    ledger = QuotaLedger(ledger_file=str(tmp_path / 'quota_ledger.json'))
+    set_ledger(ledger)
+    yield ledger
+    set_guard(None)
+    set_client(None)
+    set_ledger(None)
+
+
+def test_pages_through_the_chart_one_unit_per_page(ledger):
+    videos = collect_trends.fetch_youtube_videos(API_KEY, collect_trends.YOUTUBE_MAX_PAGES, ledger)
+    assert len(videos) == CHART_SIZE
+    assert len(FakeYouTube.requests) == 4
+    assert ledger.usage('youtube_data', API_KEY)['spent'] == 4
+    assert all(r.get('fields') == collect_trends.YOUTUBE_FIELDS for r in FakeYouTube.requests)
+    with open(ledger.ledger_file) as f:
+        assert API_KEY not in f.read()
+
+
+def test_fields_cut_the_payload(ledger, base):
+    collect_trends.fetch_youtube_videos(API_KEY, collect_trends.YOUTUBE_MAX_PAGES, ledger)
+    trimmed = FakeYouTube.bytes_sent
+    FakeYouTube.bytes_sent = 0
+    session = HttpClient(retries=0).session
+    token = None
+    while True:
+        page = session.get(f'{base}/youtube/v3/videos',
+                           params={'maxResults': 50, **({'pageToken': token} if token else {})}).json()
+        token = page.get('nextPageToken')
+        if not token:
+            break
+    assert trimmed < FakeYouTube.bytes_sent / 3
+
+
+def test_quota_refusal_goes_straight_to_the_fallback(ledger, monkeypatch):
+    FakeYouTube.quota_exceeded = True
+    assert collect_trends.fetch_youtube_videos('other-key', 4, ledger) == []
+    assert len(FakeYouTube.requests) == 1
+    assert ledger.plan('youtube_data', 'other-key', 4, 3600) == 0
+    assert ledger.plan('youtube_data', API_KEY, 4, 3600) == 4
+
+    monkeypatch.setenv('YOUTUBE_API_KEY', 'other-key')
+    assert collect_trends.get_youtube_trends_from_api() is False
+    assert len(FakeYouTube.requests) == 1
+
+
+def test_monthly_quota_is_paced_across_the_month(tmp_path):
+    ledger = QuotaLedger(ledger_file=str(tmp_path / 'month.json'))
+    start = datetime(2025, 9, 1, tzinfo=ZoneInfo('UTC')).timestamp()
+    spent_days = set()
+    for hour in range(30 * 24):
+        now = start + hour * 3600
+        units = ledger.plan('rapidapi_google', API_KEY, 1, 3600, now=now)
+        if units:
+            ledger.spend('rapidapi_google', API_KEY, units, now=now)
+            spent_days.add(hour // 24)
+    usage = ledger.usage('rapidapi_google', API_KEY, now=now)
+    assert usage['spent'] <= usage['limit']
+    assert min(spent_days) == 0 and max(spent_days) >= 28
+
+
+def spend(ledger_file, calls):
+    ledger = QuotaLedger(ledger_file=ledger_file)
+    for _ in range(calls):
+        ledger.spend('rapidapi_google', API_KEY)
+
+
+def test_processes_spending_at_once_lose_no_units(tmp_path):
+    ledger_file = str(tmp_path / 'quota_ledger.json')
+    workers = [multiprocessing.Process(target=spend, args=(ledger_file, 50)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    usage = QuotaLedger(ledger_file=ledger_file).usage('rapidapi_google', API_KEY)
+    assert (usage['spent'], usage['calls']) == (200, 200)
@@ -0,0 +1,94 @@
+import os
+import gzip
+import json
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from s3_operations import S3Publisher, store_trends_in_s3
+
+BUCKET = 'trends-test'
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    for name in ('AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY'):
+        monkeypatch.setenv(name, 'testing')
+    with mock_aws():
+        client = boto3.client('s3', region_name='us-east-1')
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def keys(client):
+    return sorted(item['Key'] for item in client.list_objects_v2(Bucket=BUCKET).get('Contents', []))
+
+
+def write_trends(directory, name, trends):
+    path = directory / name
+    path.write_text(json.dumps({'trends': trends}))
+    return str(path)
+
+
+def test_upload_is_gzipped_with_its_headers(s3, tmp_path):
+    path = write_trends(tmp_path, 'reddit_trends.json', [{'title': 'a'}])
+    publisher = S3Publisher(BUCKET, client=s3, manifest_file=str(tmp_path / 'manifest.json'))
+    result = publisher.upload(path, 'trends/reddit_trends.json')
+    assert result['status'] == 'uploaded'
+
+    obj = s3.get_object(Bucket=BUCKET, Key='trends/reddit_trends.json')
+    body = obj['Body'].read()
+    assert result['bytes'] == len(body)
+    assert json.loads(gzip.decompress(body)) == {'trends': [{'title': 'a'}]}
+    assert obj['ContentEncoding'] == 'gzip'
+    assert obj['ContentType'] == 'application/json'
+    assert obj['CacheControl'] == 'public, max-age=300'
+    assert obj['Metadata'] == {'sha256': result['sha256']}
+
+
+def test_large_files_go_up_in_parts(s3, tmp_path):
+    path = tmp_path / 'archive.bin'
+    # Random bytes don't compress, so the payload stays above the threshold
+    path.write_bytes(os.urandom(12 * 1024 * 1024))
+    publisher = S3Publisher(BUCKET, client=s3, manifest_file=None, multipart_threshold=5 * 1024 * 1024)
+    assert publisher.upload(str(path), 'archive.bin')['status'] == 'uploaded'
+
+    obj = s3.get_object(Bucket=BUCKET, Key='archive.bin')
+    # Multipart ETags end in -<number of parts>
+    assert obj['ETag'].strip('"').endswith('-3')
+    assert obj['ContentEncoding'] == 'gzip'
+    assert gzip.decompress(obj['Body'].read()) == path.read_bytes()
+
+
+def test_unchanged_files_are_skipped(s3, tmp_path):
+    manifest = str(tmp_path / 'manifest.json')
+    reddit = write_trends(tmp_path, 'reddit_trends.json', [{'title': 'a'}])
+    news = write_trends(tmp_path, 'news_trends.json', [{'title': 'b'}])
+    files = [(reddit, 'run1/reddit_trends.json', 'reddit_trends.json'),
+             (news, 'run1/news_trends.json', 'news_trends.json')]
+    results = S3Publisher(BUCKET, client=s3, manifest_file=manifest).publish(files)
+    assert [result['status'] for result in results] == ['uploaded', 'uploaded']
+    with open(manifest) as f:
+        assert set(json.load(f)) == {'reddit_trends.json', 'news_trends.json'}
+
+    # A new publisher reads the manifest back; only the changed file goes up
+    write_trends(tmp_path, 'news_trends.json', [{'title': 'c'}])
+    files = [(path, key.replace('run1', 'run2'), name) for path, key, name in files]
+    results = S3Publisher(BUCKET, client=s3, manifest_file=manifest).publish(files)
+    assert [result['status'] for result in results] == ['skipped', 'uploaded']
+    assert keys(s3) == ['run1/news_trends.json', 'run1/reddit_trends.json', 'run2/news_trends.json']
+
+    results = S3Publisher(BUCKET, client=s3, manifest_file=manifest).publish(files, force=True)
+    assert [result['status'] for result in results] == ['uploaded', 'uploaded']
+
+
+def test_store_trends_in_s3_reports_errors(s3, tmp_path):
+    write_trends(tmp_path, 'reddit_trends.json', [{'title': 'a'}])
+    publisher = S3Publisher('missing-bucket', client=s3, manifest_file=str(tmp_path / 'manifest.json'))
+    assert not store_trends_in_s3(str(tmp_path), 'missing-bucket', ['reddit_trends.json'], publisher=publisher)
+    assert publisher.manifest == {}
+
+    publisher = S3Publisher(BUCKET, client=s3, manifest_file=str(tmp_path / 'manifest.json'))
+    assert store_trends_in_s3(str(tmp_path), BUCKET, ['reddit_trends.json', 'news_trends.json'], publisher=publisher)
+    assert [key.rsplit('/', 1)[1] for key in keys(s3)] == ['reddit_trends.json']
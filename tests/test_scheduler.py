@@ -0,0 +1,92 @@
+import time
+import threading
+
+import pytest
+
+import scheduler
+import trend_writer
+import collect_trends
+from collection_engine import run_collectors
+
+
+@pytest.fixture
+def slow_collector(tmp_path, monkeypatch):
+    """Point collector state at a scratch directory and make every collector
+    take half a second, counting how many ran"""
+    monkeypatch.setattr(trend_writer, 'STATE_DIR', str(tmp_path))
+    runs = []
+
+    def collect(region):
+        runs.append(region)
+        time.sleep(0.5)
+        return True
+    monkeypatch.setattr(collect_trends, 'get_collector', lambda platform: collect)
+    return runs
+
+
+def test_one_collection_per_platform_at_a_time(slow_collector):
+    results = []
+
+    def run():
+        results.append(run_collectors({'youtube': lambda: collect_trends.collect_exclusively('youtube')}))
+    threads = [threading.Thread(target=run) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(slow_collector) == 1
+    assert sorted(r['youtube']['status'] for r in results) == ['skipped', 'skipped', 'success']
+
+
+def test_lingering_collector_keeps_its_lock(slow_collector):
+    first = run_collectors({'reddit': lambda: collect_trends.collect_exclusively('reddit')},
+                           platform_timeouts={'reddit': 0.1})
+    assert first['reddit']['status'] == 'timeout'
+    second = run_collectors({'reddit': lambda: collect_trends.collect_exclusively('reddit')})
+    assert second['reddit']['status'] == 'skipped'
+    assert len(slow_collector) == 1
+
+    time.sleep(0.5)
+    third = run_collectors({'reddit': lambda: collect_trends.collect_exclusively('reddit')})
+    assert third['reddit']['status'] == 'success'
+
+
+def test_other_platforms_collect_concurrently(slow_collector):
+    results = run_collectors({platform: (lambda p=platform: collect_trends.collect_exclusively(p))
+                              for platform in ('reddit', 'news')})
+    assert {r['status'] for r in results.values()} == {'success'}
+
+
+def test_in_process_scheduler_publishes(monkeypatch):
+    monkeypatch.setattr(scheduler, '_scheduler', None)
+    assert scheduler.get_scheduler().on_complete is scheduler.publish_results
+    scheduler.get_scheduler().stop()
+
+
+def finished(trend_scheduler, job):
+    for _ in range(100):
+        status = trend_scheduler.get_job(job['id'])
+        if status.get('finished_at'):
+            return status
+        time.sleep(0.02)
+    raise AssertionError(f"job {job['id']} did not finish")
+
+
+def test_failed_publish_keeps_the_collection_completed():
+    def publish(results):
+        raise EnvironmentError('No SSH key found in environment variables.')
+    trend_scheduler = scheduler.TrendScheduler(collect=lambda platforms: {'in': {}}, on_complete=publish)
+    try:
+        job = finished(trend_scheduler, trend_scheduler.enqueue(['reddit']))
+        assert job['status'] == 'completed'
+        assert job['publish_error'] == 'No SSH key found in environment variables.'
+        assert job['error'] is None
+
+        def collect(platforms):
+            raise RuntimeError('disk full')
+        trend_scheduler.collect = collect
+        job = finished(trend_scheduler, trend_scheduler.enqueue(['news']))
+        assert (job['status'], job['error']) == ('failed', 'disk full')
+        assert job['publish_error'] is None
+    finally:
+        trend_scheduler.stop()
@@ -0,0 +1,106 @@
+import time
+import sqlite3
+import threading
+
+import pytest
+
+import trend_history
+
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    monkeypatch.setattr(trend_history, 'HISTORY_DB', str(tmp_path / 'history.db'))
+    monkeypatch.setattr(trend_history, 'SEARCH_CANDIDATES', 5)
+    monkeypatch.setattr(trend_history, '_local', type(trend_history._local)())
+    monkeypatch.setattr(trend_history, '_migrated', set())
+    return tmp_path / 'history.db'
+
+
+def record(hour, titles):
+    trend_history.record_snapshot('news', {'trends': [{'title': title} for title in titles]},
+                                  f'news-{hour}', (hour + 1) * 3600)
+
+
+def test_trend_seen_again_is_a_candidate(history):
+    record(0, ['Election results live'])
+    for hour in range(1, 10):
+        record(hour, [f'Election day {hour} story {i}' for i in range(3)])
+    record(10, ['Election results live'])
+    titles = [result['title'] for result in trend_history.search('election', limit=50)]
+    assert 'Election results live' in titles
+
+
+def test_old_exact_title_match_comes_first(history):
+    record(0, ['Election'])
+    for hour in range(1, 10):
+        record(hour, [f'Election day {hour} story {i}' for i in range(3)])
+    results = trend_history.search('election')
+    assert results[0]['title'] == 'Election'
+    assert results[0]['seen_at'] == [3600]
+    assert len(results) == 6
+
+
+def test_older_databases_are_renumbered_by_last_seen(history):
+    record(0, ['Old but current'])
+    record(1, ['Newer but gone'])
+    record(2, ['Old but current'])
+    conn = sqlite3.connect(history)
+    # Ids in first-seen order, as databases indexed before user_version 1 have them
+    conn.execute("UPDATE trend_docs SET id = id + 100 WHERE title = 'Newer but gone'")
+    conn.execute('PRAGMA user_version = 0')
+    conn.commit()
+    conn.close()
+
+    trend_history._local.__dict__.clear()
+    trend_history._migrated.clear()
+    # Reads don't migrate
+    trend_history.search('but')
+    conn = trend_history._connect()
+    assert conn.execute('PRAGMA user_version').fetchone()[0] == 0
+
+    # The next recorded snapshot does, once
+    record(3, ['Old but current'])
+    assert [row[0] for row in conn.execute('SELECT title FROM trend_docs ORDER BY id')] == \
+        ['Newer but gone', 'Old but current']
+    assert conn.execute('PRAGMA user_version').fetchone()[0] == trend_history.SCHEMA_VERSION
+    assert len(trend_history.search('but')) == 2
+
+
+def test_history_recorded_before_the_search_index_is_indexed(history):
+    record(0, ['Monsoon arrives'])
+    conn = sqlite3.connect(history)
+    conn.execute('DELETE FROM trend_docs')
+    conn.execute("INSERT INTO trend_search (trend_search) VALUES ('delete-all')")
+    conn.execute('PRAGMA user_version = 0')
+    conn.commit()
+    conn.close()
+
+    trend_history._local.__dict__.clear()
+    trend_history._migrated.clear()
+    assert trend_history.search('monsoon') == []
+    trend_history.migrate()
+    assert [result['title'] for result in trend_history.search('monsoon')] == ['Monsoon arrives']
+
+
+def test_concurrent_collectors_migrate_once(history, monkeypatch):
+    record(0, ['Old but current'])
+    conn = sqlite3.connect(history)
+    conn.execute('PRAGMA user_version = 0')
+    conn.commit()
+    conn.close()
+    trend_history._migrated.clear()
+
+    renumbered = []
+    order_docs = trend_history._order_docs_by_last_seen
+
+    def slow_order_docs(conn):
+        renumbered.append(threading.current_thread().name)
+        time.sleep(0.2)
+        order_docs(conn)
+    monkeypatch.setattr(trend_history, '_order_docs_by_last_seen', slow_order_docs)
+    threads = [threading.Thread(target=record, args=(hour, [f'Story {hour}'])) for hour in range(1, 5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(renumbered) == 1
@@ -0,0 +1,62 @@
+import os
+import time
+
+import pytest
+
+from fake_spotify import FakeSpotify
+from spotify_source import SpotifyPlaylists
+
+QUERY = 'Bollywood Hits'
+LATENCY = 0.05
+
+
+@pytest.fixture
+def cache_file(tmp_path):
+    return str(tmp_path / 'spotify_cache.json')
+
+
+def first_run(cache_file):
+    fake = FakeSpotify()
+    playlists = SpotifyPlaylists(fake, cache_file=cache_file)
+    playlist_id = playlists.find_playlist(QUERY)
+    snapshot_id, items = playlists.fetch_items(playlist_id)
+    playlists.mark_fetched(playlist_id, snapshot_id)
+    playlists.save()
+    return fake, playlist_id, items
+
+
+def test_first_run_searches_once_and_fetches_every_page(cache_file):
+    fake, playlist_id, items = first_run(cache_file)
+    assert fake.calls_to('search') == 1
+    assert len(items) == 230
+    assert fake.calls_to(f'playlists/{playlist_id}/tracks') == 3
+    first_page = next(response for key, response in fake.responses.items() if key.endswith('offset=0'))
+    assert [item['track']['name'] for item in items[:3]] == [item['track']['name'] for item in first_page['items'][:3]]
+
+
+def test_second_run_skips_the_unchanged_playlist(cache_file):
+    first_run(cache_file)
+    fake = FakeSpotify()
+    playlists = SpotifyPlaylists(fake, cache_file=cache_file)
+    snapshot_id, items = playlists.fetch_items(playlists.find_playlist(QUERY))
+    assert fake.calls_to('search') == 0
+    assert items is None
+    assert len(fake.calls) == 1
+
+
+def test_expired_playlist_id_is_searched_again(cache_file):
+    first_run(cache_file)
+    fake = FakeSpotify()
+    SpotifyPlaylists(fake, cache_file=cache_file, ttl=0).find_playlist(QUERY)
+    assert fake.calls_to('search') == 1
+
+
+def test_pages_are_fetched_concurrently(cache_file):
+    _, playlist_id, _ = first_run(cache_file)
+    timings = {}
+    for workers in (1, 4):
+        start = time.perf_counter()
+        SpotifyPlaylists(FakeSpotify(latency=LATENCY), cache_file=os.devnull,
+                         max_workers=workers).fetch_items(playlist_id, skip_unchanged=False)
+        timings[workers] = time.perf_counter() - start
+    assert timings[4] < timings[1]
@@ -0,0 +1,37 @@
+import json
+
+import pytest
+
+import trend_store
+import collect_trends
+from atomic_files import write_json_atomic
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(trend_store, 'DATA_DIR', str(tmp_path))
+    trend_store.clear_cache()
+    yield tmp_path
+    trend_store.clear_cache()
+
+
+def write(platform, title, last_updated):
+    write_json_atomic(trend_store.trend_file_path(platform),
+                      {'trends': [{'rank': 1, 'title': title}], 'last_updated': last_updated})
+
+
+def test_revalidate_sees_a_write_within_the_stat_interval(data_dir):
+    write('google', 'Old title', 'first')
+    assert trend_store.load_trends('google')['trends'][0]['title'] == 'Old title'
+    write('google', 'New title', 'second')
+    assert trend_store.load_trends('google')['trends'][0]['title'] == 'Old title'
+    assert trend_store.load_trends('google', revalidate=True)['trends'][0]['title'] == 'New title'
+
+
+def test_hot_topics_are_built_from_the_files_just_written(data_dir):
+    write('google', 'Old title', 'first')
+    trend_store.load_trends('google')
+    write('google', 'New title', 'second')
+    collect_trends.update_hot_topics()
+    with open(trend_store.trend_file_path('topics')) as f:
+        assert json.load(f)['sources']['google'] == 'second'
@@ -0,0 +1,35 @@
+import json
+import multiprocessing
+
+import velocity
+
+PLATFORMS = ('twitter', 'youtube', 'reddit', 'news')
+UPDATES = 100
+
+
+def update(state_file, rising_file, platform, start):
+    velocity.STATE_FILE, velocity.RISING_FILE = state_file, rising_file
+    start.wait()
+    for i in range(UPDATES):
+        trends = [{'title': f'{platform} {(i + n) % 20}', 'rank': n + 1} for n in range(20)]
+        velocity.update_velocity(platform, {'trends': trends}, now=1000.0 + i * 3600)
+
+
+def test_processes_keep_each_others_platforms(tmp_path):
+    state_file, rising_file = str(tmp_path / 'velocity.json'), str(tmp_path / 'rising_trends.json')
+    start = multiprocessing.Barrier(len(PLATFORMS))
+    workers = [multiprocessing.Process(target=update, args=(state_file, rising_file, platform, start))
+               for platform in PLATFORMS]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert all(worker.exitcode == 0 for worker in workers)
+    # No process overwrote another's last update
+    last = 1000.0 + (UPDATES - 1) * 3600
+    with open(state_file) as f:
+        assert {platform: entry['updated_at'] for platform, entry in json.load(f).items()} == \
+            {platform: last for platform in PLATFORMS}
+    with open(rising_file) as f:
+        assert {platform: view['updated_at'] for platform, view in json.load(f)['platforms'].items()} == \
+            {platform: last for platform in PLATFORMS}
@@ -0,0 +1,200 @@
+"""JSON API over the trend store.
+
+Builds the /api/v1/trends payloads: cursor pagination, `fields=`
+projection, `since=` filtering on last_updated, and gzip/brotli encoded
+bodies cached per query and data version, so a repeated query is served
+without re-encoding.
+"""
+import gzip
+import json
+import base64
+import hashlib
+import threading
+from collections import OrderedDict
+from normalize import parse_timestamp
+from correlate import tokenize
+from trend_store import get_snapshot, load_trends, load_ranked_trends, sort_options
+from regions import DEFAULT_REGION
+from metrics import CACHE_LOOKUPS
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+# Per-platform page size on the all-platforms endpoint
+SUMMARY_PAGE_SIZE = 10
+MAX_CACHED_RESPONSES = 256
+
+_responses = OrderedDict()
+_lock = threading.Lock()
+
+
+class ApiError(ValueError):
+    """A bad API request, reported to the client with `status`"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _version_tag(snapshot):
+    return hashlib.sha1(repr(snapshot['signature']).encode()).hexdigest()[:10]
+
+def encode_cursor(offset, snapshot):
+    """Opaque cursor for the page starting at `offset` of this data version"""
+    raw = json.dumps({'o': offset, 'v': _version_tag(snapshot)}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, snapshot):
+    """Return the offset a cursor points at. Cursors from an older version of
+    the data are rejected, since offsets would no longer line up."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        position = json.loads(raw)
+        offset, version = int(position['o']), position['v']
+    except (ValueError, TypeError, KeyError):
+        raise ApiError('Invalid cursor')
+    if offset < 0:
+        raise ApiError('Invalid cursor')
+    if version != _version_tag(snapshot):
+        raise ApiError('Cursor is from an older version of the data, start again without one', 410)
+    return offset
+
+
+def parse_query(args, page_size=DEFAULT_PAGE_SIZE):
+    """Validate request args into a normalized, hashable query dict"""
+    try:
+        limit = int(args.get('limit', page_size))
+    except ValueError:
+        raise ApiError('limit must be an integer')
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ApiError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+
+    since = args.get('since')
+    if since is not None:
+        since = parse_timestamp(since)
+        if since is None:
+            raise ApiError('since must be a unix timestamp or an ISO 8601 date')
+
+    fields = args.get('fields')
+    if fields is not None:
+        fields = tuple(sorted({f.strip() for f in fields.split(',') if f.strip()}))
+
+    return {
+        'limit': limit,
+        'cursor': args.get('cursor') or None,
+        'fields': fields,
+        'since': since,
+        'sort': args.get('sort') or None
+    }
+
+
+def _project(trends, fields):
+    if not fields:
+        return trends
+    return [{field: trend[field] for field in fields if field in trend} for trend in trends]
+
+def platform_page(platform, query, region=DEFAULT_REGION):
+    """Return one page of a platform's trends in a region as a dict, or None
+    if the platform has no data there"""
+    snapshot = get_snapshot(platform, region)
+    if not snapshot:
+        return None
+    data = snapshot['data']
+    updated_at = parse_timestamp(data.get('last_updated')) or int(snapshot['mtime'])
+    page = {
+        'platform': platform,
+        'region': region,
+        'last_updated': data.get('last_updated'),
+        'updated_at': updated_at,
+        'modified': True
+    }
+    if query['since'] is not None and updated_at <= query['since']:
+        return {**page, 'modified': False, 'total': None, 'trends': [], 'next_cursor': None}
+
+    sort = query['sort']
+    if sort is not None and sort not in sort_options(platform):
+        raise ApiError(f"{platform} trends can't be sorted by {sort!r}")
+    offset = decode_cursor(query['cursor'], snapshot) if query['cursor'] else 0
+    end = offset + query['limit']
+    trends = load_ranked_trends(platform, sort, end, region)['trends'][offset:end]
+    total = len(data.get('trends') or [])
+
+    return {
+        **page,
+        'total': total,
+        'trends': _project(trends, query['fields']),
+        'next_cursor': encode_cursor(end, snapshot) if end < total else None
+    }
+
+
+def topics_page(keyword, limit, region=DEFAULT_REGION):
+    """Return a region's hot topics, optionally only those matching every
+    token of `keyword` (looked up in the topic index built at collection time)"""
+    data = load_trends('topics', region) or {}
+    topics = data.get('topics') or []
+    if keyword:
+        index = data.get('index') or {}
+        tokens = tokenize(keyword)
+        if not tokens:
+            raise ApiError('q has no searchable words')
+        matches = set.intersection(*(set(index.get(token, ())) for token in tokens))
+        topics = [topic for i, topic in enumerate(topics) if i in matches]
+    return {'topics': topics[:limit], 'total': len(topics)}
+
+
+# --- Encoding and the response cache ---
+
+def choose_encoding(accept_encoding):
+    """Pick br, gzip or identity from an Accept-Encoding header"""
+    accepted = {part.split(';')[0].strip() for part in (accept_encoding or '').lower().split(',')}
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return 'identity'
+
+def _compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=6, mtime=0)
+    return body
+
+def cached_response(key, version, encoding, build):
+    """Return (body, etag) for a query, serializing and compressing it only
+    when the data version changed or this encoding wasn't built yet.
+    `build` returns the payload dict."""
+    with _lock:
+        entry = _responses.get(key)
+        if entry is not None and entry['version'] == version:
+            _responses.move_to_end(key)
+            encoded = entry['encoded'].get(encoding)
+            if encoded is not None:
+                CACHE_LOOKUPS.inc('api', 'hit')
+                return encoded, entry['etag'] + ('' if encoding == 'identity' else f'-{encoding}')
+
+    CACHE_LOOKUPS.inc('api', 'miss')
+    if entry is None or entry['version'] != version:
+        body = json.dumps(build(), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        entry = {
+            'version': version,
+            'etag': hashlib.sha1(body).hexdigest(),
+            'encoded': {'identity': body}
+        }
+    encoded = _compress(entry['encoded']['identity'], encoding)
+
+    with _lock:
+        entry['encoded'][encoding] = encoded
+        _responses[key] = entry
+        _responses.move_to_end(key)
+        while len(_responses) > MAX_CACHED_RESPONSES:
+            _responses.popitem(last=False)
+    return encoded, entry['etag'] + ('' if encoding == 'identity' else f'-{encoding}')
+
+def clear_response_cache():
+    with _lock:
+        _responses.clear()
@@ -0,0 +1,299 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from correlate import tokenize
+from regions import DEFAULT_REGION
+from trend_store import region_dir
+from platforms import setting
+from atomic_files import file_lock
+
+# History of the default region; other regions keep theirs in their shard
+HISTORY_DB = os.getenv('TREND_HISTORY_DB', os.path.join(os.path.dirname(__file__), 'data', 'history.db'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    platform TEXT NOT NULL,
+    captured_at REAL NOT NULL,
+    last_updated TEXT,
+    fingerprint TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_snapshots_platform_time ON snapshots (platform, captured_at);
+
+CREATE TABLE IF NOT EXISTS trend_rows (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id),
+    platform TEXT NOT NULL,
+    captured_at REAL NOT NULL,
+    rank INTEGER,
+    trend_key TEXT NOT NULL,
+    title TEXT,
+    url TEXT,
+    payload TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_rows_key_time ON trend_rows (trend_key, captured_at);
+CREATE INDEX IF NOT EXISTS idx_rows_snapshot ON trend_rows (snapshot_id, rank);
+
+-- One row per trend per platform, kept current as snapshots are recorded
+CREATE TABLE IF NOT EXISTS trend_docs (
+    id INTEGER PRIMARY KEY,
+    platform TEXT NOT NULL,
+    trend_key TEXT NOT NULL,
+    title TEXT,
+    detail TEXT,
+    keywords TEXT,
+    url TEXT,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    appearances INTEGER NOT NULL DEFAULT 1,
+    best_rank INTEGER,
+    UNIQUE (platform, trend_key)
+);
+CREATE INDEX IF NOT EXISTS idx_docs_key ON trend_docs (trend_key);
+
+-- Full-text index over trend_docs, synced by the triggers below
+CREATE VIRTUAL TABLE IF NOT EXISTS trend_search USING fts5(
+    title, detail, keywords, platform,
+    content='trend_docs', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+CREATE TRIGGER IF NOT EXISTS trend_docs_ai AFTER INSERT ON trend_docs BEGIN
+    INSERT INTO trend_search (rowid, title, detail, keywords, platform) VALUES (new.id, new.title, new.detail, new.keywords, new.platform);
+END;
+CREATE TRIGGER IF NOT EXISTS trend_docs_au AFTER UPDATE OF title, detail, keywords ON trend_docs BEGIN
+    INSERT INTO trend_search (trend_search, rowid, title, detail, keywords, platform) VALUES ('delete', old.id, old.title, old.detail, old.keywords, old.platform);
+    INSERT INTO trend_search (rowid, title, detail, keywords, platform) VALUES (new.id, new.title, new.detail, new.keywords, new.platform);
+END;
+"""
+
+# Fields searched besides the title, per platform
+SEARCH_DETAIL_FIELDS = setting('search_fields')
+# bm25 weights of the title, detail, keywords and platform columns
+SEARCH_WEIGHTS = (10.0, 4.0, 2.0, 0.0)
+SEARCH_LIMIT = 20
+# Matches considered for ranking, most recently seen first
+SEARCH_CANDIDATES = 2000
+# PRAGMA user_version of the history schema: 1 numbers trend_docs in
+# last_seen order
+SCHEMA_VERSION = 1
+DOC_COLUMNS = 'platform, trend_key, title, detail, keywords, url, first_seen, last_seen, appearances, best_rank'
+_WORD_RE = re.compile(r'[^\W_]+')
+
+_local = threading.local()
+# History databases this process has brought up to SCHEMA_VERSION
+_migrated = set()
+
+
+def history_db(region=DEFAULT_REGION):
+    """Path of a region's history database"""
+    if region == DEFAULT_REGION:
+        return HISTORY_DB
+    return os.path.join(region_dir(region), 'history.db')
+
+def _connect(region=DEFAULT_REGION):
+    """Return this thread's connection to a region's history database"""
+    path = history_db(region)
+    connections = _local.__dict__.setdefault('connections', {})
+    conn = connections.get(path)
+    if conn is None:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        conn = sqlite3.connect(path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        # WAL lets the web app read while a collection run appends
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript(SCHEMA)
+        connections[path] = conn
+    return conn
+
+def migrate(region=DEFAULT_REGION):
+    """Bring a region's history database up to SCHEMA_VERSION: index one
+    recorded before the search index existed, or renumber trend_docs in
+    last_seen order. This can take seconds on a large database, so it runs
+    from the collection path (once per process, one process at a time) and
+    never from a read; searches use the old order until then."""
+    path = history_db(region)
+    if path in _migrated:
+        return
+    with file_lock(path + '.lock'):
+        conn = _connect(region)
+        if conn.execute('SELECT NOT EXISTS (SELECT 1 FROM trend_docs) AND EXISTS (SELECT 1 FROM trend_rows)').fetchone()[0]:
+            rebuild_search_index(conn)
+        elif conn.execute('PRAGMA user_version').fetchone()[0] < SCHEMA_VERSION:
+            _order_docs_by_last_seen(conn)
+        conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+    _migrated.add(path)
+
+def trend_key(title):
+    """Normalize a trend title into the key used to follow it across snapshots"""
+    return re.sub(r'\s+', ' ', (title or '').replace('#', '')).strip().lower()
+
+def _trend_title(trend):
+    return trend.get('title') or trend.get('name') or ''
+
+def record_snapshot(platform, data, fingerprint=None, captured_at=None, region=DEFAULT_REGION):
+    """Append a platform's trends as a new snapshot.
+
+    Snapshots are only appended when the content changed since the platform's
+    latest snapshot; that snapshot stays current until the next change.
+    Returns the new snapshot id, or None if nothing was recorded.
+    """
+    trends = data.get('trends') or []
+    if not trends:
+        return None
+    captured_at = captured_at or time.time()
+    migrate(region)
+    conn = _connect(region)
+    with conn:
+        latest = conn.execute(
+            'SELECT fingerprint FROM snapshots WHERE platform = ? ORDER BY captured_at DESC LIMIT 1',
+            (platform,)
+        ).fetchone()
+        if fingerprint and latest and latest['fingerprint'] == fingerprint:
+            return None
+
+        snapshot_id = conn.execute(
+            'INSERT INTO snapshots (platform, captured_at, last_updated, fingerprint) VALUES (?, ?, ?, ?)',
+            (platform, captured_at, data.get('last_updated'), fingerprint)
+        ).lastrowid
+        conn.executemany(
+            'INSERT INTO trend_rows (snapshot_id, platform, captured_at, rank, trend_key, title, url, payload) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            [(snapshot_id, platform, captured_at, trend.get('rank', i + 1), trend_key(_trend_title(trend)),
+              _trend_title(trend), trend.get('url'), json.dumps(trend, ensure_ascii=False))
+             for i, trend in enumerate(trends)]
+        )
+        _index_trends(conn, platform, trends, captured_at)
+    return snapshot_id
+
+def _index_trends(conn, platform, trends, captured_at):
+    """Upsert a snapshot's trends into trend_docs (and so the search index).
+    A trend seen again moves to the highest id, so ids follow last_seen."""
+    docs = {}
+    for i, trend in enumerate(trends):
+        title = _trend_title(trend)
+        key = trend_key(title)
+        if key and key not in docs:
+            detail = ' '.join(str(trend[field]) for field in SEARCH_DETAIL_FIELDS.get(platform, ()) if trend.get(field))
+            docs[key] = (platform, key, title, detail, ' '.join(sorted(tokenize(title))), trend.get('url'),
+                         captured_at, captured_at, trend.get('rank', i + 1))
+    conn.executemany(
+        'INSERT INTO trend_docs (platform, trend_key, title, detail, keywords, url, first_seen, last_seen, best_rank) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) '
+        'ON CONFLICT (platform, trend_key) DO UPDATE SET '
+        'id = (SELECT MAX(id) FROM trend_docs) + 1, title = excluded.title, detail = excluded.detail, keywords = excluded.keywords, url = excluded.url, '
+        'last_seen = excluded.last_seen, appearances = appearances + 1, '
+        'best_rank = MIN(best_rank, excluded.best_rank)',
+        list(docs.values())
+    )
+
+def rebuild_search_index(conn=None):
+    """Rebuild trend_docs and the search index from every recorded snapshot"""
+    conn = conn or _connect()
+    with conn:
+        conn.execute('DELETE FROM trend_docs')
+        conn.execute("INSERT INTO trend_search (trend_search) VALUES ('delete-all')")
+        snapshots = conn.execute('SELECT id, platform, captured_at FROM snapshots ORDER BY captured_at').fetchall()
+        for snapshot in snapshots:
+            rows = conn.execute('SELECT payload FROM trend_rows WHERE snapshot_id = ? ORDER BY rank', (snapshot['id'],))
+            _index_trends(conn, snapshot['platform'], [json.loads(row['payload']) for row in rows], snapshot['captured_at'])
+
+def _order_docs_by_last_seen(conn):
+    """Renumber trend_docs in last_seen order, for databases indexed before
+    trends seen again moved to the highest id"""
+    with conn:
+        conn.execute(f'CREATE TEMP TABLE docs_by_last_seen AS SELECT {DOC_COLUMNS} FROM trend_docs ORDER BY last_seen, id')
+        conn.execute('DELETE FROM trend_docs')
+        conn.execute("INSERT INTO trend_search (trend_search) VALUES ('delete-all')")
+        conn.execute(f'INSERT INTO trend_docs ({DOC_COLUMNS}) SELECT {DOC_COLUMNS} FROM docs_by_last_seen ORDER BY rowid')
+        conn.execute('DROP TABLE docs_by_last_seen')
+
+def rank_history(title, days=7, platform=None, now=None, region=DEFAULT_REGION):
+    """Return [{platform, captured_at, rank}] for a trend over the last `days` days"""
+    since = (now or time.time()) - days * 86400
+    query = 'SELECT platform, captured_at, rank FROM trend_rows WHERE trend_key = ? AND captured_at >= ?'
+    params = [trend_key(title), since]
+    if platform:
+        query += ' AND platform = ?'
+        params.append(platform)
+    query += ' ORDER BY captured_at'
+    return [dict(row) for row in _connect(region).execute(query, params)]
+
+def trends_at(platform, timestamp, region=DEFAULT_REGION):
+    """Return the platform's trends as they stood at `timestamp` (epoch seconds), or None"""
+    conn = _connect(region)
+    snapshot = conn.execute(
+        'SELECT id, captured_at, last_updated FROM snapshots WHERE platform = ? AND captured_at <= ? '
+        'ORDER BY captured_at DESC LIMIT 1',
+        (platform, timestamp)
+    ).fetchone()
+    if snapshot is None:
+        return None
+    rows = conn.execute('SELECT payload FROM trend_rows WHERE snapshot_id = ? ORDER BY rank', (snapshot['id'],))
+    return {
+        'trends': [json.loads(row['payload']) for row in rows],
+        'last_updated': snapshot['last_updated'],
+        'captured_at': snapshot['captured_at']
+    }
+
+def list_snapshots(platform, start=None, end=None, region=DEFAULT_REGION):
+    """Return [{id, captured_at, last_updated}] for a platform within a time range"""
+    query = 'SELECT id, captured_at, last_updated FROM snapshots WHERE platform = ? AND captured_at >= ? AND captured_at <= ?'
+    params = (platform, start or 0, end or time.time())
+    return [dict(row) for row in _connect(region).execute(query + ' ORDER BY captured_at', params)]
+
+def search_query(text):
+    """Turn free text into an FTS5 query: every word must match, as a prefix"""
+    words = _WORD_RE.findall(text.lower())
+    return ' '.join(f'"{word}"*' for word in words)
+
+def search(text, platform=None, limit=SEARCH_LIMIT, hours=48, region=DEFAULT_REGION):
+    """Search current and historical trends.
+
+    Every word of `text` must match as a prefix of a title, detail
+    (channel, subreddit, artists, news source) or keyword. Returns
+    [{platform, title, detail, url, first_seen, last_seen, appearances,
+    best_rank, seen_at}], best matches first, where seen_at lists the (up
+    to `hours`) most recent snapshot times the trend was in. Trends titled
+    exactly like `text` come first; the rest are ranked among the
+    SEARCH_CANDIDATES most recently seen matches.
+    """
+    match = search_query(text)
+    if not match:
+        return []
+    if platform:
+        match = f'platform:"{platform}" AND ({match})'
+    conn = _connect(region)
+    columns = ('d.platform, d.trend_key, d.title, d.detail, d.url, d.first_seen, d.last_seen, '
+               'd.appearances, d.best_rank')
+    # Trends titled exactly like the query come first, however long ago they were seen
+    exact_query = f'SELECT {columns} FROM trend_docs d WHERE d.trend_key = ?'
+    exact_params = [trend_key(text)]
+    if platform:
+        exact_query += ' AND d.platform = ?'
+        exact_params.append(platform)
+    exact = [dict(row) for row in conn.execute(exact_query + ' ORDER BY d.appearances DESC', exact_params)]
+
+    # Rank only the SEARCH_CANDIDATES most recently seen matches: trend_docs
+    # ids follow last_seen, so walking the index in rowid order stops early,
+    # where bm25 over every match of a common word would score the whole year
+    query = (f'SELECT {columns} '
+             'FROM (SELECT rowid, bm25(trend_search, ?, ?, ?, ?) AS score FROM trend_search '
+             'WHERE trend_search MATCH ? ORDER BY rowid DESC LIMIT ?) AS matches '
+             'JOIN trend_docs d ON d.id = matches.rowid '
+             'ORDER BY matches.score, d.appearances DESC LIMIT ?')
+    params = [*SEARCH_WEIGHTS, match, SEARCH_CANDIDATES, limit]
+    exact_keys = {(doc['platform'], doc['trend_key']) for doc in exact}
+    ranked = [dict(row) for row in conn.execute(query, params)
+              if (row['platform'], row['trend_key']) not in exact_keys]
+
+    results = (exact + ranked)[:limit]
+    for result in results:
+        result['seen_at'] = [seen['captured_at'] for seen in conn.execute(
+            'SELECT DISTINCT captured_at FROM trend_rows WHERE trend_key = ? AND platform = ? '
+            'ORDER BY captured_at DESC LIMIT ?',
+            (result.pop('trend_key'), result['platform'], hours)
+        )]
+    return results
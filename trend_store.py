@@ -0,0 +1,214 @@
+import os
+import json
+import time
+import heapq
+import threading
+from normalize import normalize_payload
+from platforms import setting
+from regions import DEFAULT_REGION
+from metrics import get_logger
+
+log = get_logger(__name__)
+
+# Define data directory
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+
+TOP_N = 10
+
+# Minimum seconds between stat() checks of the same file. Trend files change
+# at most once an hour, so steady-state requests are served from memory.
+STAT_INTERVAL = 1.0
+
+
+# Fields each platform can be ranked by (highest first). The first one is
+# the platform's default, used for its top 10; platforms without one keep
+# file order. Records are normalized on load, so these are ints or None.
+SORT_FIELDS = setting('sort_fields')
+# Platforms whose top 10 is ranked rather than simply the first 10 in file order
+TOP_SORT_FIELDS = {platform: field for platform, field in setting('top_sort').items() if field}
+
+
+def _field_key(field):
+    # Missing values rank last
+    return lambda trend: (trend.get(field) is not None, trend.get(field) or 0)
+
+def ranked_views(platform, trends):
+    """Return {field: [trend indexes, highest first]} for each sort field of
+    a platform. Written into trend files at collection time so the read path
+    never sorts."""
+    views = {}
+    for field in SORT_FIELDS.get(platform, ()):
+        key = _field_key(field)
+        views[field] = sorted(range(len(trends)), key=lambda i: key(trends[i]), reverse=True)
+    return views
+
+def _valid_view(view, count):
+    return isinstance(view, list) and len(view) == count and all(isinstance(i, int) and 0 <= i < count for i in view)
+
+_cache = {}
+_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'reloads': 0, 'errors': 0}
+
+
+def _count(stat):
+    with _lock:
+        _stats[stat] += 1
+
+# Views derived from all platforms at collection time, served like a platform
+DERIVED_FILES = {'topics': 'hot_topics.json', 'rising': 'rising_trends.json'}
+
+def region_dir(region=DEFAULT_REGION):
+    """Return the directory holding a region's trend files, derived views and
+    state. The default region lives at the top of data/, others in shards."""
+    if region == DEFAULT_REGION:
+        return DATA_DIR
+    return os.path.join(DATA_DIR, 'regions', region)
+
+def trend_file_path(platform, region=DEFAULT_REGION):
+    """Return the JSON file path for a platform (or a derived view) in a region"""
+    return os.path.join(region_dir(region), DERIVED_FILES.get(platform, f'{platform}_trends.json'))
+
+def _build_snapshot(platform, path, signature):
+    """Read, parse, normalize and pre-sort a trend file"""
+    with open(path, 'r') as f:
+        data = json.load(f)
+    if platform not in DERIVED_FILES:
+        data = normalize_payload(platform, data)
+
+    trends = data.get('trends') or []
+    stored = data.pop('ranked', None) or {}
+    ranked = {field: view for field, view in stored.items()
+              if field in SORT_FIELDS.get(platform, ()) and _valid_view(view, len(trends))}
+
+    field = TOP_SORT_FIELDS.get(platform)
+    if field in ranked:
+        top = [trends[i] for i in ranked[field][:TOP_N]]
+    elif field:
+        # Files written before ranked views existed: partial selection only
+        top = heapq.nlargest(TOP_N, trends, key=_field_key(field))
+    else:
+        top = trends[:TOP_N]
+
+    return {
+        'path': path,
+        'signature': signature,
+        'mtime': signature[0] / 1e9,
+        'data': data,
+        'top': {**data, 'trends': top},
+        'ranked': ranked,
+        'checked_at': time.monotonic()
+    }
+
+def get_snapshot(platform, region=DEFAULT_REGION, revalidate=False):
+    """Return the cached snapshot for a platform in a region, reloading it if the file changed.
+
+    Snapshots are shared between requests and must be treated as read-only.
+    Returns None if the platform has no readable data. revalidate=True
+    checks the file even within STAT_INTERVAL of the last check, for
+    readers that must see a write this process just made.
+    """
+    path = trend_file_path(platform, region)
+    snapshot = _cache.get(path)
+    now = time.monotonic()
+    if snapshot and not revalidate and now - snapshot['checked_at'] < STAT_INTERVAL:
+        _count('hits')
+        return snapshot
+
+    try:
+        st = os.stat(path)
+    except OSError:
+        _count('misses')
+        _cache.pop(path, None)
+        return None
+
+    # Writers replace files atomically, so a new inode means a new version
+    signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+    if snapshot and snapshot['signature'] == signature:
+        snapshot['checked_at'] = now
+        _count('hits')
+        return snapshot
+
+    with _lock:
+        _stats['misses'] += 1
+        snapshot = _cache.get(path)
+        if snapshot and snapshot['signature'] == signature:
+            return snapshot
+        try:
+            fresh = _build_snapshot(platform, path, signature)
+        except (OSError, ValueError) as e:
+            # Keep serving the previous snapshot rather than an empty card
+            log.warning("Error loading %s data: %s", platform, e)
+            _stats['errors'] += 1
+            return snapshot
+        _stats['reloads'] += 1
+        _cache[path] = fresh
+        return fresh
+
+def load_trends(platform, region=DEFAULT_REGION, revalidate=False):
+    """Return the full trend data for a platform, or None"""
+    snapshot = get_snapshot(platform, region, revalidate)
+    return snapshot['data'] if snapshot else None
+
+def load_top_trends(platform, region=DEFAULT_REGION):
+    """Return the top 10 trend data for a platform, or None"""
+    snapshot = get_snapshot(platform, region)
+    return snapshot['top'] if snapshot else None
+
+def sort_options(platform):
+    """Return the fields a platform's trends can be sorted by"""
+    return SORT_FIELDS.get(platform, ())
+
+def load_ranked_trends(platform, sort=None, limit=None, region=DEFAULT_REGION):
+    """Return trend data with trends ordered by `sort` (highest first, or
+    file order when None) and cut to `limit`, or None.
+
+    Uses the ranked views precomputed at collection time when present, and
+    otherwise partial selection, so no request sorts the full list.
+    """
+    snapshot = get_snapshot(platform, region)
+    if not snapshot:
+        return None
+    data = snapshot['data']
+    trends = data.get('trends') or []
+    if sort is None:
+        selected = trends[:limit] if limit else trends
+    elif sort not in sort_options(platform):
+        raise ValueError(f"Can't sort {platform} trends by {sort!r}")
+    elif sort in snapshot['ranked']:
+        view = snapshot['ranked'][sort]
+        selected = [trends[i] for i in (view[:limit] if limit else view)]
+    else:
+        selected = heapq.nlargest(limit or len(trends), trends, key=_field_key(sort))
+    return {**data, 'trends': selected}
+
+def cache_stats():
+    """Return snapshot cache counters"""
+    with _lock:
+        stats = dict(_stats)
+        stats['entries'] = len(_cache)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+    return stats
+
+def clear_cache():
+    """Drop all cached snapshots and reset counters"""
+    with _lock:
+        _cache.clear()
+        for key in _stats:
+            _stats[key] = 0
+
+def data_version(platforms, region=DEFAULT_REGION):
+    """Return (version, last_modified) for the trend files of the given platforms in a region.
+
+    The version changes whenever any of the files is rewritten, so it can key
+    caches of anything derived from the data. last_modified is the newest
+    file mtime as a unix timestamp, or None if no file exists.
+    """
+    signatures = []
+    mtimes = []
+    for platform in platforms:
+        snapshot = get_snapshot(platform, region)
+        signatures.append(snapshot['signature'] if snapshot else None)
+        if snapshot:
+            mtimes.append(snapshot['mtime'])
+    return tuple(signatures), (max(mtimes) if mtimes else None)
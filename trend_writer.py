@@ -0,0 +1,124 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from trend_store import DATA_DIR, region_dir, trend_file_path, ranked_views
+from regions import DEFAULT_REGION
+from trend_history import record_snapshot
+from velocity import update_velocity
+from metrics import timed
+from atomic_files import write_json_atomic, file_lock
+
+STATE_DIR = os.path.join(DATA_DIR, '.state')
+REFRESH_STATE_FILE = os.path.join(STATE_DIR, 'refresh_state.json')
+
+# Keys that change on every run without the trends themselves changing
+VOLATILE_KEYS = ('last_updated',)
+
+_lock = threading.Lock()
+
+def fingerprint(data):
+    """Return a content hash of a trend payload, ignoring volatile keys"""
+    stable = {k: v for k, v in data.items() if k not in VOLATILE_KEYS}
+    encoded = json.dumps(stable, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+def state_dir(region=DEFAULT_REGION):
+    """Directory for a region's collector state"""
+    return STATE_DIR if region == DEFAULT_REGION else os.path.join(region_dir(region), '.state')
+
+def _refresh_state_file(region):
+    return REFRESH_STATE_FILE if region == DEFAULT_REGION else os.path.join(state_dir(region), 'refresh_state.json')
+
+def load_refresh_state(region=DEFAULT_REGION):
+    """Return a region's per-platform fingerprint / heartbeat state"""
+    try:
+        with open(_refresh_state_file(region), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_refresh_state(state, region=DEFAULT_REGION):
+    write_json_atomic(_refresh_state_file(region), state)
+
+def _file_fingerprint(path):
+    """Fingerprint the trend file currently on disk, or None"""
+    try:
+        with open(path, 'r') as f:
+            return fingerprint(json.load(f))
+    except (OSError, ValueError):
+        return None
+
+@timed('write')
+def save_trends(platform, data, region=DEFAULT_REGION):
+    """Write a platform's trend file for a region unless its content is unchanged.
+
+    Writes are atomic, and every change bumps the platform's version in the
+    refresh state. Always records a 'checked_at' heartbeat and appends changed content to
+    the trend history and rising scores. Ranked views of the trends (see
+    trend_store) are stored alongside them. Returns True if the file was written, False if
+    the refresh was a no-op.
+    """
+    path = trend_file_path(platform, region)
+    data = {**data, 'ranked': ranked_views(platform, data.get('trends') or [])}
+    new_fingerprint = fingerprint(data)
+    now = time.time()
+
+    # Other processes collecting other platforms share the refresh state
+    with _lock, file_lock(_refresh_state_file(region) + '.lock'):
+        state = load_refresh_state(region)
+        entry = state.get(platform, {})
+        exists = os.path.exists(path)
+        # Fall back to hashing the file when the state was lost (fresh deploy)
+        previous = entry.get('fingerprint') if exists else None
+        if exists and previous is None:
+            previous = _file_fingerprint(path)
+
+        changed = new_fingerprint != previous
+        if changed:
+            write_json_atomic(path, data)
+            entry['version'] = entry.get('version', 0) + 1
+            entry['fingerprint'] = new_fingerprint
+            entry['changed_at'] = now
+        else:
+            entry['fingerprint'] = previous
+            entry.setdefault('changed_at', os.path.getmtime(path))
+        entry['checked_at'] = now
+        state[platform] = entry
+        _save_refresh_state(state, region)
+
+    try:
+        record_snapshot(platform, data, new_fingerprint, now, region=region)
+    except Exception as e:
+        print(f"⚠️ Error recording {platform} history: {e}")
+    if changed:
+        try:
+            update_velocity(platform, data, now, region=region)
+        except Exception as e:
+            print(f"⚠️ Error scoring {platform} velocity: {e}")
+
+    if not changed:
+        print(f"📭 {platform.capitalize()} trends unchanged ({region}), skipped rewrite")
+    return changed
+
+def unpublished_platforms(region=DEFAULT_REGION):
+    """{platform: fingerprint} of a region's trend files whose content changed
+    since they were last published, including changes written after the run
+    that collected them ended"""
+    state = load_refresh_state(region)
+    return {platform: entry['fingerprint'] for platform, entry in state.items()
+            if entry.get('fingerprint') and entry.get('published') != entry['fingerprint']}
+
+def mark_published(fingerprints, region=DEFAULT_REGION):
+    """Record {platform: fingerprint} of a region's trend files as published"""
+    with _lock, file_lock(_refresh_state_file(region) + '.lock'):
+        state = load_refresh_state(region)
+        for platform, published in fingerprints.items():
+            state.setdefault(platform, {})['published'] = published
+        _save_refresh_state(state, region)
+
+def changed_platforms(since, region=DEFAULT_REGION):
+    """Return the platforms of a region whose trend file changed at or after `since` (epoch seconds)"""
+    state = load_refresh_state(region)
+    return [platform for platform, entry in state.items() if entry.get('changed_at', 0) >= since]
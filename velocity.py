@@ -0,0 +1,128 @@
+"""Rising-trend scoring.
+
+Each time a platform's trends change, every trend gets a velocity signal
+from how far it climbed since the previous snapshot (and, where the source
+has a count, how fast that count grew per hour), added to its previous
+score decayed exponentially over the time since. The update only touches
+the new snapshot's items and the carried-over state, never the history.
+
+State lives in data/.state/velocity.json; the per-platform "rising"
+rankings are written to data/rising_trends.json for the dashboard. Other
+regions keep both in their shard (data/regions/<code>/).
+"""
+import os
+import json
+import math
+import threading
+from normalize import normalize_trend
+from trend_history import trend_key, _trend_title
+from trend_store import DATA_DIR, region_dir, trend_file_path
+from regions import DEFAULT_REGION
+from platforms import setting
+from atomic_files import write_json_atomic, file_lock
+
+STATE_FILE = os.path.join(DATA_DIR, '.state', 'velocity.json')
+RISING_FILE = os.path.join(DATA_DIR, 'rising_trends.json')
+
+# Scores halve every HALF_LIFE_HOURS without new movement
+HALF_LIFE_HOURS = 6
+DECAY_PER_HOUR = math.log(2) / HALF_LIFE_HOURS
+# Shorter gaps between snapshots are treated as this long, so a quick
+# re-fetch doesn't turn a small move into a huge per-hour rate
+MIN_INTERVAL_HOURS = 0.25
+# Count whose growth per hour feeds the signal, per platform
+GROWTH_FIELDS = {platform: field for platform, field in setting('growth_field').items() if field}
+GROWTH_WEIGHT = 0.5
+# Signal for a trend that wasn't in the previous list, scaled by its position
+NEW_ENTRY_WEIGHT = 0.5
+RISING_N = 10
+
+_lock = threading.Lock()
+
+
+def _state_file(region):
+    if region == DEFAULT_REGION:
+        return STATE_FILE
+    return os.path.join(region_dir(region), '.state', 'velocity.json')
+
+def _rising_file(region):
+    return RISING_FILE if region == DEFAULT_REGION else trend_file_path('rising', region)
+
+def _load_state(region=DEFAULT_REGION):
+    try:
+        with open(_state_file(region), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _signal(previous, rank, count, size, hours):
+    """Velocity of one trend between two snapshots `hours` apart"""
+    if previous is None:
+        return NEW_ENTRY_WEIGHT * (size - rank + 1) / size, None
+    climb = (previous['rank'] - rank) / size
+    signal = climb / hours
+    growth = None
+    if count is not None and previous.get('count') is not None:
+        growth = (count - previous['count']) / hours
+        if growth > 0:
+            signal += GROWTH_WEIGHT * math.log1p(growth / max(previous['count'], 1))
+    return signal, growth
+
+def score_snapshot(platform, trends, now, state):
+    """Return the platform's new velocity state given its previous `state`
+    (or None on the first snapshot, which only seeds the state)"""
+    field = GROWTH_FIELDS.get(platform)
+    size = len(trends)
+    previous_items = state['items'] if state else {}
+    elapsed = (now - state['updated_at']) / 3600 if state else 0
+    hours = max(elapsed, MIN_INTERVAL_HOURS)
+    decay = math.exp(-DECAY_PER_HOUR * elapsed)
+
+    items = {}
+    for position, trend in enumerate(trends):
+        trend = normalize_trend(platform, trend)
+        title = _trend_title(trend)
+        key = trend_key(title)
+        if not key or key in items:
+            continue
+        rank = trend.get('rank') or position + 1
+        count = trend.get(field) if field else None
+        previous = previous_items.get(key)
+        if state:
+            signal, growth = _signal(previous, rank, count, size, hours)
+            score = (previous['score'] * decay if previous else 0.0) + signal
+        else:
+            growth, score = None, 0.0
+        items[key] = {
+            'title': title,
+            'url': trend.get('url'),
+            'rank': rank,
+            'count': count,
+            'score': round(score, 6),
+            'rank_change': previous['rank'] - rank if previous else None,
+            'growth_per_hour': round(growth, 2) if growth is not None else None
+        }
+    return {'updated_at': now, 'items': items}
+
+def rising(platform_state, n=RISING_N):
+    """Top `n` trends with a positive score, fastest rising first"""
+    ranked = sorted(platform_state['items'].values(), key=lambda item: -item['score'])
+    return [{**item, 'score': round(item['score'], 3)} for item in ranked[:n] if item['score'] > 0]
+
+def update_velocity(platform, data, now, region=DEFAULT_REGION):
+    """Fold a new snapshot of a platform's trends into the velocity state
+    and rewrite the rising rankings. Returns the platform's rising list."""
+    trends = data.get('trends') or []
+    if not trends:
+        return []
+    # Collections for other platforms may run in other processes
+    with _lock, file_lock(_state_file(region) + '.lock'):
+        state = _load_state(region)
+        entry = score_snapshot(platform, trends, now, state.get(platform))
+        entry['rising'] = rising(entry)
+        state[platform] = entry
+        write_json_atomic(_state_file(region), state)
+        view = {name: {'updated_at': scored['updated_at'], 'trends': scored.get('rising', [])}
+                for name, scored in state.items()}
+        write_json_atomic(_rising_file(region), {'platforms': view})
+    return view[platform]['trends']